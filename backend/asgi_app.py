@@ -0,0 +1,583 @@
+"""
+Campus VVS Navigator - ASGI-Betriebsmodus
+
+Dieses Modul stellt das Backend als ASGI-Anwendung (Starlette) bereit. Die I/O-lastigen
+Routen laufen als asynchrone Handler mit nicht-blockierenden Clients, sodass ein
+einzelner Worker hunderte gleichzeitige Upstream-Aufrufe halten kann:
+
+    * /api/connections, /api/connections/batch,
+      /api/connections/stream (SSE)             -> httpx (VVS EFA)
+    * /api/timetable                            -> Tabelle `lectures` (Thread), sonst httpx (dhbw.app)
+    * /api/user/profile, /api/favorites/...     -> psycopg 3 (AsyncConnectionPool)
+    * /api/auth/verify                          -> lokal (ohne Umweg über den WSGI-Adapter)
+    * /api/departures/... (Long-Poll, SSE)      -> wartet ohne Thread auf `departure_hub`
+
+Alle übrigen Routen (Haltestellen, Statistik-Endpunkte) werden unverändert von der
+Flask-App aus `vvs_app` bedient, die über einen WSGI-Adapter eingebunden ist.
+
+Die JSON-Verträge sind identisch zum Flask-Modus: Parameter-Validierung, Suche,
+Ranking und SQL-Statements stammen aus `vvs_app`, die Serialisierung nutzt den
+JSON-Provider der Flask-App (gleiche Datums- und Schlüsseldarstellung). Caches,
+Circuit-Breaker und Kennzahlen werden zwischen beiden Teilen geteilt, Tracing und
+Profiling (`tracing`) funktionieren in beiden Modi gleich.
+
+Start:
+    SERVER_MODE=asgi python vvs_app.py
+    oder direkt: uvicorn asgi_app:app --host 0.0.0.0 --port 5000 --workers 4
+
+Konfiguration (zusätzlich zu `vvs_app`):
+    - ASGI_WORKERS: Anzahl der Uvicorn-Worker-Prozesse (Standard: 1).
+    - ASGI_UPSTREAM_POOL_SIZE: Maximale gleichzeitige Verbindungen pro Upstream-Host
+      (Standard: 100).
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import os
+import json
+import time
+import asyncio
+import functools
+import contextlib
+from datetime import datetime
+
+# Third-Party Imports
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route, Match
+from a2wsgi import WSGIMiddleware
+from werkzeug.exceptions import HTTPException, BadRequest, UnsupportedMediaType
+import psycopg2
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout as AsyncPoolTimeout
+
+# Lokale Imports
+import vvs_app
+import metrics
+import tracing
+from upstream import AsyncUpstreamClient, CircuitOpenError
+from db_pool import PoolTimeout
+from lectures import in_range
+from vvs_app import (
+    TRIP_PATH, EFA_TIMEOUT, EFA_DEADLINE, EFA_TIMEZONE, BATCH_MAX_ITEMS,
+    SQL_PROFILE_SELECT, SQL_PROFILE_UPSERT, SQL_ENSURE_USER,
+    SQL_FAV_INSERT, SQL_FAV_DELETE, SQL_FAV_REALTIME, FAVORITES_MAX_PAGE_SIZE,
+    favorites_page_params, favorites_page_query, favorites_cursor,
+    build_search_params, parse_vvs_data, parse_vvs_realtime, trip_cache_key, gtfs_trips, trip_span_detail,
+    new_search, search_journeys, plan_round, plan_batch, assemble_batch, plan_realtime, assemble_realtime,
+    timetable_path, conditional_headers, timetable_from_response, timetable_range, lecture_events,
+    lecture_sync, get_username_from_token,
+    verify_token_response, sse_event, stream_partial, stream_done, SSE_HEADERS,
+    DEPARTURES_LONGPOLL_MAX, DEPARTURES_HEARTBEAT, departure_hub, departure_stop_name, departures_sse,
+    efa_cache, trip_windows, timetable_cache, vvs_client, dhbw_client, db_config, commute_scheduler,
+    request_tracer, profiler
+)
+
+# --- KONFIGURATION ---
+ASGI_WORKERS = int(os.getenv('ASGI_WORKERS', '1'))
+ASGI_UPSTREAM_POOL_SIZE = int(os.getenv('ASGI_UPSTREAM_POOL_SIZE', '100'))
+
+vvs_aclient = None
+dhbw_aclient = None
+db_apool = AsyncConnectionPool(make_conninfo(**{k: v for k, v in db_config.items() if v is not None}),
+                               min_size=vvs_app.db_pool.minconn,
+                               max_size=vvs_app.db_pool.maxconn,
+                               timeout=vvs_app.db_pool.timeout,
+                               kwargs={"row_factory": dict_row},
+                               check=AsyncConnectionPool.check_connection,
+                               open=False)
+
+
+class FlaskJSONResponse(Response):
+    """JSON-Antwort, die wie `flask.jsonify` serialisiert (identische Verträge in beiden Modi)."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        # Gleiche Serialisierung wie `jsonify` (Datumsformat, kompakte Trennzeichen, Zeilenende)
+        return vvs_app.app.json.response(content).get_data()
+
+
+# --- VVS FUNKTIONEN (async) ---
+async def fetch_vvs_trips(params, timeout=EFA_TIMEOUT):
+    """Asynchrones Gegenstück zu `vvs_app.fetch_vvs_trips`."""
+    res = await vvs_aclient.get(TRIP_PATH, params=params, read_timeout=timeout, hedge=True)
+    with tracing.span('decode'):
+        data = res.json()
+    with metrics.parse_timer('json'):
+        return parse_vvs_data(data)
+
+
+async def cached_vvs_trips(params, timeout=EFA_TIMEOUT):
+    """Wie `vvs_app.cached_vvs_trips` (gemeinsamer `efa_cache` und gemeinsame `trip_windows`)."""
+    async def load():
+        journeys = trip_windows.lookup(params)
+        if journeys is not None:
+            metrics.TRIP_QUERIES.labels('window').inc()
+            return journeys
+        metrics.TRIP_QUERIES.labels('upstream').inc()
+        journeys = await fetch_vvs_trips(params, timeout)
+        trip_windows.add(params, journeys)
+        return journeys
+
+    return await efa_cache.aget_or_load(trip_cache_key(params), load)
+
+
+async def routed_trips(params, timeout=EFA_TIMEOUT):
+    """
+    Wie `vvs_app.routed_trips`. Die GTFS-Suche ist CPU-gebunden und läuft in einem Thread,
+    damit sie den Event-Loop nicht blockiert.
+    """
+    with tracing.span('trip', trip_span_detail(params)):
+        if vvs_app.gtfs_router is None or vvs_app.ROUTING_MODE == 'efa':
+            return await cached_vvs_trips(params, timeout)
+        if vvs_app.ROUTING_MODE == 'gtfs':
+            return await asyncio.to_thread(gtfs_trips, params)
+        try:
+            return await cached_vvs_trips(params, timeout)
+        except Exception as e:
+            print(f"Fehler VVS: {e} (Fallback auf GTFS)")
+            return await asyncio.to_thread(gtfs_trips, params)
+
+
+async def fetch_vvs_realtime(params, timeout=EFA_TIMEOUT):
+    """Asynchrones Gegenstück zu `vvs_app.fetch_vvs_realtime`."""
+    res = await vvs_aclient.get(TRIP_PATH, params=params, read_timeout=timeout, hedge=True)
+    with tracing.span('decode'):
+        data = res.json()
+    with metrics.parse_timer('realtime'):
+        return parse_vvs_realtime(data)
+
+
+async def cached_vvs_realtime(params, timeout=EFA_TIMEOUT):
+    """Wie `vvs_app.cached_vvs_realtime` (gleicher Key-Raum im `efa_cache`)."""
+    return await efa_cache.aget_or_load(('realtime',) + trip_cache_key(params),
+                                        lambda: fetch_vvs_realtime(params, timeout))
+
+
+async def run_trip_queries(all_params, loader=routed_trips, deadline=None):
+    """
+    Asynchrones Gegenstück zu `vvs_app.run_trip_queries`.
+
+    Alle Anfragen laufen nebenläufig im Event-Loop (ohne Thread-Pool) und teilen sich
+    die Gesamt-Deadline `EFA_DEADLINE` (bzw. `deadline` in Event-Loop-Zeit).
+    """
+    outcomes = [None] * len(all_params)
+    async for index, outcome in iter_trip_queries(all_params, loader, deadline):
+        outcomes[index] = outcome
+    return outcomes
+
+
+def search_deadline():
+    """Absolute Deadline einer Suche über alle Runden (Event-Loop-Zeit)."""
+    return asyncio.get_running_loop().time() + EFA_DEADLINE
+
+
+async def iter_trip_queries(all_params, loader=routed_trips, deadline=None):
+    """Asynchrones Gegenstück zu `vvs_app.iter_trip_queries` (Ergebnisse in Eintreffreihenfolge)."""
+    deadline = deadline or search_deadline()
+    remaining = deadline - asyncio.get_running_loop().time()
+    if remaining <= 0:
+        for index in range(len(all_params)):
+            print("Fehler VVS: Deadline überschritten")
+            yield index, None
+        return
+    timeout = min(EFA_TIMEOUT, remaining)
+    tasks = {asyncio.ensure_future(loader(p, timeout)): i for i, p in enumerate(all_params)}
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    print(f"Fehler VVS: {task.exception()}")
+                    yield tasks[task], None
+                else:
+                    yield tasks[task], task.result()
+        for task in pending:
+            task.cancel()
+            print("Fehler VVS: Deadline überschritten")
+            yield tasks[task], None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def run_searches(searches, loader=routed_trips):
+    """Asynchrones Gegenstück zu `vvs_app.run_searches` (Runden nebenläufig im Event-Loop)."""
+    deadline = search_deadline()
+    while asyncio.get_running_loop().time() < deadline:
+        unique_params, routes = plan_round(searches)
+        if not unique_params:
+            break
+        outcomes = await run_trip_queries(unique_params, loader, deadline)
+        for search, stop, slot in routes:
+            search.add(stop, outcomes[slot])
+    return searches
+
+
+async def fetch_timetable(course, entry=None):
+    """Asynchrones Gegenstück zu `vvs_app.fetch_timetable`."""
+    res = await dhbw_aclient.get(timetable_path(course), headers=conditional_headers(entry))
+    return timetable_from_response(res, entry)
+
+
+# --- API ROUTEN ---
+# - VVS -
+async def get_connections(request):
+    """Wie `vvs_app.get_connections` (gleiche Parameter, Antwort und Status Codes)."""
+    args = request.query_params
+    try:
+        with tracing.span('params'):
+            all_params = build_search_params(args.get('mode'), args.get('userStopId'),
+                                             args.get('date'), args.get('time'), args.get('buffer', 0))
+    except ValueError:
+        return FlaskJSONResponse({"error": "Ungültiges Zeitformat"}, 400)
+
+    search = new_search(all_params)
+    await run_searches([search])
+    if all(o is None for o in search.outcomes()) and vvs_client.breaker.is_open():
+        return FlaskJSONResponse({"error": "VVS derzeit nicht erreichbar", "journeys": []}, 503)
+    return FlaskJSONResponse({"journeys": search_journeys(search)})
+
+
+async def get_connections_batch(request):
+    """Wie `vvs_app.get_connections_batch` (gleicher Body, Antwort und Status Codes)."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return FlaskJSONResponse({"error": "Feld 'items' (Liste) fehlt"}, 400)
+    if len(items) > BATCH_MAX_ITEMS:
+        return FlaskJSONResponse({"error": f"Maximal {BATCH_MAX_ITEMS} Elemente pro Batch"}, 400)
+
+    searches = await run_searches(plan_batch(items))
+    return FlaskJSONResponse({"results": assemble_batch(searches)})
+
+
+# - Auth -
+async def verify_token(request):
+    """Wie `vvs_app.verify_token` (lokale Prüfung, ohne Thread-Wechsel)."""
+    body, status = verify_token_response(request.query_params.get('token')
+                                         or request.headers.get('Authorization'))
+    return FlaskJSONResponse(body, status)
+
+
+async def stream_connections(request):
+    """Wie `vvs_app.stream_connections` (gleiche Parameter und Events)."""
+    args = request.query_params
+    try:
+        with tracing.span('params'):
+            all_params = build_search_params(args.get('mode'), args.get('userStopId'),
+                                             args.get('date'), args.get('time'), args.get('buffer', 0))
+    except ValueError:
+        return FlaskJSONResponse({"error": "Ungültiges Zeitformat"}, 400)
+    search = new_search(all_params)
+
+    async def generate():
+        deadline = search_deadline()
+        while asyncio.get_running_loop().time() < deadline:
+            unique_params, routes = plan_round([search])
+            if not unique_params:
+                break
+            async for slot, outcome in iter_trip_queries(unique_params, deadline=deadline):
+                for _, stop, route_slot in routes:
+                    if route_slot == slot:
+                        search.add(stop, outcome)
+                        yield sse_event('partial', stream_partial(stop, outcome))
+        yield sse_event('done', stream_done(search))
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+# - Abfahrtstafeln -
+async def get_departure_stats(request):
+    """Wie `vvs_app.get_departure_stats`."""
+    return FlaskJSONResponse(departure_hub.stats())
+
+
+async def get_departures(request):
+    """Wie `vvs_app.get_departures` (Long-Poll ohne blockierten Thread)."""
+    stop_id = request.path_params['stop_id']
+    name = departure_stop_name(stop_id)
+    if name is None:
+        return FlaskJSONResponse({"error": "Unbekannte Haltestelle"}, 404)
+    args = request.query_params
+    try:
+        since = int(args['since']) if args.get('since') else None
+        wait = min(max(float(args.get('wait', 0)), 0), DEPARTURES_LONGPOLL_MAX)
+    except ValueError:
+        return FlaskJSONResponse({"error": "Ungültiger Wert für 'since' oder 'wait'"}, 400)
+    try:
+        board = departure_hub.board(stop_id, name)
+    except RuntimeError as e:
+        return FlaskJSONResponse({"error": str(e)}, 503)
+
+    with departure_hub.subscription(board):
+        await departure_hub.await_version(board, None, EFA_TIMEOUT)
+        if wait and since is not None:
+            await departure_hub.await_version(board, since, wait)
+    return FlaskJSONResponse(departure_hub.payload(board, since))
+
+
+async def stream_departures(request):
+    """Wie `vvs_app.stream_departures` (gleiche Events, `Last-Event-ID` als Stand)."""
+    stop_id = request.path_params['stop_id']
+    name = departure_stop_name(stop_id)
+    if name is None:
+        return FlaskJSONResponse({"error": "Unbekannte Haltestelle"}, 404)
+    try:
+        board = departure_hub.board(stop_id, name)
+    except RuntimeError as e:
+        return FlaskJSONResponse({"error": str(e)}, 503)
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    since = int(last_event_id) if last_event_id.isdigit() else None
+
+    async def generate():
+        version = since
+        with departure_hub.subscription(board):
+            await departure_hub.await_version(board, None, EFA_TIMEOUT)
+            while True:
+                if version is None or board.version != version:
+                    payload = departure_hub.payload(board, version)
+                    version = payload['version']
+                    yield departures_sse(payload)
+                if not await departure_hub.await_version(board, version, DEPARTURES_HEARTBEAT):
+                    yield ": keep-alive\n\n"
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+# - User Preferences -
+def _request_username(request):
+    token = (request.query_params.get('token') if request.method == 'GET'
+             else request.headers.get('Authorization'))
+    return get_username_from_token(token)
+
+
+async def _json_body(request):
+    # Wie `flask.request.json`: nur bei JSON-Content-Type (sonst 415), ungültiges JSON -> 400
+    if request.headers.get('content-type', '').split(';')[0].strip() != 'application/json':
+        raise UnsupportedMediaType("Did not attempt to load JSON data because the request Content-Type"
+                                   " was not 'application/json'.")
+    try:
+        return await request.json()
+    except ValueError:
+        raise BadRequest()
+
+
+async def manage_profile(request):
+    """Wie `vvs_app.manage_profile` (GET/POST)."""
+    username = _request_username(request)
+    if not username: return FlaskJSONResponse({"error": "Unauthorized"}, 401)
+
+    if request.method == 'GET':
+        async with db_apool.connection() as db, db.cursor() as cursor:
+            with metrics.db_timer('profile_select'):
+                await cursor.execute(SQL_PROFILE_SELECT, (username,))
+            res = await cursor.fetchone()
+            return FlaskJSONResponse(dict(res) if res else {})
+
+    d = await _json_body(request)
+    async with db_apool.connection() as db:
+        with metrics.db_timer('profile_upsert'):
+            await db.execute(SQL_PROFILE_UPSERT, (username, d.get('course'), d.get('stop_id'), d.get('stop_name'), d.get('buffer')))
+    # Nach dem Commit: vorberechnete Verbindungen verwerfen (blockierend -> Thread)
+    await asyncio.to_thread(commute_scheduler.invalidate, username)
+    if lecture_sync.interval > 0:
+        lecture_sync.schedule(d.get('course'))
+    return FlaskJSONResponse({"status": "success"})
+
+
+# - Favoriten -
+async def handle_favorites(request):
+    """Wie `vvs_app.handle_favorites` (GET/POST)."""
+    username = _request_username(request)
+    if not username: return FlaskJSONResponse({"error": "Unauthorized"}, 401)
+
+    async with db_apool.connection() as db, db.cursor() as cursor:
+        if request.method == 'POST':
+            data = await _json_body(request)
+            with metrics.db_timer('ensure_user'):
+                await cursor.execute(SQL_ENSURE_USER, (username,))
+            with metrics.db_timer('fav_insert'):
+                await cursor.execute(SQL_FAV_INSERT, (username, data['dep'], data['arr'], data['duration'],
+                                                      data['interchanges'], json.dumps(data['sections'])))
+                inserted = await cursor.fetchone()
+            return FlaskJSONResponse({"status": "success" if inserted else "exists"})
+        try:
+            limit, after, summary = favorites_page_params(request.query_params)
+        except ValueError:
+            return FlaskJSONResponse({"error": "Ungültige Pagination-Parameter"}, 400)
+        with metrics.db_timer('fav_page'):
+            await cursor.execute(*favorites_page_query(username, limit, after, summary))
+        rows = await cursor.fetchall()
+        headers = {'X-Next-Cursor': favorites_cursor(rows[limit - 1])} if len(rows) > limit else None
+        return FlaskJSONResponse([dict(r) for r in rows[:limit]], headers=headers)
+
+
+async def refresh_favorites(request):
+    """Wie `vvs_app.refresh_favorites` (Echtzeit-Abgleich aller Favoriten)."""
+    username = get_username_from_token(request.query_params.get('token'))
+    if not username: return FlaskJSONResponse({"error": "Unauthorized"}, 401)
+
+    async with db_apool.connection() as db, db.cursor() as cursor:
+        with metrics.db_timer('fav_realtime'):
+            await cursor.execute(SQL_FAV_REALTIME, (username, FAVORITES_MAX_PAGE_SIZE))
+        favorites = await cursor.fetchall()
+
+    t_date = datetime.now(EFA_TIMEZONE).strftime("%Y%m%d")
+    unique_params, fav_slots = plan_realtime(favorites, t_date)
+    outcomes = await run_trip_queries(unique_params, loader=cached_vvs_realtime)
+    if outcomes and all(o is None for o in outcomes) and vvs_client.breaker.is_open():
+        return FlaskJSONResponse({"error": "VVS derzeit nicht erreichbar", "favorites": []}, 503)
+    return FlaskJSONResponse({"date": t_date, "queries": len(unique_params),
+                              "favorites": assemble_realtime(favorites, fav_slots, outcomes)})
+
+
+async def delete_favorite(request):
+    """Wie `vvs_app.delete_favorite`."""
+    username = get_username_from_token(request.headers.get('Authorization'))
+    if not username: return FlaskJSONResponse({"error": "Unauthorized"}, 401)
+    async with db_apool.connection() as db, db.cursor() as cursor:
+        with metrics.db_timer('fav_delete'):
+            await cursor.execute(SQL_FAV_DELETE, (request.path_params['fav_id'], username))
+        return FlaskJSONResponse({"status": "deleted"})
+
+
+# - Stundenplan -
+async def get_timetable(request):
+    """Wie `vvs_app.get_timetable` (inkl. Zeitraum und Header `X-Cache`)."""
+    course = request.query_params.get('course')
+    if not course: return FlaskJSONResponse({"error": "No course provided"}, 400)
+    try:
+        start, end = timetable_range(request.query_params.get('from'), request.query_params.get('to'))
+    except ValueError:
+        return FlaskJSONResponse({"error": "Ungültiger Zeitraum (from/to im Format YYYYMMDD)"}, 400)
+    try:
+        events = None
+        if lecture_sync.interval > 0:
+            try:
+                # Abfrage und ggf. erster Abgleich über psycopg2 (blockierend -> Thread)
+                result = await asyncio.to_thread(lecture_events, course, start, end)
+                if result is not None:
+                    events, status = result
+            except (psycopg2.Error, PoolTimeout) as e:
+                print(f"Fehler Vorlesungen aus DB ({course}): {e}")
+        if events is None:
+            events, status = await timetable_cache.aget(course, lambda entry: fetch_timetable(course, entry))
+            events = in_range(events, start, end)
+    except CircuitOpenError as e:
+        return FlaskJSONResponse({"error": str(e)}, 503)
+    except Exception as e:
+        return FlaskJSONResponse({"error": str(e)}, 500)
+    return FlaskJSONResponse(events, headers={'X-Cache': status})
+
+
+async def handle_http_exception(request, exc):
+    """Fehlerseite von werkzeug (z. B. 400/415 aus `_json_body`), byte-identisch zum Flask-Modus."""
+    res = exc.get_response()
+    return Response(res.get_data(), exc.code, headers={'Content-Type': res.headers['Content-Type']})
+
+
+async def handle_pool_timeout(request, exc):
+    """Wie `vvs_app.handle_pool_timeout`: Pool ausgeschöpft -> 503."""
+    return FlaskJSONResponse({"error": "Datenbank ausgelastet, bitte später erneut versuchen"}, 503)
+
+
+# --- APP ---
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global vvs_aclient, dhbw_aclient
+    vvs_aclient = AsyncUpstreamClient(vvs_client, pool_size=ASGI_UPSTREAM_POOL_SIZE)
+    dhbw_aclient = AsyncUpstreamClient(dhbw_client, pool_size=ASGI_UPSTREAM_POOL_SIZE)
+    await asyncio.to_thread(vvs_app.run_migrations)
+    await db_apool.open(wait=False)
+    vvs_app.start_background_jobs()
+    try:
+        yield
+    finally:
+        await db_apool.close()
+        await vvs_aclient.aclose()
+        await dhbw_aclient.aclose()
+
+
+def timed(rule, endpoint):
+    """
+    Erfasst Anzahl und Latenz einer async Route unter dem Flask-Route-Template `rule` und
+    führt den Trace des Requests (`Server-Timing`, Slow-Request-Log, Profil wie in `vvs_app`).
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(request):
+        start, status = time.perf_counter(), 500
+        trace = request_tracer.begin()
+        profile = profiler.start() if profiler.authorized(request.headers.get('X-Profile-Token')) else None
+        try:
+            response = await endpoint(request)
+            status = response.status_code
+            timing = request_tracer.finish(trace, rule, request.method, status, request.url.path)
+            if timing:
+                response.headers['Server-Timing'] = timing
+            if profile is not None:
+                response.headers['X-Profile'] = profiler.stop(profile, rule) or 'error'
+                profile = None
+            return response
+        except AsyncPoolTimeout:
+            status = 503
+            raise
+        finally:
+            if profile is not None:
+                profiler.stop(profile, rule)
+            request_tracer.finish(trace, rule, request.method, status, request.url.path)
+            metrics.observe_request(rule, request.method, status, time.perf_counter() - start)
+    return wrapper
+
+
+routes = [
+    Route('/api/connections', timed('/api/connections', get_connections)),
+    Route('/api/connections/batch', timed('/api/connections/batch', get_connections_batch), methods=['POST']),
+    Route('/api/connections/stream', timed('/api/connections/stream', stream_connections)),
+    Route('/api/auth/verify', timed('/api/auth/verify', verify_token)),
+    Route('/api/departures/stats', timed('/api/departures/stats', get_departure_stats)),
+    Route('/api/departures/{stop_id}', timed('/api/departures/<stop_id>', get_departures)),
+    Route('/api/departures/{stop_id}/stream', timed('/api/departures/<stop_id>/stream', stream_departures)),
+    Route('/api/user/profile', timed('/api/user/profile', manage_profile), methods=['GET', 'POST']),
+    Route('/api/favorites/connection', timed('/api/favorites/connection', handle_favorites), methods=['GET', 'POST']),
+    Route('/api/favorites/connection/realtime',
+          timed('/api/favorites/connection/realtime', refresh_favorites)),
+    Route('/api/favorites/connection/{fav_id:int}',
+          timed('/api/favorites/connection/<int:fav_id>', delete_favorite), methods=['DELETE']),
+    Route('/api/timetable', timed('/api/timetable', get_timetable)),
+]
+
+# CORS wie `flask_cors.CORS(app)` (alle Origins, Origin wird gespiegelt)
+async_app = CORSMiddleware(
+    Starlette(routes=routes, lifespan=lifespan,
+              exception_handlers={AsyncPoolTimeout: handle_pool_timeout,
+                                  HTTPException: handle_http_exception}),
+    allow_origin_regex='.*', allow_methods=['*'], allow_headers=['*'],
+    expose_headers=['X-Cache', 'X-Next-Cursor', 'Server-Timing', 'X-Profile']
+)
+flask_app = WSGIMiddleware(vvs_app.app)
+
+
+def _is_async_route(scope):
+    # Preflight-Requests und falsche Methoden zählen ebenfalls (Match.PARTIAL)
+    return any(route.matches(scope)[0] != Match.NONE for route in routes)
+
+
+async def app(scope, receive, send):
+    """ASGI-Einstiegspunkt: async Routen über Starlette, alle übrigen über die Flask-App."""
+    if scope['type'] == 'lifespan' or (scope['type'] == 'http' and _is_async_route(scope)):
+        await async_app(scope, receive, send)
+    else:
+        await flask_app(scope, receive, send)
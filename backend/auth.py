@@ -0,0 +1,228 @@
+"""
+Campus VVS Navigator - Token-Prüfung
+
+Dieses Modul prüft die JWTs des Auth-Dienstes lokal im Backend, statt nur die Payload
+zu dekodieren oder für jede Prüfung den Auth-Dienst (`/auth/verify`) aufzurufen.
+
+Prüfung:
+    * Signatur: HMAC (HS256/384/512) über das gemeinsame Secret (Standardbibliothek),
+      RSA/EC über einen festen Public Key oder die JWKS des Auth-Dienstes (benötigt
+      das optionale Paket `PyJWT[crypto]`, Schlüssel werden je `kid` gecacht).
+    * Zeitangaben: `exp` und `nbf` mit einer Toleranz von `leeway` Sekunden.
+    * Optional: `iss` und `aud`.
+
+Erfolgreich geprüfte Tokens liegen in einem LRU-Cache (Key: SHA-256 des Tokens), bis
+sie ablaufen, höchstens aber `cache_ttl` Sekunden. Wiederholte Prüfungen desselben
+Tokens kosten damit nur noch einen Hash und einen Dictionary-Zugriff.
+
+Ohne Schlüsselmaterial (weder Secret noch Public Key noch JWKS-URL) fällt die Prüfung
+auf das bisherige Verhalten zurück: Die Payload wird nur dekodiert, `exp` wird
+trotzdem geprüft. Beim Start wird dafür eine Warnung ausgegeben.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import hmac
+import json
+import time
+import base64
+import hashlib
+
+# Third-Party Imports
+try:
+    import jwt  # optional: RSA/EC-Signaturen und JWKS (PyJWT[crypto])
+except ImportError:
+    jwt = None
+
+# Lokale Imports
+from cache import TTLCache
+
+_HMAC_ALGORITHMS = {'HS256': hashlib.sha256, 'HS384': hashlib.sha384, 'HS512': hashlib.sha512}
+
+
+class TokenError(Exception):
+    """Das Token ist ungültig, abgelaufen oder nicht prüfbar."""
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def strip_bearer(token):
+    """
+    Entfernt ein vorangestelltes Schema (z. B. "Bearer") aus dem Authorization-Header.
+
+    Beispiele:
+        >>> strip_bearer("Bearer abc.def.ghi")
+        'abc.def.ghi'
+        >>> strip_bearer("abc.def.ghi")
+        'abc.def.ghi'
+    """
+    return token.split(" ")[1] if " " in token else token
+
+
+class TokenVerifier:
+    """
+    Prüft JWTs lokal und cached das Ergebnis bis zum Ablauf des Tokens.
+
+    Args:
+        secret (str, optional): Gemeinsames Secret für HS-Algorithmen.
+        public_key (str, optional): PEM-Public-Key für RS/ES-Algorithmen.
+        jwks_url (str, optional): URL der JWKS des Auth-Dienstes (RS/ES-Algorithmen).
+        algorithms (iterable): Zulässige Werte für den Header `alg` (Standard: HS256).
+        leeway (float): Toleranz für `exp`/`nbf` in Sekunden.
+        issuer (str, optional): Erwarteter Wert für `iss`.
+        audience (str, optional): Erwarteter Wert für `aud`.
+        cache_size (int): Maximale Anzahl gecachter Tokens.
+        cache_ttl (float): Maximale Verweildauer eines Tokens im Cache in Sekunden.
+        jwks_ttl (float): Lebensdauer der gecachten JWKS in Sekunden.
+
+    Beispiele:
+        >>> verifier = TokenVerifier(secret='geheim')
+        >>> token = verifier.sign({'sub': 'max', 'exp': time.time() + 60})
+        >>> verifier.username(token)
+        'max'
+        >>> verifier.username(token[:-2] + 'xx') is None
+        True
+    """
+
+    def __init__(self, secret=None, public_key=None, jwks_url=None, algorithms=('HS256',),
+                 leeway=30, issuer=None, audience=None, cache_size=4096, cache_ttl=300, jwks_ttl=3600):
+        self.secret = secret.encode() if secret else None
+        self.public_key = public_key
+        self.algorithms = tuple(algorithms)
+        self.leeway = leeway
+        self.issuer = issuer
+        self.audience = audience
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._jwks = None
+        self.rejected = 0
+
+        if (public_key or jwks_url) and not secret and jwt is None:
+            raise RuntimeError("JWT_PUBLIC_KEY/JWT_JWKS_URL benötigen das Paket 'PyJWT[crypto]'")
+        if jwks_url and jwt is not None:
+            self._jwks = jwt.PyJWKClient(jwks_url, cache_keys=True, lifespan=jwks_ttl)
+
+        if self.secret:
+            self.mode = 'hmac'
+        elif public_key:
+            self.mode = 'public_key'
+        elif self._jwks:
+            self.mode = 'jwks'
+        else:
+            self.mode = 'unverified'
+            print("Warnung Auth: Kein JWT_SECRET/JWT_PUBLIC_KEY/JWT_JWKS_URL gesetzt, "
+                  "Token-Signaturen werden nicht geprüft")
+
+    def verify(self, token):
+        """
+        Prüft ein Token (Cache zuerst) und liefert seine Claims.
+
+        Args:
+            token (str): Das JWT, optional mit vorangestelltem Schema ("Bearer ...").
+
+        Returns:
+            dict: Die Claims des Tokens.
+
+        Raises:
+            TokenError: Wenn das Token fehlt, ungültig oder abgelaufen ist.
+        """
+        if not token:
+            raise TokenError("Token fehlt")
+        token = strip_bearer(token)
+        key = hashlib.sha256(token.encode()).digest()
+        try:
+            claims = self._cache.get_or_load(key, lambda: self._verify_uncached(token))
+        except TokenError:
+            self.rejected += 1
+            raise
+        exp = claims.get('exp')
+        if exp is not None and float(exp) + self.leeway <= time.time():
+            # Abgelaufen, während das Token im Cache lag
+            self._cache.invalidate(key)
+            self.rejected += 1
+            raise TokenError("Token abgelaufen")
+        return claims
+
+    def username(self, token):
+        """Liefert den Benutzernamen (`sub`) eines gültigen Tokens, sonst None."""
+        try:
+            return self.verify(token).get('sub')
+        except TokenError:
+            return None
+
+    def _verify_uncached(self, token):
+        try:
+            header_b64, payload_b64, signature_b64 = token.split('.')
+            claims = json.loads(_b64decode(payload_b64))
+        except (ValueError, TypeError) as e:
+            raise TokenError("Token nicht lesbar") from e
+        if not isinstance(claims, dict):
+            raise TokenError("Token nicht lesbar")
+
+        if self.mode == 'hmac':
+            try:
+                alg = json.loads(_b64decode(header_b64)).get('alg')
+            except (ValueError, TypeError, AttributeError) as e:
+                raise TokenError("Token nicht lesbar") from e
+            if alg not in self.algorithms or alg not in _HMAC_ALGORITHMS:
+                raise TokenError(f"Algorithmus '{alg}' nicht erlaubt")
+            expected = hmac.new(self.secret, f"{header_b64}.{payload_b64}".encode(),
+                                _HMAC_ALGORITHMS[alg]).digest()
+            try:
+                signature = _b64decode(signature_b64)
+            except ValueError as e:
+                raise TokenError("Signatur ungültig") from e
+            if not hmac.compare_digest(expected, signature):
+                raise TokenError("Signatur ungültig")
+        elif self.mode in ('public_key', 'jwks'):
+            try:
+                key = (self.public_key if self.mode == 'public_key'
+                       else self._jwks.get_signing_key_from_jwt(token).key)
+                # Zeitangaben prüft `_check_claims` (einheitlich für alle Modi)
+                jwt.decode(token, key, algorithms=list(self.algorithms),
+                           options={"verify_exp": False, "verify_nbf": False, "verify_iat": False,
+                                    "verify_aud": False, "verify_iss": False})
+            except jwt.PyJWKClientError as e:
+                raise TokenError(f"Schlüssel nicht verfügbar: {e}") from e
+            except jwt.InvalidTokenError as e:
+                raise TokenError(f"Signatur ungültig: {e}") from e
+
+        self._check_claims(claims)
+        return claims
+
+    def _check_claims(self, claims):
+        now = time.time()
+        try:
+            if 'exp' in claims and float(claims['exp']) + self.leeway <= now:
+                raise TokenError("Token abgelaufen")
+            if 'nbf' in claims and float(claims['nbf']) - self.leeway > now:
+                raise TokenError("Token noch nicht gültig")
+        except (TypeError, ValueError) as e:
+            raise TokenError("Zeitangaben ungültig") from e
+        if self.issuer and claims.get('iss') != self.issuer:
+            raise TokenError("Aussteller ungültig")
+        if self.audience:
+            aud = claims.get('aud')
+            if self.audience not in (aud if isinstance(aud, list) else [aud]):
+                raise TokenError("Zielgruppe ungültig")
+
+    def sign(self, claims, alg='HS256'):
+        """Erzeugt ein HS-signiertes Token (für Tests und Benchmarks, nur im Modus 'hmac')."""
+        if not self.secret or alg not in _HMAC_ALGORITHMS:
+            raise TokenError("Signieren nur mit Secret und HS-Algorithmus möglich")
+        segments = [base64.urlsafe_b64encode(json.dumps(part, separators=(',', ':')).encode()).rstrip(b'=')
+                    for part in ({"alg": alg, "typ": "JWT"}, claims)]
+        signing_input = b'.'.join(segments)
+        signature = hmac.new(self.secret, signing_input, _HMAC_ALGORITHMS[alg]).digest()
+        return b'.'.join([signing_input, base64.urlsafe_b64encode(signature).rstrip(b'=')]).decode()
+
+    def stats(self):
+        """
+        Gibt die Kennzahlen der Token-Prüfung zurück.
+
+        Returns:
+            dict: 'mode', 'rejected' und die Kennzahlen des Token-Caches.
+        """
+        return {"mode": self.mode, "rejected": self.rejected, **self._cache.stats()}
@@ -0,0 +1,150 @@
+"""
+Campus VVS Navigator - Lasttest für /api/connections, /api/stops und /api/timetable
+
+Erzeugt mit mehreren Threads gleichzeitige Anfragen und misst Durchsatz sowie die
+Latenz-Perzentile p50/p95/p99 je Endpunkt.
+
+Ohne `--url` wird alles lokal gestartet: der Upstream-Stub (`efa_stub.py`) mit der
+angegebenen Latenz/Fehlerrate und das Backend selbst (Werkzeug, threaded), das über
+VVS_BASE_URL/DHBW_BASE_URL auf den Stub zeigt. Es gehen also keine Anfragen an
+`www3.vvs.de` oder `api.dhbw.app`.
+
+Aufruf:
+    python benchmarks/bench_load.py --requests 500 --concurrency 20 --latency 200 --json load.json
+    python benchmarks/bench_load.py --url http://localhost:9601   # gegen laufendes Backend
+"""
+
+# Standard-Library Imports
+import os
+import csv
+import time
+import random
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Third-Party Imports
+import requests
+
+# Lokale Imports
+from common import BENCH_DIR, percentile, write_results
+from efa_stub import StubConfig, start_stub
+
+
+def _stop_ids(count, seed):
+    path = os.path.join(os.path.dirname(BENCH_DIR), 'haltestellen.csv')
+    with open(path, encoding='utf-8-sig') as f:
+        ids = [row['Globale ID'].strip() for row in csv.DictReader(f, delimiter=';')]
+    return random.Random(seed).sample(ids, min(count, len(ids)))
+
+
+def build_targets(endpoint, count, stop_ids, seed):
+    """Erzeugt `count` reproduzierbare Pfade für einen Endpunkt."""
+    rnd = random.Random(seed)
+    targets = []
+    for _ in range(count):
+        if endpoint == 'connections':
+            mode = rnd.choice(['to_uni', 'from_uni'])
+            targets.append(f"/api/connections?mode={mode}&userStopId={rnd.choice(stop_ids)}"
+                           f"&date=20251201&time={rnd.choice(['0800', '0945', '1215', '1530'])}&buffer=0")
+        elif endpoint == 'stops':
+            targets.append("/api/stops")
+        else:
+            targets.append(f"/api/timetable?course=STG-TINF{rnd.randint(20, 25)}{rnd.choice('ABC')}")
+    return targets
+
+
+def run_endpoint(base_url, endpoint, targets, concurrency):
+    """
+    Schickt alle `targets` mit `concurrency` Threads ab.
+
+    Returns:
+        dict: Anzahl, Fehler, Durchsatz (req/s) und Latenzen (ms: p50/p95/p99/max/mean).
+    """
+    local = threading.local()
+
+    def call(path):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = session.get(base_url + path, timeout=60).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(call, targets))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(ms for ms, _ in samples)
+    return {
+        "endpoint": endpoint,
+        "requests": len(samples),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "concurrency": concurrency,
+        "throughput_rps": round(len(samples) / wall, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2),
+            "mean": round(sum(latencies) / len(latencies), 2)
+        }
+    }
+
+
+def start_backend(stub_port):
+    """Startet das Backend in-process, umgeleitet auf den Stub. Liefert die Basis-URL."""
+    os.environ['VVS_BASE_URL'] = f"http://127.0.0.1:{stub_port}/mngvvs"
+    os.environ['DHBW_BASE_URL'] = f"http://127.0.0.1:{stub_port}"
+    from werkzeug.serving import make_server
+    import vvs_app
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, vvs_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest des Backends gegen einen lokalen Upstream-Stub.")
+    parser.add_argument('--url', help="Basis-URL eines laufenden Backends (sonst lokal gestartet)")
+    parser.add_argument('--endpoints', default='connections,stops,timetable')
+    parser.add_argument('--requests', type=int, default=300, help="Anfragen pro Endpunkt")
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--stops', type=int, default=50, help="Anzahl verschiedener Benutzer-Haltestellen")
+    parser.add_argument('--latency', type=float, default=200, help="Stub-Grundlatenz in ms")
+    parser.add_argument('--jitter', type=float, default=100, help="Stub-Zufallslatenz in ms")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Anteil Stub-Fehler (HTTP 503)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Ergebnisse zusätzlich als JSON-Datei schreiben")
+    args = parser.parse_args()
+
+    base_url = args.url
+    if not base_url:
+        stub = start_stub(config=StubConfig(args.latency, args.jitter, args.error_rate, seed=args.seed))
+        base_url = start_backend(stub.server_address[1])
+
+    stop_ids = _stop_ids(args.stops, args.seed)
+    results = []
+    for endpoint in args.endpoints.split(','):
+        targets = build_targets(endpoint, args.requests, stop_ids, args.seed)
+        r = run_endpoint(base_url, endpoint, targets, args.concurrency)
+        results.append(r)
+        lat = r['latency_ms']
+        print(f"{endpoint:<12} {r['requests']:>6} req {r['errors']:>4} err {r['throughput_rps']:>9.1f} req/s"
+              f"  p50 {lat['p50']:>8.1f}  p95 {lat['p95']:>8.1f}  p99 {lat['p99']:>8.1f} ms")
+
+    if args.json:
+        write_results(args.json, {
+            "benchmark": "load",
+            "config": {k: v for k, v in vars(args).items() if k != 'json'},
+            "results": results
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Campus VVS Navigator - Micro-Benchmarks der Backend-Hotpaths
+
+Misst mit `timeit` die Laufzeit von:
+    * parse_vvs_data  (je aufgezeichneter EFA-Antwort, bereits dekodiert)
+    * format_vvs_time (ISO-Zeitstempel, kompakte Zeit, ungültige Eingabe)
+    * compile_table   (Erzeugen des Haltestellen-Snapshots aus haltestellen.csv)
+    * load_stops      (Einblenden des Snapshots per mmap inkl. Suchindex)
+
+Aufruf:
+    python benchmarks/bench_micro.py [--json micro.json]
+"""
+
+# Standard-Library Imports
+import json
+import timeit
+import argparse
+
+# Lokale Imports
+from common import load_recordings, write_results
+from stop_table import compile_table
+import vvs_app
+
+
+def bench(name, func, min_time=0.2):
+    """Führt `func` so oft aus, dass mindestens `min_time` Sekunden gemessen werden."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat=5, number=number)) / number
+    return {"name": name, "us_per_call": round(best * 1e6, 3), "calls_per_s": round(1 / best, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-Benchmarks des Backends.")
+    parser.add_argument('--json', help="Ergebnisse zusätzlich als JSON-Datei schreiben")
+    args = parser.parse_args()
+
+    results = []
+    for name, raw in load_recordings():
+        data = json.loads(raw)
+        results.append(bench(f"parse_vvs_data[{name}]", lambda data=data: vvs_app.parse_vvs_data(data)))
+    for label, value in (("iso", "2025-12-24T14:30:00Z"), ("compact", "0915"), ("invalid", None)):
+        results.append(bench(f"format_vvs_time[{label}]", lambda value=value: vvs_app.format_vvs_time(value)))
+    results.append(bench("compile_table", lambda: compile_table(vvs_app.STOPS_CSV), min_time=1.0))
+    results.append(bench("load_stops", vvs_app.load_stops, min_time=1.0))
+
+    for r in results:
+        print(f"{r['name']:<45} {r['us_per_call']:>12.3f} µs {r['calls_per_s']:>14.1f} /s")
+    if args.json:
+        write_results(args.json, {"benchmark": "micro", "results": results})
+
+
+if __name__ == '__main__':
+    main()
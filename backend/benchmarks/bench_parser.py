@@ -0,0 +1,75 @@
+"""
+Campus VVS Navigator - Benchmark: vollständiger vs. Streaming-Parser
+
+Vergleicht für jede aufgezeichnete EFA-Antwort:
+    * full:   `json.loads` + `parse_vvs_data` (Standardpfad)
+    * stream: `parse_vvs_stream` (feldselektiv, benötigt ijson)
+
+Gemessen werden die mittlere Laufzeit und der Spitzen-Speicherverbrauch (tracemalloc).
+Vorab wird geprüft, dass beide Parser identische Ergebnisse liefern.
+
+Aufruf:
+    python benchmarks/bench_parser.py [--repeat 50] [--json results.json]
+"""
+
+# Standard-Library Imports
+import io
+import json
+import time
+import argparse
+import tracemalloc
+
+# Lokale Imports
+from common import load_recordings, write_results
+import vvs_app
+
+
+def _full(raw):
+    return vvs_app.parse_vvs_data(json.loads(raw))
+
+
+def _stream(raw):
+    return vvs_app.parse_vvs_stream(io.BytesIO(raw))
+
+
+def measure(func, raw, repeat):
+    """Liefert (mittlere Laufzeit in ms, Spitzen-Speicher in KiB) für `func(raw)`."""
+    func(raw)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(raw)
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+    tracemalloc.start()
+    func(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(elapsed_ms, 3), round(peak / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der EFA-Parser.")
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', help="Ergebnisse zusätzlich als JSON-Datei schreiben")
+    args = parser.parse_args()
+
+    if vvs_app.ijson is None:
+        raise SystemExit("ijson ist nicht installiert (pip install ijson)")
+
+    results = []
+    print(f"{'Antwort':<40} {'KiB':>8} {'full ms':>9} {'stream ms':>10} {'full KiB':>9} {'stream KiB':>11}")
+    for name, raw in load_recordings():
+        if _full(raw) != _stream(raw):
+            raise SystemExit(f"{name}: Streaming-Parser liefert abweichendes Ergebnis")
+        full_ms, full_kib = measure(_full, raw, args.repeat)
+        stream_ms, stream_kib = measure(_stream, raw, args.repeat)
+        results.append({"name": name, "size_bytes": len(raw),
+                        "full": {"ms": full_ms, "peak_kib": full_kib},
+                        "stream": {"ms": stream_ms, "peak_kib": stream_kib}})
+        print(f"{name:<40} {len(raw) / 1024:>8.1f} {full_ms:>9} {stream_ms:>10} {full_kib:>9} {stream_kib:>11}")
+
+    if args.json:
+        write_results(args.json, {"benchmark": "parser", "results": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Campus VVS Navigator - Benchmark der Suchplanung (Upstream-Aufrufe und Ergebnisqualität)
+
+Spielt typische Verbindungssuchen (Benutzer-Haltestelle, Richtung, Vorlesungszeiten,
+verschiedene Puffer und eine Batch-Woche) gegen den Upstream-Stub im Fahrplanmodus
+(`efa_stub.py --timetable`) ab und vergleicht:
+    * baseline: eine Anfrage je Campus-Haltestelle mit 4 Fahrten, Sortierung der
+      "HH:MM"-Strings, die ersten 5 (Verhalten vor der Suchplanung)
+    * baseline-ranked: dieselben Anfragen, aber mit `pareto_rank`
+    * planner: `ConnectionSearch` mit Zeitfenstern (`vvs_app.run_searches`)
+
+Gemessen werden Upstream-Aufrufe, übertragene Fahrten und die Übereinstimmung der
+5 angezeigten Verbindungen mit der Referenz (`pareto_rank` über 30 Fahrten je
+Haltestelle direkt aus dem Fahrplanmodell). Liegen Aufzeichnungen mit Start, Ziel und
+Datum im Namen vor (`record_efa.py --trips 12`), werden deren Relationen verwendet.
+
+Aufruf:
+    python benchmarks/bench_planner.py --users 40 --json planner.json
+"""
+
+# Standard-Library Imports
+import os
+import csv
+import random
+import argparse
+
+# Lokale Imports
+from common import BENCH_DIR, load_recordings, write_results
+from efa_sample import Timetable
+from efa_stub import StubConfig, start_stub
+
+LECTURE_TIMES = ['0800', '0815', '0945', '1000', '1215', '1330', '1530', '1700']
+DATES = ['20251201', '20251202', '20251203', '20251204', '20251205']
+
+
+def build_workload(users, seed, timetable):
+    """
+    Erzeugt reproduzierbare Sitzungen: je Benutzer eine Liste von Suchparametern.
+
+    Eine Sitzung besteht aus einer Suche und drei Varianten mit anderem Puffer bzw. der
+    nächsten Vorlesungszeit, jede fünfte Sitzung zusätzlich aus einer Batch-Woche.
+    """
+    import vvs_app
+    rnd = random.Random(seed)
+    recorded = sorted(timetable.recorded)
+    if recorded:
+        campus = {uni['id'] for uni in vvs_app.UNI_STOPS}
+        stops = sorted({o if d in campus else d for o, d, _ in recorded})
+        dates = sorted({date for _, _, date in recorded})
+    else:
+        path = os.path.join(os.path.dirname(BENCH_DIR), 'haltestellen.csv')
+        with open(path, encoding='utf-8-sig') as f:
+            ids = [row['Globale ID'].strip() for row in csv.DictReader(f, delimiter=';')]
+        stops, dates = rnd.sample(ids, min(users, len(ids))), DATES
+
+    sessions = []
+    for _ in range(users):
+        stop, date = rnd.choice(stops), rnd.choice(dates)
+        mode = rnd.choice(['to_uni', 'from_uni'])
+        index = rnd.randrange(len(LECTURE_TIMES) - 1)
+        queries = [(mode, stop, date, LECTURE_TIMES[index], buffer) for buffer in (0, 5, 15)]
+        queries.append((mode, stop, date, LECTURE_TIMES[index + 1], 0))
+        if len(sessions) % 5 == 0:
+            queries += [(mode, stop, day, LECTURE_TIMES[index], 0) for day in dates]
+        sessions.append([vvs_app.build_search_params(*q) for q in queries])
+    return sessions
+
+
+def reference(vvs_app, planner, timetable, all_params):
+    """Die 5 besten Verbindungen über 30 Fahrten je Campus-Haltestelle (Referenz)."""
+    journeys = []
+    for params in all_params:
+        data = {"journeys": timetable.window(params['name_origin'], params['name_destination'], params['itdDate'],
+                                             params['itdTime'], params['itdTripDateTimeDepArr'], 30)}
+        journeys.extend(vvs_app.parse_vvs_data(data))
+    bound = planner.search_bound(all_params[0], timetable.tz)
+    return planner.pareto_rank(journeys, all_params[0]['itdTripDateTimeDepArr'], reference=bound)
+
+
+def run_strategy(name, sessions, config, timetable):
+    """Führt alle Sitzungen mit einer Strategie aus und bewertet die Ergebnisse."""
+    import vvs_app
+    import planner
+    vvs_app.efa_cache.clear()
+    vvs_app.trip_windows.clear()
+    requests_before, trips_before = config.requests, config.trips
+
+    def legacy_loader(params, timeout):
+        key = vvs_app.trip_cache_key(params)
+        return vvs_app.efa_cache.get_or_load(key, lambda: vvs_app.fetch_vvs_trips(params, timeout))
+
+    searches = exact = overlap = duplicates = 0
+    for session in sessions:
+        for all_params in session:
+            deparr = all_params[0]['itdTripDateTimeDepArr']
+            if name == 'planner':
+                search = vvs_app.run_searches([vvs_app.new_search(all_params)])[0]
+                shown = search.journeys()
+            else:
+                results = [j for o in vvs_app.run_trip_queries(all_params, legacy_loader) if o for j in o]
+                if name == 'baseline':
+                    results.sort(key=lambda x: x[planner._time_field(deparr)], reverse=deparr == 'arr')
+                    shown = results[:5]
+                else:
+                    shown = planner.pareto_rank(results, deparr,
+                                                reference=planner.search_bound(all_params[0], timetable.tz))
+            truth = [planner.journey_identity(j) for j in reference(vvs_app, planner, timetable, all_params)]
+            ids = [planner.journey_identity(j) for j in shown]
+            searches += 1
+            exact += ids == truth
+            overlap += len(set(ids) & set(truth)) / max(1, len(truth))
+            duplicates += len(ids) - len(set(ids))
+
+    return {
+        "strategy": name,
+        "searches": searches,
+        "upstream_calls": config.requests - requests_before,
+        "trips_transferred": config.trips - trips_before,
+        "exact_match": round(exact / searches, 4),
+        "overlap_at_5": round(overlap / searches, 4),
+        "duplicates_shown": duplicates
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vergleicht die Suchplanung mit einer Anfrage je Haltestelle.")
+    parser.add_argument('--users', type=int, default=40, help="Anzahl simulierter Sitzungen")
+    parser.add_argument('--strategies', default='baseline,baseline-ranked,planner')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Ergebnisse zusätzlich als JSON-Datei schreiben")
+    args = parser.parse_args()
+
+    timetable = Timetable(load_recordings())
+    config = StubConfig(seed=args.seed, timetable=timetable)
+    stub = start_stub(config=config)
+    os.environ['VVS_BASE_URL'] = f"http://127.0.0.1:{stub.server_address[1]}/mngvvs"
+
+    sessions = build_workload(args.users, args.seed, timetable)
+    results = []
+    for name in args.strategies.split(','):
+        r = run_strategy(name, sessions, config, timetable)
+        results.append(r)
+        print(f"{name:<16} {r['searches']:>5} Suchen {r['upstream_calls']:>6} Aufrufe {r['trips_transferred']:>7} Fahrten"
+              f"  exakt {r['exact_match']:>6.1%}  Überlappung@5 {r['overlap_at_5']:>6.1%}"
+              f"  Duplikate {r['duplicates_shown']:>4}")
+    if args.json:
+        write_results(args.json, {"benchmark": "planner", "results": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Campus VVS Navigator - Benchmark und Gegenprobe des Offline-Routers (GTFS/RAPTOR)
+
+Lädt einen GTFS-Feed in `raptor.GtfsRouter` und misst Ladezeit, Speicherbedarf der
+Arrays und die Antwortzeit von to_uni/from_uni-Suchen mit denselben Parametern wie
+`/api/connections`. Ohne `--gtfs` wird der synthetische Feed aus `gtfs_sample.py`
+verwendet.
+
+Mit `--check` werden die früheste Ankunft jeder Abfahrtssuche bzw. die späteste Abfahrt
+jeder Ankunftssuche gegen einen unabhängigen Connection-Scan über alle Fahrten geprüft
+(ohne Umstiegszeit, beliebig viele Umstiege).
+
+Aufruf:
+    python benchmarks/bench_raptor.py --check
+    python benchmarks/bench_raptor.py --gtfs vvs-gtfs.zip --queries 500 --json raptor.json
+"""
+
+# Standard-Library Imports
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# Lokale Imports
+from common import percentile, write_results
+from gtfs_sample import STATIONS, write_feed
+from raptor import GtfsRouter, DAY
+
+CAMPUS = ["de:08111:6072", "de:08111:2196"]
+TIMES = ['0600', '0800', '0945', '1215', '1530', '1730', '2315']
+DATES = ['20251201', '20251203', '20251206', '20251225']
+
+
+def build_params(stop_ids, count, seed):
+    """Reproduzierbare Trip-Parameter (wie `build_search_params`, ohne Zeit-Offset)."""
+    rnd = random.Random(seed)
+    params = []
+    for _ in range(count):
+        user, campus = rnd.choice(stop_ids), rnd.choice(CAMPUS)
+        deparr = rnd.choice(['arr', 'dep'])
+        origin, destination = (user, campus) if deparr == 'arr' else (campus, user)
+        params.append({"name_origin": origin, "name_destination": destination, "itdDate": rnd.choice(DATES),
+                       "itdTime": rnd.choice(TIMES), "itdTripDateTimeDepArr": deparr, "calcNumberOfTrips": 4})
+    return params
+
+
+def connection_scan(router, source, target, date, bound, deparr):
+    """
+    Früheste Ankunft ('dep') bzw. späteste Abfahrt ('arr') in Sekunden per Connection-Scan
+    über alle Fahrten, None ohne Verbindung.
+    """
+    network, day = router.forward, datetime.strptime(date, "%Y%m%d")
+    connections = []
+    for offset in (-1, 0, 1):
+        active = router._active((day + timedelta(days=offset)).strftime("%Y%m%d"))
+        for pattern in range(len(network.stop_start) - 1):
+            stations = network.stops[network.stop_start[pattern]:network.stop_start[pattern + 1]]
+            for trip in range(network.trip_start[pattern], network.trip_start[pattern + 1]):
+                if not active[network.trip_service[trip]]:
+                    continue
+                row = network.time_start[pattern] + (trip - network.trip_start[pattern]) * len(stations)
+                for i in range(len(stations) - 1):
+                    connections.append((network.dep[row + i] + offset * DAY, network.arr[row + i + 1] + offset * DAY,
+                                        stations[i], stations[i + 1], (offset, trip)))
+    if deparr == 'arr':
+        # Rückwärts: Zeiten negieren, Richtung und Fußwege umkehren
+        connections = [(-arr, -dep, destination, origin, trip) for dep, arr, origin, destination, trip in connections]
+        network, source, target, bound = router.backward, target, source, -bound
+    connections.sort()
+    # Fußwege nur von Fahrt-Ankünften aus (keine Ketten), daher getrennte Ankunftsmarken
+    label, arrived, boarded = {source: bound}, {source: bound}, set()
+
+    def walk(station):
+        for j in range(network.foot_start[station], network.foot_start[station + 1]):
+            other, t = network.foot_to[j], arrived[station] + network.foot_seconds[j]
+            if t < label.get(other, float('inf')):
+                label[other] = t
+
+    walk(source)
+    for dep, arr, origin, destination, trip in connections:
+        if trip in boarded or label.get(origin, float('inf')) <= dep:
+            boarded.add(trip)
+            if arr < arrived.get(destination, float('inf')):
+                arrived[destination] = arr
+                label[destination] = min(arr, label.get(destination, float('inf')))
+                walk(destination)
+    if target not in label:
+        return None
+    return -label[target] if deparr == 'arr' else label[target]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des Offline-Routers (GTFS/RAPTOR).")
+    parser.add_argument('--gtfs', help="GTFS-Feed (ZIP oder Verzeichnis), sonst synthetischer Feed")
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--check', action='store_true', help="Gegenprobe per Connection-Scan")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Ergebnisse zusätzlich als JSON-Datei schreiben")
+    args = parser.parse_args()
+
+    tz = ZoneInfo('Europe/Berlin')
+    path = args.gtfs
+    if not path:
+        path = tempfile.mkdtemp(prefix='gtfs-sample-')
+        write_feed(path)
+    start = time.perf_counter()
+    router = GtfsRouter(path, tz)
+    load_s = time.perf_counter() - start
+    stop_ids = [s for s in (STATIONS if not args.gtfs else router.station_ids) if s not in CAMPUS]
+    print(f"Geladen in {load_s:.2f} s: {router.stats()}")
+
+    latencies, found = [], 0
+    for params in build_params(stop_ids, args.queries, args.seed):
+        start = time.perf_counter()
+        journeys = router.trips(params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += bool(journeys)
+    latencies.sort()
+    result = {"name": "raptor.trips", "queries": len(latencies), "with_journeys": found,
+              "load_s": round(load_s, 3), "bytes": router.stats()["bytes"],
+              "ms": {"p50": round(percentile(latencies, 50), 3), "p95": round(percentile(latencies, 95), 3),
+                     "max": round(latencies[-1], 3)}}
+    print(f"{result['queries']} Suchen ({found} mit Ergebnis): p50 {result['ms']['p50']:.2f} ms"
+          f"  p95 {result['ms']['p95']:.2f} ms  max {result['ms']['max']:.2f} ms")
+
+    if args.check:
+        reference = GtfsRouter(path, tz, change_time=0, max_transfers=8)
+        checked = mismatches = 0
+        for params in build_params(stop_ids, min(args.queries, 200), args.seed + 1):
+            source = reference.station_index.get(params['name_origin'])
+            target = reference.station_index.get(params['name_destination'])
+            if source is None or target is None:
+                continue
+            deparr = params['itdTripDateTimeDepArr']
+            bound = int(params['itdTime'][:2]) * 3600 + int(params['itdTime'][2:]) * 60
+            expected = connection_scan(reference, source, target, params['itdDate'], bound, deparr)
+            journeys = reference.trips({**params, "calcNumberOfTrips": 1})
+            day = datetime.strptime(params['itdDate'], "%Y%m%d")
+            want = reference._moment(day, expected).strftime("%H:%M") if expected is not None else None
+            got = (journeys[0]['dep'] if deparr == 'arr' else journeys[0]['arr']) if journeys else None
+            checked += 1
+            if want != got:
+                mismatches += 1
+                print(f"Abweichung {params['name_origin']} -> {params['name_destination']} "
+                      f"{params['itdDate']} {params['itdTime']} {deparr}: RAPTOR {got}, Scan {want}")
+        result["check"] = {"checked": checked, "mismatches": mismatches}
+        print(f"Gegenprobe: {checked} Suchen, {mismatches} Abweichungen")
+
+    if args.json:
+        write_results(args.json, {"benchmark": "raptor", "results": [result]})
+
+
+if __name__ == '__main__':
+    main()
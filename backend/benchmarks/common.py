@@ -0,0 +1,88 @@
+"""
+Campus VVS Navigator - Gemeinsame Hilfsfunktionen der Benchmarks
+
+Stellt den Import des Backends (`vvs_app`) aus dem Benchmark-Verzeichnis sicher und
+lädt aufgezeichnete EFA-Antworten aus `benchmarks/recordings/`. Liegen keine
+Aufzeichnungen vor, werden synthetische Antworten aus `efa_sample` verwendet.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import os
+import sys
+import json
+import glob
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORDINGS_DIR = os.path.join(BENCH_DIR, 'recordings')
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+# Keine Hintergrund-Vorberechnung in Benchmarks (braucht eine Datenbank)
+os.environ.setdefault('PRECOMPUTE_INTERVAL', '0')
+
+# Lokale Imports
+import efa_sample  # noqa: E402
+
+
+def load_recordings():
+    """
+    Lädt alle aufgezeichneten EFA-Trip-Antworten als Rohdaten.
+
+    Returns:
+        list[tuple[str, bytes]]: Paare aus Name und JSON-Rohdaten. Ohne Aufzeichnungen
+            drei synthetische Antworten unterschiedlicher Größe.
+    """
+    recordings = []
+    for path in sorted(glob.glob(os.path.join(RECORDINGS_DIR, '*.json'))):
+        with open(path, 'rb') as f:
+            recordings.append((os.path.basename(path), f.read()))
+    if not recordings:
+        for name, journeys, legs in (('synthetic-small', 2, 1), ('synthetic-4x3', 4, 3),
+                                     ('synthetic-6x5', 6, 5)):
+            data = efa_sample.build_trip_response(seed=len(recordings), journeys=journeys, legs=legs)
+            recordings.append((name, json.dumps(data).encode('utf-8')))
+    return recordings
+
+
+def percentile(sorted_values, p):
+    """
+    Liefert das p-Perzentil (Nearest-Rank) einer aufsteigend sortierten Liste.
+
+    Beispiele:
+        >>> percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 95)
+        10
+        >>> percentile([1, 2, 3, 4], 50)
+        2
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, results):
+    """
+    Schreibt Benchmark-Ergebnisse als JSON (für den Vergleich zwischen Commits).
+
+    Ergänzt die Ergebnisse um Metadaten ('commit', 'python', 'timestamp'), damit
+    `compare.py` Läufe verschiedener Commits gegenüberstellen kann.
+    """
+    document = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        **results
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
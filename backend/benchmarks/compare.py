@@ -0,0 +1,67 @@
+"""
+Campus VVS Navigator - Vergleich zweier Benchmark-Läufe
+
+Stellt zwei JSON-Ergebnisdateien (z. B. vor und nach einem Commit) gegenüber und
+markiert Verschlechterungen oberhalb einer Schwelle.
+
+Aufruf:
+    python benchmarks/compare.py alt.json neu.json [--threshold 10]
+"""
+
+# Standard-Library Imports
+import json
+import argparse
+
+
+def _metrics(document):
+    """Flacht die Ergebnisse zu {metrik: wert} ab (kleiner ist besser)."""
+    metrics = {}
+    for r in document.get("results", []):
+        if "latency_ms" in r:
+            for p, v in r["latency_ms"].items():
+                metrics[f"{r['endpoint']}.{p}_ms"] = v
+        elif "us_per_call" in r:
+            metrics[f"{r['name']}.us"] = r["us_per_call"]
+        elif "upstream_calls" in r:
+            metrics[f"{r['strategy']}.upstream_calls"] = r["upstream_calls"]
+            metrics[f"{r['strategy']}.trips"] = r["trips_transferred"]
+            metrics[f"{r['strategy']}.mismatch"] = round(1 - r["exact_match"], 4)
+        elif "load_s" in r:
+            for p, v in r["ms"].items():
+                metrics[f"{r['name']}.{p}_ms"] = v
+            metrics[f"{r['name']}.load_s"] = r["load_s"]
+            metrics[f"{r['name']}.bytes"] = r["bytes"]
+        else:
+            for variant in ("full", "stream"):
+                if variant in r:
+                    metrics[f"{r['name']}.{variant}_ms"] = r[variant]["ms"]
+                    metrics[f"{r['name']}.{variant}_kib"] = r[variant]["peak_kib"]
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vergleicht zwei Benchmark-Ergebnisdateien.")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0, help="Regressionsschwelle in Prozent")
+    args = parser.parse_args()
+
+    with open(args.old, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+    old_metrics, new_metrics = _metrics(old), _metrics(new)
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    regressions = 0
+    for key in sorted(old_metrics.keys() & new_metrics.keys()):
+        before, after = old_metrics[key], new_metrics[key]
+        change = (after - before) / before * 100 if before else 0.0
+        flag = "REGRESSION" if change > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{key:<55} {before:>12.3f} {after:>12.3f} {change:>+8.1f}% {flag}")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
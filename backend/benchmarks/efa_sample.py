@@ -0,0 +1,284 @@
+"""
+Campus VVS Navigator - Synthetische EFA-Antworten
+
+Erzeugt deterministische `XML_TRIP_REQUEST2`-Antworten im rapidJSON-Format, deren
+Struktur und Umfang (Koordinaten, Haltfolgen, Infos, Fußwege) echten EFA-Antworten
+mit `outputOptionsActive`/`descWithElev` entsprechen. Sie dienen als Fallback für die
+Benchmarks, wenn keine aufgezeichneten Antworten unter `benchmarks/recordings/` liegen.
+
+`Timetable` beantwortet Trip-Anfragen wie die EFA abhängig von Suchzeit, Richtung und
+`calcNumberOfTrips` (aus Aufzeichnungen oder einem synthetischen Taktfahrplan) und
+dient dem Vergleich der Suchplanung (`bench_planner.py`).
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import re
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+LINES = ["U1", "U2", "U4", "U9", "U14", "U34", "S1", "S2", "S3", "42", "43", "44"]
+STOPS = ["Rosenberg-/Seidenstraße", "Linden-Museum", "Hauptbahnhof (tief)", "Stadtmitte",
+         "Charlottenplatz", "Berliner Platz (Liederhalle)", "Schlossplatz", "Vaihingen Bf",
+         "Feuersee", "Schwabstraße", "Marienplatz", "Bad Cannstatt Wilhelmsplatz"]
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _point(rnd, name, stop_id, dep, arr):
+    return {
+        "isGlobalId": True,
+        "id": stop_id,
+        "name": name,
+        "disassembledName": name.split(" (")[0],
+        "type": "stop",
+        "pointType": "PLATFORM",
+        "coord": [48.78 + rnd.random() / 10, 9.17 + rnd.random() / 10],
+        "niveau": 0,
+        "parent": {"id": stop_id.rsplit(":", 1)[0], "name": "Stuttgart", "type": "locality",
+                   "parent": {"id": "de:08111", "name": "Stuttgart", "type": "locality"}},
+        "productClasses": [1, 3, 5],
+        "departureTimePlanned": _iso(dep),
+        "departureTimeEstimated": _iso(dep + timedelta(minutes=rnd.choice([0, 0, 1, 2]))),
+        "arrivalTimePlanned": _iso(arr),
+        "arrivalTimeEstimated": _iso(arr + timedelta(minutes=rnd.choice([0, 0, 1, 3]))),
+        "properties": {"platform": str(rnd.randint(1, 4)), "platformName": "Bstg. 1",
+                       "zone": "1", "areaGid": stop_id + ":1", "area": "1"}
+    }
+
+
+def _leg(rnd, start, minutes, walk=False):
+    end = start + timedelta(minutes=minutes)
+    origin = _point(rnd, rnd.choice(STOPS), f"de:08111:{rnd.randint(1, 9999)}", start, start)
+    destination = _point(rnd, rnd.choice(STOPS), f"de:08111:{rnd.randint(1, 9999)}", end, end)
+    leg = {
+        "duration": minutes * 60,
+        "isRealtimeControlled": True,
+        "origin": origin,
+        "destination": destination,
+        "coords": [[48.7 + rnd.random() / 10, 9.1 + rnd.random() / 10] for _ in range(minutes * 25)],
+        "properties": {"vehicleAccess": ["LEVEL_ENTRY"], "PlanLowFloorVehicle": "1"}
+    }
+    if walk:
+        leg["transportation"] = {"product": {"class": 100, "name": "Fussweg", "iconId": 100}}
+        leg["footPathInfo"] = [{"position": "IDEST", "duration": minutes * 60,
+                                "footPathElem": [{"description": "Treppe", "type": "LEVEL",
+                                                  "levelFrom": 0, "levelTo": 0} for _ in range(4)]}]
+        leg["interchange"] = {"desc": "Fussweg", "type": 100,
+                              "coords": [[48.7 + rnd.random(), 9.1 + rnd.random()] for _ in range(40)]}
+    else:
+        line = rnd.choice(LINES)
+        leg["transportation"] = {
+            "id": f"vvs:1{line}: :H:j25", "name": f"Stadtbahn {line}", "disassembledName": line,
+            "number": line, "description": "Vaihingen - Fellbach",
+            "product": {"id": 2, "class": 3, "name": "Stadtbahn", "iconId": 3},
+            "operator": {"code": "SSB", "id": "SSB", "name": "SSB"},
+            "destination": {"id": "5000082", "name": "Fellbach Lutherkirche", "type": "stop"},
+            "properties": {"trainNumber": str(rnd.randint(1000, 9999)), "tripCode": rnd.randint(1, 999),
+                           "lineDisplay": "LINE", "globalId": f"de:vvs:1{line}_:"}
+        }
+        leg["stopSequence"] = [_point(rnd, rnd.choice(STOPS), f"de:08111:{rnd.randint(1, 9999)}",
+                                      start + timedelta(minutes=i), start + timedelta(minutes=i))
+                               for i in range(minutes + 2)]
+        leg["infos"] = [{"priority": "normal", "id": f"ems-{rnd.randint(1, 99999)}", "version": 3,
+                         "urlText": "Bauarbeiten", "content": "Wegen Bauarbeiten " * 20,
+                         "subtitle": "Einschränkungen", "properties": {"publisher": "SSB"}}]
+        leg["realtimeStatus"] = ["MONITORED"]
+    return leg, end
+
+
+def build_trip_response(seed=0, journeys=4, legs=3, base=datetime(2025, 12, 1, 7, 30)):
+    """
+    Erzeugt eine synthetische EFA-Trip-Antwort.
+
+    Args:
+        seed (int): Startwert des Zufallsgenerators (gleicher Seed -> gleiche Antwort).
+        journeys (int): Anzahl der Fahrten (entspricht `calcNumberOfTrips`).
+        legs (int): Anzahl der Teilstrecken pro Fahrt (Fußwege eingeschlossen).
+        base (datetime): Abfahrtszeit der ersten Fahrt.
+
+    Returns:
+        dict: Antwort im rapidJSON-Format mit dem Key 'journeys'.
+    """
+    rnd = random.Random(seed)
+    result = {"version": "10.2.10.139", "systemMessages": [],
+              "serverInfo": {"controllerVersion": "10.2.10.139", "serverID": "efa-bench",
+                             "virtDir": "mngvvs", "serverTime": _iso(base), "calcTime": 123.4},
+              "journeys": []}
+    for j in range(journeys):
+        start = base + timedelta(minutes=10 * j)
+        journey_legs, t = [], start
+        for k in range(legs):
+            leg, t = _leg(rnd, t, rnd.randint(3, 14), walk=(k % 2 == 1))
+            journey_legs.append(leg)
+        result["journeys"].append({
+            "rating": 0, "isAdditional": False, "interchanges": legs // 2,
+            "legs": journey_legs,
+            "fare": {"tickets": [{"id": f"T{i}", "name": "Einzelticket", "priceBrutto": 3.3,
+                                  "properties": {"riderCategoryName": "Erwachsene"}} for i in range(6)]},
+            "daysOfService": {"rvb": "1" * 200}
+        })
+    return result
+
+
+def build_departure_response(stop_id, seed=0, departures=10, base=None):
+    """
+    Erzeugt eine synthetische Antwort des EFA-Abfahrtsmonitors (`XML_DM_REQUEST`).
+
+    Args:
+        stop_id (str): Die abgefragte Haltestelle (bestimmt Linien und Takt).
+        seed (int): Startwert für die Verspätungen (neuer Seed -> geänderte Prognosen).
+        departures (int): Anzahl der Abfahrten (entspricht `limit`).
+        base (datetime, optional): Ausgangszeitpunkt in UTC (Standard: jetzt).
+
+    Returns:
+        dict: Antwort im rapidJSON-Format mit dem Key 'stopEvents'.
+    """
+    base = (base or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+    plan = random.Random(stop_id)
+    delays = random.Random(f"{stop_id}|{seed}")
+    lines = plan.sample(LINES, 4)
+    events = []
+    for i in range(departures):
+        line = lines[i % len(lines)]
+        dep = base + timedelta(minutes=1 + 3 * i + plan.randint(0, 2))
+        events.append({
+            "isRealtimeControlled": True,
+            "location": {"id": stop_id, "name": plan.choice(STOPS), "type": "platform",
+                         "properties": {"platform": str(plan.randint(1, 4)), "stopId": stop_id}},
+            "departureTimePlanned": _iso(dep),
+            "departureTimeEstimated": _iso(dep + timedelta(minutes=delays.choice([0, 0, 0, 1, 2, 4]))),
+            "transportation": {
+                "id": f"vvs:1{line}: :H:j25", "name": f"Stadtbahn {line}", "disassembledName": line,
+                "number": line, "product": {"id": 2, "class": 3, "name": "Stadtbahn", "iconId": 3},
+                "destination": {"id": "5000082", "name": plan.choice(STOPS), "type": "stop"}
+            }
+        })
+    return {"version": "10.2.10.139", "systemMessages": [], "locations": [], "stopEvents": events}
+
+
+# Dateinamen von `record_efa.py`: <mode>_<origin>_<destination>_<YYYYMMDDHHMM>.json
+_RECORDING_NAME = re.compile(r'^(?:to_uni|from_uni)_(.+?)_(.+?)_(\d{8})\d{4}\.json$')
+
+
+def _parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def _journey_times(journey):
+    """Abfahrt und Ankunft einer EFA-Fahrt in UTC (wie `parse_vvs_journey`: Echtzeit vor Plan)."""
+    first, last = journey['legs'][0], journey['legs'][-1]
+    dep = (first.get('departureTimeEstimated') or first.get('departureTimePlanned') or
+           first['origin'].get('departureTimeEstimated') or first['origin'].get('departureTimePlanned'))
+    arr = (last.get('arrivalTimeEstimated') or last.get('arrivalTimePlanned') or
+           last['destination'].get('arrivalTimeEstimated') or last['destination'].get('arrivalTimePlanned'))
+    return _parse_iso(dep), _parse_iso(arr)
+
+
+def _timetable_journey(rnd, route, dep, origin, destination):
+    """Eine synthetische Fahrt einer Taktlinie (leichtgewichtig, aber parserkompatibel)."""
+    legs, t = [], dep
+    names = [origin] + [rnd.choice(STOPS) for _ in range(route['interchanges'])] + [destination]
+    parts = len(names) - 1
+    for i in range(parts):
+        minutes = route['duration'] // parts if i < parts - 1 else route['duration'] - (route['duration'] // parts) * i
+        end = t + timedelta(minutes=minutes)
+        legs.append({
+            "duration": minutes * 60,
+            "origin": {"name": names[i], "departureTimePlanned": _iso(t)},
+            "destination": {"name": names[i + 1], "arrivalTimePlanned": _iso(end)},
+            "transportation": {"number": route['lines'][i], "product": {"class": 3, "name": "Stadtbahn"}}
+        })
+        t = end
+    return {"duration": route['duration'] * 60, "interchanges": route['interchanges'], "legs": legs}
+
+
+class Timetable:
+    """
+    Fahrplanmodell, das Trip-Anfragen wie die EFA beantwortet.
+
+    Eine Ankunftssuche ('arr') liefert die `calcNumberOfTrips` spätesten Fahrten mit
+    Ankunft <= Suchzeit, eine Abfahrtssuche ('dep') die frühesten mit Abfahrt >= Suchzeit,
+    jeweils chronologisch sortiert.
+
+    Relationen aus Aufzeichnungen (`record_efa.py`, Dateiname mit Start, Ziel und Datum)
+    werden nur aus den aufgezeichneten Fahrten beantwortet, alle übrigen aus einem
+    deterministischen Taktfahrplan (2-3 Linien je Relation, 5 bis 24 Uhr).
+
+    Args:
+        recordings (iterable): Paare aus Dateiname und JSON-Rohdaten (`load_recordings`).
+        tz (tzinfo): Zeitzone der Suchzeiten (`itdDate`/`itdTime`).
+    """
+
+    def __init__(self, recordings=(), tz=ZoneInfo('Europe/Berlin')):
+        self.tz = tz
+        self._relations = {}
+        self.recorded = set()
+        for name, raw in recordings:
+            match = _RECORDING_NAME.match(name)
+            if not match:
+                continue
+            origin, destination, date = (g.replace('-', ':') if i < 2 else g for i, g in enumerate(match.groups()))
+            key = (origin, destination, date)
+            journeys = self._relations.setdefault(key, {})
+            for journey in json.loads(raw).get('journeys', []):
+                journeys[_journey_times(journey)] = journey
+            self.recorded.add(key)
+        for key, journeys in self._relations.items():
+            self._relations[key] = sorted(((times, j) for times, j in journeys.items()), key=lambda e: e[0])
+
+    def journeys(self, origin, destination, date):
+        """Alle Fahrten einer Relation an einem Tag als sortierte Liste von ((Abfahrt, Ankunft), Fahrt)."""
+        key = (origin, destination, date)
+        if key not in self._relations:
+            rnd = random.Random(f"{origin}|{destination}|{date}")
+            day = datetime.strptime(date, "%Y%m%d")
+            entries = []
+            for _ in range(rnd.randint(2, 3)):
+                interchanges = rnd.choice([0, 1, 1, 2])
+                route = {"headway": rnd.choice([10, 15, 20, 30]), "duration": rnd.randint(12, 55),
+                         "interchanges": interchanges, "lines": [rnd.choice(LINES) for _ in range(interchanges + 1)]}
+                t = day.replace(hour=5) + timedelta(minutes=rnd.randrange(route['headway']))
+                while t.hour < 24 and t.date() == day.date():
+                    dep = t.replace(tzinfo=self.tz).astimezone(timezone.utc).replace(tzinfo=None)
+                    journey = _timetable_journey(rnd, route, dep, origin, destination)
+                    entries.append((_journey_times(journey), journey))
+                    t += timedelta(minutes=route['headway'])
+            self._relations[key] = sorted(entries, key=lambda e: e[0])
+        return self._relations[key]
+
+    def window(self, origin, destination, date, time, deparr, count):
+        """
+        Die Fahrten, die die EFA für eine Trip-Anfrage liefern würde.
+
+        Returns:
+            list[dict]: Höchstens `count` EFA-Fahrten (chronologisch).
+        """
+        bound = (datetime.strptime(f"{date}{time}", "%Y%m%d%H%M").replace(tzinfo=self.tz)
+                 .astimezone(timezone.utc).replace(tzinfo=None))
+        entries = self.journeys(origin, destination, date)
+        if deparr == 'arr':
+            chosen = sorted((e for e in entries if e[0][1] <= bound), key=lambda e: e[0][1])[-count:]
+        else:
+            chosen = [e for e in entries if e[0][0] >= bound][:count]
+        return [journey for _, journey in sorted(chosen, key=lambda e: e[0])]
+
+    def respond(self, query):
+        """
+        Beantwortet eine Trip-Anfrage.
+
+        Args:
+            query (dict): Die Query-Parameter (Werte als Strings).
+
+        Returns:
+            dict: Antwort im rapidJSON-Format mit dem Key 'journeys'.
+        """
+        return {"version": "10.2.10.139", "systemMessages": [],
+                "journeys": self.window(str(query['name_origin']), str(query['name_destination']),
+                                        str(query['itdDate']), str(query['itdTime']),
+                                        query['itdTripDateTimeDepArr'], int(query['calcNumberOfTrips']))}
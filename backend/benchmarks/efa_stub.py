@@ -0,0 +1,181 @@
+"""
+Campus VVS Navigator - Lokaler Upstream-Stub (VVS EFA & dhbw.app)
+
+Ein kleiner HTTP-Server, der aufgezeichnete `XML_TRIP_REQUEST2`-Antworten aus
+`benchmarks/recordings/` wieder ausspielt (ohne Aufzeichnungen: synthetische Antworten
+aus `efa_sample`). Zusätzlich beantwortet er `XML_DM_REQUEST` mit synthetischen
+Abfahrten (Prognosen ändern sich alle 10 Sekunden) und `/rapla/lectures/<kurs>/events`
+mit einem synthetischen Stundenplan. Mit `--timetable` beantwortet er Trip-Anfragen
+stattdessen wie die EFA abhängig von Suchzeit, Richtung und `calcNumberOfTrips`
+(`efa_sample.Timetable`). So lässt sich das Backend lasttesten, ohne `www3.vvs.de`
+oder `api.dhbw.app` zu belasten.
+
+Das Backend wird über die Umgebungsvariablen auf den Stub umgeleitet:
+    VVS_BASE_URL=http://127.0.0.1:8765/mngvvs DHBW_BASE_URL=http://127.0.0.1:8765
+
+Aufruf:
+    python benchmarks/efa_stub.py --port 8765 --latency 250 --jitter 100 --error-rate 0.02
+"""
+
+# Standard-Library Imports
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lokale Imports
+from common import load_recordings
+from efa_sample import Timetable, build_departure_response
+
+
+class StubConfig:
+    """
+    Laufzeit-Konfiguration des Stubs.
+
+    Args:
+        latency_ms (float): Grundlatenz jeder Antwort in Millisekunden.
+        jitter_ms (float): Zusätzliche, gleichverteilte Zufallslatenz in Millisekunden.
+        error_rate (float): Anteil der Anfragen, die mit HTTP 503 beantwortet werden.
+        hang_rate (float): Anteil der Anfragen, die `hang_s` Sekunden hängen (Timeout-Test).
+        hang_s (float): Dauer einer hängenden Anfrage in Sekunden.
+        seed (int): Startwert für reproduzierbare Latenzen und Fehler.
+        timetable (Timetable, optional): Fahrplanmodell für zeitabhängige Trip-Antworten.
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, hang_rate=0.0, hang_s=30, seed=0,
+                 timetable=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.responses = [raw for _, raw in load_recordings()]
+        self.timetable = timetable
+        self.requests = 0
+        self.trips = 0
+        self.errors = 0
+
+    def next_action(self):
+        """Würfelt Verzögerung und Fehlerart der nächsten Antwort aus (threadsicher)."""
+        with self.lock:
+            self.requests += 1
+            delay = (self.latency_ms + self.random.random() * self.jitter_ms) / 1000
+            roll = self.random.random()
+            if roll < self.error_rate:
+                self.errors += 1
+                return delay, 'error'
+            if roll < self.error_rate + self.hang_rate:
+                return self.hang_s, 'hang'
+            return delay, 'ok'
+
+
+def _timetable(course):
+    """Erzeugt einen deterministischen Stundenplan (2 Wochen, werktags 2 Vorlesungen)."""
+    events, day = [], datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(14):
+        date = day + timedelta(days=offset)
+        if date.weekday() >= 5:
+            continue
+        for start, end in ((8, 12), (13, 16)):
+            events.append({
+                "name": f"{course} Vorlesung {start}",
+                "lecturer": "Stub",
+                "rooms": ["A 1.23"],
+                "startTime": date.replace(hour=start).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "endTime": date.replace(hour=end).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            })
+    return json.dumps(events).encode('utf-8')
+
+
+def make_handler(config):
+    """Erzeugt die Request-Handler-Klasse für eine `StubConfig`."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            delay, action = config.next_action()
+            time.sleep(delay)
+            if action == 'error':
+                return self._send(503, b'{"error": "stub error"}')
+            if url.path.endswith('/XML_TRIP_REQUEST2'):
+                query = parse_qs(url.query)
+                if config.timetable:
+                    data = config.timetable.respond({k: v[0] for k, v in query.items()})
+                    with config.lock:
+                        config.trips += len(data['journeys'])
+                    return self._send(200, json.dumps(data).encode('utf-8'))
+                key = '|'.join(query.get(k, [''])[0] for k in ('name_origin', 'name_destination', 'itdTime'))
+                body = config.responses[sum(key.encode()) % len(config.responses)]
+                return self._send(200, body)
+            if url.path.endswith('/XML_DM_REQUEST'):
+                query = parse_qs(url.query)
+                data = build_departure_response(query.get('name_dm', [''])[0], seed=int(time.time() // 10),
+                                                departures=int(query.get('limit', ['10'])[0]))
+                return self._send(200, json.dumps(data).encode('utf-8'))
+            parts = url.path.strip('/').split('/')
+            if len(parts) == 4 and parts[:2] == ['rapla', 'lectures'] and parts[3] == 'events':
+                return self._send(200, _timetable(parts[2]))
+            return self._send(404, b'{"error": "not found"}')
+
+    return Handler
+
+
+def start_stub(port=0, config=None):
+    """
+    Startet den Stub in einem Hintergrund-Thread.
+
+    Args:
+        port (int): TCP-Port (0 = freien Port wählen).
+        config (StubConfig, optional): Latenz- und Fehlerkonfiguration.
+
+    Returns:
+        ThreadingHTTPServer: Der laufende Server (`server.server_address[1]` ist der Port).
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(config or StubConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler Stub für VVS EFA und dhbw.app.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help="Grundlatenz in ms")
+    parser.add_argument('--jitter', type=float, default=0, help="Zufällige Zusatzlatenz in ms")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Anteil HTTP-503-Antworten")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="Anteil hängender Anfragen")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timetable', action='store_true', help="Trip-Antworten aus dem Fahrplanmodell")
+    args = parser.parse_args()
+
+    timetable = Timetable(load_recordings()) if args.timetable else None
+    config = StubConfig(args.latency, args.jitter, args.error_rate, args.hang_rate, seed=args.seed,
+                        timetable=timetable)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(config))
+    print(f"EFA-Stub läuft auf http://127.0.0.1:{args.port}/mngvvs ({len(config.responses)} Antworten)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Campus VVS Navigator - Synthetischer GTFS-Feed für den Offline-Router
+
+Schreibt einen kleinen, deterministischen GTFS-Feed rund um die Campus-Haltestellen
+(echte globale IDs aus `haltestellen.csv`, Steige als 'de:08111:xxxx:1:n' mit
+`parent_station`). Er enthält alles, was `raptor.GtfsRouter` auswertet:
+    * drei Linien mit Umstieg in Stadtmitte bzw. Berliner Platz und einer Buslinie zum
+      Linden-Museum, werktags im 10-, am Wochenende im 20-Minuten-Takt
+    * Fahrten nach Mitternacht (Zeiten über 24:00:00)
+    * einen Feiertag (`calendar_dates.txt`, 25.12.2025 ohne Werktagsfahrten)
+    * einen Fußweg zwischen Rosenberg-/Seidenstraße und Linden-Museum (`transfers.txt`)
+
+Aufruf:
+    python benchmarks/gtfs_sample.py /tmp/gtfs-sample
+"""
+
+# Standard-Library Imports
+import os
+import csv
+import argparse
+
+STATIONS = {
+    "de:08111:6008": "Universität",
+    "de:08111:6056": "Stadtmitte",
+    "de:08111:6073": "Berliner Platz (Liederhalle)",
+    "de:08111:6072": "Rosenberg-/Seidenstraße",
+    "de:08111:2196": "Linden-Museum",
+    "de:08111:6118": "Hauptbahnhof (tief)",
+    "de:08111:6113": "Pragsattel",
+    "de:08111:2235": "Killesberg",
+    "de:08111:2201": "Libanonstraße",
+    "de:08111:6075": "Charlottenplatz",
+}
+
+# Linie: (Name, Haltfolge, Fahrzeiten zwischen den Halten in Minuten, erster Takt-Offset)
+LINES = [
+    ("S1", ["de:08111:6008", "de:08111:6056", "de:08111:6118", "de:08111:6113"], [12, 3, 5], 0),
+    ("U4", ["de:08111:2201", "de:08111:6075", "de:08111:6056", "de:08111:6073", "de:08111:6072",
+            "de:08111:2235"], [4, 3, 2, 3, 6], 4),
+    ("43", ["de:08111:6118", "de:08111:6073", "de:08111:2196", "de:08111:2235"], [6, 5, 7], 7),
+]
+WALKS = [("de:08111:6072", "de:08111:2196", 360)]
+HOLIDAY = "20251225"
+
+
+def _platform(station, line_index):
+    return f"{station}:1:{line_index + 1}"
+
+
+def _clock(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def write_feed(path):
+    """
+    Schreibt den Feed als entpacktes GTFS-Verzeichnis.
+
+    Args:
+        path (str): Zielverzeichnis (wird angelegt).
+
+    Returns:
+        dict: Anzahl der geschriebenen Zeilen je Tabelle.
+    """
+    os.makedirs(path, exist_ok=True)
+    tables = {name: [] for name in ('agency', 'stops', 'routes', 'trips', 'stop_times', 'calendar',
+                                    'calendar_dates', 'transfers')}
+    tables['agency'].append({"agency_id": "VVS", "agency_name": "VVS", "agency_url": "https://www.vvs.de",
+                             "agency_timezone": "Europe/Berlin"})
+    for station, name in STATIONS.items():
+        tables['stops'].append({"stop_id": station, "stop_name": name, "location_type": "1", "parent_station": ""})
+    for index, (_, stations, _, _) in enumerate(LINES):
+        for station in stations:
+            tables['stops'].append({"stop_id": _platform(station, index), "stop_name": STATIONS[station],
+                                    "location_type": "0", "parent_station": station})
+    tables['calendar'] += [
+        {"service_id": "WK", "monday": "1", "tuesday": "1", "wednesday": "1", "thursday": "1", "friday": "1",
+         "saturday": "0", "sunday": "0", "start_date": "20250901", "end_date": "20261231"},
+        {"service_id": "WE", "monday": "0", "tuesday": "0", "wednesday": "0", "thursday": "0", "friday": "0",
+         "saturday": "1", "sunday": "1", "start_date": "20250901", "end_date": "20261231"},
+    ]
+    tables['calendar_dates'] += [{"service_id": "WK", "date": HOLIDAY, "exception_type": "2"},
+                                 {"service_id": "WE", "date": HOLIDAY, "exception_type": "1"}]
+
+    for index, (line, stations, minutes, offset) in enumerate(LINES):
+        tables['routes'].append({"route_id": line, "agency_id": "VVS", "route_short_name": line,
+                                 "route_type": "3" if line.isdigit() else "1"})
+        for service, headway in (("WK", 10), ("WE", 20)):
+            for direction, sequence, legs in ((0, stations, minutes), (1, stations[::-1], minutes[::-1])):
+                # Betrieb 05:00 bis 25:00 (Fahrten nach Mitternacht gehören zum Vortag)
+                for start in range(5 * 3600 + offset * 60 + direction * 120, 25 * 3600, headway * 60):
+                    trip_id = f"{line}-{service}-{direction}-{start}"
+                    tables['trips'].append({"route_id": line, "service_id": service, "trip_id": trip_id,
+                                            "direction_id": str(direction)})
+                    t = start
+                    for position, station in enumerate(sequence):
+                        if position:
+                            t += legs[position - 1] * 60
+                        dwell = 30 if 0 < position < len(sequence) - 1 else 0
+                        tables['stop_times'].append({"trip_id": trip_id, "arrival_time": _clock(t),
+                                                     "departure_time": _clock(t + dwell),
+                                                     "stop_id": _platform(station, index),
+                                                     "stop_sequence": str(position + 1)})
+                        t += dwell
+    for origin, destination, seconds in WALKS:
+        for a, b in ((origin, destination), (destination, origin)):
+            tables['transfers'].append({"from_stop_id": a, "to_stop_id": b, "transfer_type": "2",
+                                        "min_transfer_time": str(seconds)})
+
+    for name, rows in tables.items():
+        with open(os.path.join(path, f"{name}.txt"), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return {name: len(rows) for name, rows in tables.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schreibt einen synthetischen GTFS-Feed.")
+    parser.add_argument('path', help="Zielverzeichnis")
+    args = parser.parse_args()
+    counts = write_feed(args.path)
+    print(f"GTFS-Feed in {args.path}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
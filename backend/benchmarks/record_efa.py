@@ -0,0 +1,48 @@
+"""
+Campus VVS Navigator - Aufzeichnung echter EFA-Antworten
+
+Fragt die VVS-EFA-Schnittstelle mit denselben Parametern wie `/api/connections` ab und
+speichert die Rohantworten unter `benchmarks/recordings/`. Die Aufzeichnungen werden von
+den Benchmarks und dem EFA-Stub wiederverwendet, sodass danach keine Anfragen an
+`www3.vvs.de` mehr nötig sind.
+
+Aufruf:
+    python benchmarks/record_efa.py --stop de:08111:6008 --date 20251201 --time 0800
+
+Mit `--trips 12` werden tiefere Zeitfenster aufgezeichnet, aus denen der Stub im
+Fahrplanmodus (`--timetable`) auch Folgeanfragen der Suchplanung beantworten kann.
+"""
+
+# Standard-Library Imports
+import os
+import argparse
+
+# Lokale Imports
+from common import RECORDINGS_DIR
+import vvs_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zeichnet EFA-Trip-Antworten auf.")
+    parser.add_argument('--stop', required=True, help="Globale VVS-ID der Benutzer-Haltestelle")
+    parser.add_argument('--date', required=True, help="Datum im Format YYYYMMDD")
+    parser.add_argument('--time', required=True, help="Uhrzeit im Format HHMM")
+    parser.add_argument('--mode', default='to_uni', choices=['to_uni', 'from_uni'])
+    parser.add_argument('--trips', type=int, default=None, help="calcNumberOfTrips (Standard wie das Backend)")
+    args = parser.parse_args()
+
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    for params in vvs_app.build_search_params(args.mode, args.stop, args.date, args.time):
+        if args.trips:
+            params['calcNumberOfTrips'] = args.trips
+        res = vvs_app.vvs_client.get(vvs_app.TRIP_PATH, params=params)
+        res.raise_for_status()
+        name = f"{args.mode}_{params['name_origin']}_{params['name_destination']}_{args.date}{params['itdTime']}"
+        path = os.path.join(RECORDINGS_DIR, name.replace(':', '-') + '.json')
+        with open(path, 'wb') as f:
+            f.write(res.content)
+        print(f"{path} ({len(res.content)} Bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+"""
+Campus VVS Navigator - In-Memory Cache
+
+Dieses Modul stellt einen threadsicheren, größenbeschränkten TTL-Cache bereit, der
+vom Backend vor langsamen Upstream-Aufrufen (z. B. VVS EFA) eingesetzt wird.
+
+Eigenschaften:
+    * TTL: Einträge verfallen nach einer festen Lebensdauer (z. B. wegen Echtzeitdaten).
+    * LRU-Verdrängung: Bei Erreichen von `maxsize` wird der am längsten nicht
+      genutzte Eintrag entfernt.
+    * Single-Flight: Gleichzeitige Anfragen auf denselben Key lösen nur einen
+      einzigen Upstream-Aufruf aus, alle anderen warten auf dessen Ergebnis.
+    * Statistik: Zähler für Treffer (hits), Fehlschläge (misses) und
+      zusammengelegte Anfragen (coalesced) zur Feinjustierung der TTL.
+
+Beide Caches bieten neben der blockierenden API auch Coroutinen (`aget_or_load`,
+`aget`) für den ASGI-Modus; Einträge und Zähler werden dabei gemeinsam genutzt.
+
+Zusätzlich enthält es mit `RevalidatingCache` einen Stale-While-Revalidate-Cache für
+selten veränderliche Daten (z. B. Rapla-Stundenpläne), der veraltete Einträge sofort
+ausliefert und im Hintergrund per ETag/Last-Modified aktualisiert.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+
+class _Flight:
+    """Ein laufender Ladevorgang, auf den weitere Anfragen warten können."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.future = None
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Threadsicherer LRU-Cache mit Ablaufzeit und Request-Coalescing.
+
+    Args:
+        maxsize (int): Maximale Anzahl gespeicherter Einträge.
+        ttl (float): Lebensdauer eines Eintrags in Sekunden.
+
+    Beispiele:
+        >>> cache = TTLCache(maxsize=2, ttl=60)
+        >>> cache.get_or_load('a', lambda: 1)
+        1
+        >>> cache.stats()['misses']
+        1
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_load(self, key, loader):
+        """
+        Liefert den gecachten Wert zu `key` oder lädt ihn über `loader`.
+
+        Läuft für denselben Key bereits ein Ladevorgang, wird auf dessen Ergebnis
+        gewartet, statt einen zweiten Upstream-Aufruf zu starten. Fehler des Loaders
+        werden an alle Wartenden weitergereicht und nicht gecacht.
+
+        Args:
+            key (hashable): Der normalisierte Cache-Key.
+            loader (callable): Funktion ohne Argumente, die den Wert erzeugt.
+
+        Returns:
+            Any: Der gecachte oder frisch geladene Wert.
+
+        Raises:
+            Exception: Jede vom Loader ausgelöste Exception.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            self.set(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    async def aget_or_load(self, key, loader):
+        """
+        Asynchrone Variante von `get_or_load` für den ASGI-Modus.
+
+        Args:
+            key (hashable): Der normalisierte Cache-Key.
+            loader (callable): Funktion ohne Argumente, die eine Coroutine liefert.
+
+        Returns:
+            Any: Der gecachte oder frisch geladene Wert.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                flight.future = asyncio.get_running_loop().create_future()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            future = flight.future
+            if future is None:
+                # Ladevorgang eines Threads: ohne den Event-Loop zu blockieren warten
+                await asyncio.to_thread(flight.event.wait)
+            else:
+                await asyncio.shield(future)
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = await loader()
+            self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            # Auch Abbrüche (Deadline) an die Wartenden weiterreichen
+            flight.error = e if isinstance(e, Exception) else RuntimeError("Ladevorgang abgebrochen")
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+            if not flight.future.done():
+                flight.future.set_result(None)
+
+    def set(self, key, value):
+        """Speichert `value` unter `key` und verdrängt ggf. den ältesten Eintrag."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Entfernt einen einzelnen Eintrag aus dem Cache (falls vorhanden)."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Leert den Cache vollständig (Zähler bleiben erhalten)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Gibt die aktuellen Cache-Kennzahlen zurück.
+
+        Returns:
+            dict: 'size', 'maxsize', 'ttl', 'hits', 'misses', 'coalesced' und 'hit_ratio'.
+        """
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round((self.hits + self.coalesced) / total, 4) if total else 0.0
+            }
+
+
+class RevalidatingCache:
+    """
+    LRU-Cache mit Stale-While-Revalidate-Verhalten für langsam veränderliche Upstream-Daten.
+
+    Ein Eintrag besteht aus dem Wert und den HTTP-Validatoren ('etag', 'last_modified').
+    Nach Ablauf der TTL wird der gespeicherte Wert sofort weiter ausgeliefert und im
+    Hintergrund aktualisiert. Schlägt die Aktualisierung fehl, bleibt der alte Wert
+    erhalten (stale-if-error).
+
+    Args:
+        maxsize (int): Maximale Anzahl gespeicherter Einträge (LRU-Verdrängung).
+        ttl (float): Zeit in Sekunden, nach der ein Eintrag aktualisiert wird.
+        executor (concurrent.futures.Executor): Executor für Hintergrund-Aktualisierungen.
+    """
+
+    def __init__(self, maxsize, ttl, executor):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.executor = executor
+        self._data = OrderedDict()
+        self._refreshing = set()
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.refresh_errors = 0
+
+    def get(self, key, fetch):
+        """
+        Liefert den Wert zu `key` und den Cache-Status.
+
+        Args:
+            key (hashable): Der Cache-Key (z. B. die Kursbezeichnung).
+            fetch (callable): Funktion `fetch(entry)`, die mit dem bisherigen Eintrag
+                (oder None) aufgerufen wird und ein Tupel `(value, etag, last_modified)`
+                zurückgibt. Für eine bedingte Anfrage kann sie die Validatoren des
+                Eintrags nutzen und bei "304 Not Modified" `entry['value']` zurückgeben.
+
+        Returns:
+            tuple: `(value, status)` mit status 'HIT', 'STALE' oder 'MISS'.
+
+        Raises:
+            Exception: Nur bei einem Cache-Miss, wenn `fetch` fehlschlägt.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                if time.monotonic() - entry['fetched_at'] < self.ttl:
+                    self.hits += 1
+                    return entry['value'], 'HIT'
+                self.stale += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self.executor.submit(self._refresh, key, entry, fetch)
+                return entry['value'], 'STALE'
+            self.misses += 1
+
+        result = fetch(None)
+        self._store(key, result)
+        return result[0], 'MISS'
+
+    async def aget(self, key, fetch):
+        """
+        Asynchrone Variante von `get` für den ASGI-Modus.
+
+        Args:
+            key (hashable): Der Cache-Key.
+            fetch (callable): Coroutinen-Funktion `fetch(entry)` mit derselben Semantik wie bei `get`.
+
+        Returns:
+            tuple: `(value, status)` mit status 'HIT', 'STALE' oder 'MISS'.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                if time.monotonic() - entry['fetched_at'] < self.ttl:
+                    self.hits += 1
+                    return entry['value'], 'HIT'
+                self.stale += 1
+                refresh = key not in self._refreshing
+                if refresh:
+                    self._refreshing.add(key)
+            else:
+                self.misses += 1
+        if entry is not None:
+            if refresh:
+                task = asyncio.create_task(self._arefresh(key, entry, fetch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return entry['value'], 'STALE'
+
+        result = await fetch(None)
+        self._store(key, result)
+        return result[0], 'MISS'
+
+    async def _arefresh(self, key, entry, fetch):
+        try:
+            self._store(key, await fetch(entry))
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            print(f"Fehler Cache-Refresh ({key}): {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh(self, key, entry, fetch):
+        try:
+            self._store(key, fetch(entry))
+        except Exception as e:
+            # Upstream nicht erreichbar: veralteten Eintrag weiter ausliefern
+            with self._lock:
+                self.refresh_errors += 1
+            print(f"Fehler Cache-Refresh ({key}): {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, result):
+        value, etag, last_modified = result
+        with self._lock:
+            self._data[key] = {
+                "value": value,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.monotonic()
+            }
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Entfernt einen einzelnen Eintrag aus dem Cache (falls vorhanden)."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self):
+        """
+        Gibt die aktuellen Cache-Kennzahlen zurück.
+
+        Returns:
+            dict: 'size', 'maxsize', 'ttl', 'hits', 'stale', 'misses' und 'refresh_errors'.
+        """
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "stale": self.stale,
+                "misses": self.misses,
+                "refresh_errors": self.refresh_errors
+            }
@@ -0,0 +1,340 @@
+"""
+Campus VVS Navigator - Vorberechnung von Pendelverbindungen
+
+Dieses Modul berechnet im Hintergrund für alle aktiven Profile (Stundenplan-Link und
+Heimat-Haltestelle gesetzt) die An- und Abreiseverbindungen der nächsten Vorlesungstage
+vor und legt sie in der Tabelle `commute_suggestions` ab (Schema siehe
+`migrations/003_commute_suggestions.sql`). `stundenplan.html` lädt diese
+Vorschläge mit einem einzigen Lesezugriff, statt bei jedem Aufruf neu zu suchen.
+
+Ablauf eines Laufs:
+    1. Aktive Profile laden und nach Kurs gruppieren.
+    2. Vorlesungen je Kurs genau einmal laden (über den Stundenplan-Cache).
+    3. Pro Vorlesungstag die Suchen wie im Frontend bilden (erste Vorlesung -> 'to_uni'
+       mit Puffer + 10 Minuten, letzte Vorlesung -> 'from_uni' mit 10 Minuten).
+    4. Suchen überspringen, deren Ergebnis für alle betroffenen Nutzer schon gespeichert
+       und jünger als `max_age` ist. Die übrigen identischen Suchen von Nutzern mit
+       gleicher Heimat-Haltestelle nur einmal ausführen; je Kurs und Kalendertag begrenzt
+       `course_daily_limit` die Anzahl dieser neuen Upstream-Suchen.
+    5. Ergebnisse pro Nutzer speichern. Gelöscht werden nur Einträge, die zu keiner
+       gewünschten Suche mehr passen (Vorlesung entfallen oder verschoben), und vergangene
+       Tage; Suchen, die wegen des Budgets oder eines Fehlers nicht liefen, behalten ihren
+       bisherigen Stand.
+
+Über ein PostgreSQL-Advisory-Lock läuft auch bei mehreren Prozessen (z. B. Uvicorn-Worker)
+immer nur eine Vorberechnung gleichzeitig.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import json
+import time
+import threading
+from datetime import datetime, date
+
+# Third-Party Imports
+from psycopg2.extras import RealDictCursor
+
+# Schlüssel des Advisory-Locks ("VVS1")
+LOCK_KEY = 0x56565331
+
+SQL_ACTIVE_PROFILES = """SELECT username, timetable_link, home_stop_id, buffer_time FROM user_profiles
+                         WHERE COALESCE(timetable_link, '') <> '' AND COALESCE(home_stop_id, '') <> ''"""
+SQL_SUGGESTIONS_SELECT = """SELECT to_char(travel_date, 'YYYYMMDD') AS date, mode, search_time AS time,
+                                   buffer, home_stop_id, journeys, computed_at
+                            FROM commute_suggestions
+                            WHERE username = %s AND travel_date >= CURRENT_DATE
+                            ORDER BY travel_date, mode DESC"""
+SQL_SUGGESTIONS_EXISTING = """SELECT username, to_char(travel_date, 'YYYYMMDD') AS date, mode, search_time AS time,
+                                     buffer, home_stop_id, computed_at > now() - make_interval(secs => %s) AS fresh
+                              FROM commute_suggestions
+                              WHERE username = ANY(%s) AND travel_date >= CURRENT_DATE"""
+SQL_SUGGESTIONS_DELETE_USERS = "DELETE FROM commute_suggestions WHERE username = ANY(%s)"
+SQL_SUGGESTIONS_DELETE_ONE = """DELETE FROM commute_suggestions
+                                WHERE username = %s AND travel_date = to_date(%s, 'YYYYMMDD') AND mode = %s"""
+SQL_SUGGESTIONS_DELETE_PAST = "DELETE FROM commute_suggestions WHERE travel_date < CURRENT_DATE"
+SQL_SUGGESTIONS_INSERT = """INSERT INTO commute_suggestions
+                            (username, travel_date, mode, search_time, buffer, home_stop_id, journeys)
+                            VALUES (%s, to_date(%s, 'YYYYMMDD'), %s, %s, %s, %s, %s::jsonb)
+                            ON CONFLICT (username, travel_date, mode) DO UPDATE SET
+                            search_time=EXCLUDED.search_time, buffer=EXCLUDED.buffer,
+                            home_stop_id=EXCLUDED.home_stop_id, journeys=EXCLUDED.journeys,
+                            computed_at=now()"""
+
+
+def _local(timestamp, tz):
+    # dhbw.app liefert ISO-Zeitstempel (ggf. mit 'Z'); wie im Browser in Ortszeit umrechnen
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).astimezone(tz)
+
+
+def lecture_days(events, days, tz, today=None):
+    """
+    Ermittelt die nächsten Vorlesungstage mit erster Anfangs- und letzter Endzeit.
+
+    Entspricht der Gruppierung in `stundenplan.html` (Ortszeit, Tage ab heute), unabhängig
+    von der Zeitzone des Server-Prozesses.
+
+    Args:
+        events (list[dict]): Vorlesungen mit 'startTime' und 'endTime' (ISO-Format).
+        days (int): Maximale Anzahl an Vorlesungstagen.
+        tz (tzinfo): Zeitzone der Suchzeiten (`EFA_TIMEZONE`).
+        today (date, optional): Bezugsdatum (Standard: heute in `tz`).
+
+    Returns:
+        list[tuple]: `(date, first_start, last_end)` im Format YYYYMMDD/HHMM, aufsteigend.
+
+    Beispiele:
+        >>> from zoneinfo import ZoneInfo
+        >>> lecture_days([{"startTime": "2025-12-01T07:00:00.000Z", "endTime": "2025-12-01T10:30:00.000Z"},
+        ...               {"startTime": "2025-12-01T13:00:00+01:00", "endTime": "2025-12-01T15:15:00+01:00"}],
+        ...              days=3, tz=ZoneInfo('Europe/Berlin'), today=date(2025, 12, 1))
+        [('20251201', '0800', '1515')]
+    """
+    today = today or datetime.now(tz).date()
+    spans = {}
+    for event in events or ():
+        try:
+            start, end = _local(event['startTime'], tz), _local(event['endTime'], tz)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if start.date() < today:
+            continue
+        first, last = spans.get(start.date(), (start, end))
+        spans[start.date()] = (min(first, start), max(last, end))
+    return [(d.strftime('%Y%m%d'), first.strftime('%H%M'), last.strftime('%H%M'))
+            for d, (first, last) in sorted(spans.items())[:days]]
+
+
+class CommuteScheduler:
+    """
+    Hintergrund-Scheduler für die Vorberechnung von Pendelverbindungen.
+
+    Args:
+        db_connection (callable): Liefert einen Context-Manager mit einer DB-Verbindung.
+        fetch_events (callable): `fetch_events(course)` -> Liste der Vorlesungen eines Kurses.
+        run_batch (callable): `run_batch(items)` -> Ergebnisse wie `/api/connections/batch`.
+        tz (tzinfo): Zeitzone für Vorlesungstage, Suchzeiten und Tagesbudget (`EFA_TIMEZONE`).
+        interval (float): Sekunden zwischen zwei vollständigen Läufen.
+        days (int): Anzahl vorberechneter Vorlesungstage.
+        course_daily_limit (int): Maximale Anzahl an neuen Suchen je Kurs und Kalendertag.
+        chunk_size (int): Suchen pro Batch (begrenzt die Last auf den EFA-Pool).
+        max_age (float): Sekunden, die ein gespeichertes Ergebnis als aktuell gilt und
+            nicht neu gesucht wird.
+        lock_connection (callable, optional): Liefert einen Context-Manager mit einer eigenen
+            Verbindung für das Advisory-Lock, das während des ganzen Laufs gehalten wird
+            (Standard: `db_connection`). Die Suchen selbst laufen ohne geliehene Verbindung.
+    """
+
+    def __init__(self, db_connection, fetch_events, run_batch, tz, interval=1800, days=3,
+                 course_daily_limit=200, chunk_size=50, max_age=10800, lock_connection=None):
+        self.db_connection = db_connection
+        self.lock_connection = lock_connection or db_connection
+        self.fetch_events = fetch_events
+        self.run_batch = run_batch
+        self.tz = tz
+        self.interval = interval
+        self.days = days
+        self.course_daily_limit = course_daily_limit
+        self.chunk_size = chunk_size
+        self.max_age = max_age
+        self._budget = {}
+        self._dirty = set()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Kennzahlen
+        self.runs = 0
+        self.searches = 0
+        self.fresh = 0
+        self.throttled = 0
+        self.stored = 0
+        self.last_run = None
+        self.last_duration = None
+
+    def start(self):
+        """Startet den Hintergrund-Thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='commute', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        next_full = time.monotonic()
+        while True:
+            self._wake.wait(max(0.0, next_full - time.monotonic()))
+            self._wake.clear()
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            try:
+                if time.monotonic() >= next_full:
+                    next_full = time.monotonic() + self.interval
+                    self.run()
+                elif dirty:
+                    self.run(dirty)
+            except Exception as e:
+                print(f"Fehler Vorberechnung: {e}")
+
+    def invalidate(self, username):
+        """
+        Verwirft die Vorschläge eines Nutzers (z. B. nach dem Speichern des Profils)
+        und plant eine Neuberechnung für ihn ein.
+        """
+        with self.db_connection() as db, db.cursor() as cursor:
+            cursor.execute(SQL_SUGGESTIONS_DELETE_USERS, ([username],))
+            db.commit()
+        if self._thread is None:
+            # Scheduler läuft in einem anderen Prozess: dort beim nächsten Komplettlauf
+            return
+        with self._lock:
+            self._dirty.add(username)
+        self._wake.set()
+
+    def suggestions(self, username):
+        """
+        Liefert die vorberechneten Vorschläge eines Nutzers ab heute.
+
+        Returns:
+            list[dict]: Einträge mit 'date', 'mode', 'time', 'buffer', 'home_stop_id',
+                'journeys' und 'computed_at'.
+        """
+        with self.db_connection() as db, db.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(SQL_SUGGESTIONS_SELECT, (username,))
+            return [dict(r) for r in cursor.fetchall()]
+
+    def _take_budget(self, course, wanted):
+        # Tagesbudget je Kurs: liefert die Anzahl der noch erlaubten Suchen
+        key = (course, datetime.now(self.tz).date())
+        with self._lock:
+            for old in [k for k in self._budget if k[1] != key[1]]:
+                del self._budget[old]
+            granted = max(0, min(wanted, self.course_daily_limit - self._budget.get(key, 0)))
+            self._budget[key] = self._budget.get(key, 0) + granted
+            self.throttled += wanted - granted
+        return granted
+
+    def run(self, usernames=None):
+        """
+        Führt einen Vorberechnungslauf aus (alle aktiven Profile oder nur `usernames`).
+
+        Returns:
+            int: Anzahl der gespeicherten Vorschläge (0, wenn ein anderer Prozess gerade rechnet).
+        """
+        start = time.monotonic()
+        with self.lock_connection() as lock_db, lock_db.cursor() as lock:
+            lock.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_KEY,))
+            locked = lock.fetchone()[0]
+            lock_db.commit()
+            if not locked:
+                return 0
+            try:
+                with self.db_connection() as db, db.cursor(cursor_factory=RealDictCursor) as cursor:
+                    if usernames:
+                        cursor.execute(SQL_ACTIVE_PROFILES + " AND username = ANY(%s)", (list(usernames),))
+                    else:
+                        cursor.execute(SQL_ACTIVE_PROFILES)
+                    profiles = cursor.fetchall()
+                    cursor.execute(SQL_SUGGESTIONS_EXISTING, (self.max_age, [p['username'] for p in profiles]))
+                    existing = {(r['username'], r['date'], r['mode']):
+                                ((r['time'], r['buffer'], r['home_stop_id']), r['fresh']) for r in cursor.fetchall()}
+                    db.commit()
+
+                # Vorlesungen laden und suchen, ohne eine Verbindung aus dem Pool zu belegen
+                rows, keep = self._compute(profiles, existing)
+
+                with self.db_connection() as db, db.cursor() as cursor:
+                    # Nur Einträge löschen, die zu keiner gewünschten Suche mehr passen
+                    stale = [key for key in existing if key not in keep]
+                    if stale:
+                        cursor.executemany(SQL_SUGGESTIONS_DELETE_ONE, stale)
+                    if not usernames:
+                        cursor.execute(SQL_SUGGESTIONS_DELETE_PAST)
+                    for row in rows:
+                        cursor.execute(SQL_SUGGESTIONS_INSERT, row)
+                    db.commit()
+            finally:
+                lock_db.rollback()
+                lock.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+                lock_db.commit()
+
+        with self._lock:
+            self.runs += 1
+            self.stored += len(rows)
+            self.last_run = datetime.now().isoformat(timespec='seconds')
+            self.last_duration = round(time.monotonic() - start, 3)
+        return len(rows)
+
+    def _compute(self, profiles, existing):
+        # Liefert die neu zu speichernden Zeilen und die Schlüssel (username, date, mode),
+        # deren Eintrag erhalten bleibt (neu berechnet oder passender bisheriger Stand)
+        by_course = {}
+        for profile in profiles:
+            by_course.setdefault(profile['timetable_link'], []).append(profile)
+
+        rows, keep = [], set()
+        for course, members in by_course.items():
+            try:
+                events = self.fetch_events(course)
+            except Exception as e:
+                print(f"Fehler Vorberechnung ({course}): {e}")
+                continue
+
+            # Gleiche Heimat-Haltestelle + gleicher Puffer = eine gemeinsame Suche
+            searches, wanted = {}, []
+            for day, first_start, last_end in lecture_days(events, self.days, self.tz):
+                for profile in members:
+                    buffer = profile['buffer_time'] or 0
+                    for mode, t_time, t_buffer in (('to_uni', first_start, buffer + 10),
+                                                   ('from_uni', last_end, 10)):
+                        key = (profile['home_stop_id'], day, mode, t_time, t_buffer)
+                        searches.setdefault(key, {"mode": mode, "userStopId": key[0], "date": day,
+                                                  "time": t_time, "buffer": t_buffer})
+                        wanted.append((profile['username'], key))
+
+            # Nur Suchen ausführen, die für mindestens einen Nutzer fehlen oder veraltet sind
+            needed = {}
+            for username, key in wanted:
+                stored = existing.get((username, key[1], key[2]))
+                if stored is None or stored[0] != (key[3], key[4], key[0]) or not stored[1]:
+                    needed[key] = True
+            with self._lock:
+                self.fresh += len(searches) - len(needed)
+            keys = list(needed)[:self._take_budget(course, len(needed))]
+            results = {}
+            for i in range(0, len(keys), self.chunk_size):
+                chunk = keys[i:i + self.chunk_size]
+                results.update(zip(chunk, self.run_batch([searches[k] for k in chunk])))
+            with self._lock:
+                self.searches += len(keys)
+
+            for username, key in wanted:
+                stop_id, day, mode, t_time, t_buffer = key
+                result = results.get(key)
+                if result and 'error' not in result:
+                    rows.append((username, day, mode, t_time, t_buffer, stop_id,
+                                 json.dumps(result['journeys'])))
+                    keep.add((username, day, mode))
+                elif (existing.get((username, day, mode)) or (None,))[0] == (t_time, t_buffer, stop_id):
+                    # Nicht gesucht (aktuell, Budget, Fehler): bisheriges Ergebnis behalten
+                    keep.add((username, day, mode))
+        return rows, keep
+
+    def stats(self):
+        """
+        Gibt die Kennzahlen des Schedulers zurück.
+
+        Returns:
+            dict: 'interval', 'days', 'runs', 'searches', 'fresh' (übersprungen, da noch
+                aktuell), 'throttled', 'stored', 'last_run' und 'last_duration' (Sekunden).
+        """
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "days": self.days,
+                "runs": self.runs,
+                "searches": self.searches,
+                "fresh": self.fresh,
+                "throttled": self.throttled,
+                "stored": self.stored,
+                "last_run": self.last_run,
+                "last_duration": self.last_duration
+            }
@@ -0,0 +1,253 @@
+"""
+Campus VVS Navigator - PostgreSQL Connection Pool
+
+Dieses Modul stellt einen threadsicheren Connection-Pool für psycopg2 bereit, damit
+nicht bei jedem Request ein neuer TCP- und Auth-Handshake zur Datenbank nötig ist.
+
+Eigenschaften:
+    * Konfigurierbare Mindest- und Maximalgröße.
+    * Health-Check: Verbindungen, die länger als `check_interval` Sekunden ungenutzt
+      waren, werden vor der Ausgabe mit `SELECT 1` geprüft und ggf. ersetzt.
+    * Borrow-Timeout: Ist der Pool ausgeschöpft, wird höchstens `timeout` Sekunden
+      gewartet und danach `PoolTimeout` ausgelöst (im Backend als HTTP 503 gemeldet).
+    * Connect-Timeout: Neue Verbindungen geben nach `connect_timeout` Sekunden auf, statt
+      bei nicht erreichbarer Datenbank bis zum TCP-Timeout des Betriebssystems zu hängen;
+      auch das wird als `PoolTimeout` gemeldet.
+    * Context-Manager-API: `with pool.connection() as db: ...`
+    * Kennzahlen: Wartezeiten, Auslastung und Timeouts über `stats()`.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import time
+import threading
+from contextlib import contextmanager
+
+# Third-Party Imports
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(Exception):
+    """Wird ausgelöst, wenn innerhalb des Timeouts keine Verbindung frei wird oder aufgebaut werden kann."""
+
+
+class ConnectionPool:
+    """
+    Threadsicherer Pool wiederverwendbarer PostgreSQL-Verbindungen.
+
+    Args:
+        db_config (dict): Verbindungsparameter für `psycopg2.connect`.
+        minconn (int): Anzahl der Verbindungen, die beim ersten Zugriff geöffnet werden.
+        maxconn (int): Maximale Anzahl gleichzeitig geöffneter Verbindungen.
+        timeout (float): Maximale Wartezeit in Sekunden auf eine freie Verbindung.
+        check_interval (float): Leerlaufzeit in Sekunden, ab der eine Verbindung vor
+            der Ausgabe geprüft wird.
+        connect_timeout (int, optional): Maximale Dauer eines Verbindungsaufbaus in Sekunden
+            (`connect_timeout` von libpq, Standard: `timeout`, mindestens 1).
+    """
+
+    def __init__(self, db_config, minconn=1, maxconn=10, timeout=5, check_interval=30, connect_timeout=None):
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout if connect_timeout is not None else max(1, int(timeout))
+        self.check_interval = check_interval
+        self._idle = []
+        self._last_used = {}
+        self._size = 0
+        self._warm = False
+        self._cond = threading.Condition()
+        # Kennzahlen
+        self.borrows = 0
+        self.timeouts = 0
+        self.replaced = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _connect(self):
+        try:
+            return psycopg2.connect(**{'connect_timeout': self.connect_timeout, **self.db_config})
+        except psycopg2.OperationalError as e:
+            raise PoolTimeout(f"Datenbank nicht erreichbar: {e}") from e
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0) < self.check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _warmup(self):
+        # Mindestanzahl an Verbindungen vorhalten. Der Aufbau läuft außerhalb des Locks,
+        # damit andere Threads nicht auf eine langsame oder nicht erreichbare DB warten;
+        # erst mit `minconn` Verbindungen gilt der Pool als warm (sonst nächster Zugriff)
+        while True:
+            with self._cond:
+                if self._warm or self._size >= self.minconn:
+                    self._warm = True
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(conn)
+                self._last_used[id(conn)] = time.monotonic()
+                self._cond.notify()
+
+    def acquire(self):
+        """
+        Leiht eine Verbindung aus dem Pool aus.
+
+        Returns:
+            connection: Eine geprüfte psycopg2-Verbindung.
+
+        Raises:
+            PoolTimeout: Wenn innerhalb von `timeout` Sekunden keine Verbindung frei wird oder
+                eine neue Verbindung nicht innerhalb von `connect_timeout` aufgebaut werden kann.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn = None
+        if not self._warm:
+            self._warmup()
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout("Keine freie Datenbankverbindung verfügbar")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - start
+            self.borrows += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+        try:
+            if conn is not None and not self._is_healthy(conn):
+                self._forget(conn)
+                self.replaced += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            # Reservierten Platz wieder freigeben
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, discard=False):
+        """
+        Gibt eine Verbindung an den Pool zurück.
+
+        Offene Transaktionen werden zurückgerollt. Defekte Verbindungen (oder bei
+        `discard=True`) werden geschlossen und nicht wiederverwendet.
+        """
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self._cond:
+            if discard or conn.closed:
+                self._forget(conn)
+                self._size -= 1
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _forget(self, conn):
+        self._last_used.pop(id(conn), None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """
+        Context-Manager, der eine Verbindung ausleiht und sicher zurückgibt.
+
+        Beispiel:
+            with pool.connection() as db:
+                with db.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+        """
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    @contextmanager
+    def dedicated(self):
+        """
+        Context-Manager mit einer eigenen Verbindung außerhalb des Pools, die danach
+        geschlossen wird (z. B. für lange gehaltene Advisory-Locks, die sonst einen
+        Platz im Pool blockieren würden).
+
+        Raises:
+            PoolTimeout: Wenn die Verbindung nicht aufgebaut werden kann.
+        """
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            self._forget(conn)
+
+    def closeall(self):
+        """Schließt alle ungenutzten Verbindungen des Pools."""
+        with self._cond:
+            while self._idle:
+                self._forget(self._idle.pop())
+                self._size -= 1
+
+    def stats(self):
+        """
+        Gibt die aktuellen Pool-Kennzahlen zurück.
+
+        Returns:
+            dict: Größe, Auslastung, Wartezeiten (Sekunden) und Timeouts des Pools.
+        """
+        with self._cond:
+            in_use = self._size - len(self._idle)
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "minconn": self.minconn,
+                "maxconn": self.maxconn,
+                "utilization": round(in_use / self.maxconn, 4) if self.maxconn else 0.0,
+                "borrows": self.borrows,
+                "timeouts": self.timeouts,
+                "replaced": self.replaced,
+                "wait_avg": round(self.wait_total / self.borrows, 6) if self.borrows else 0.0,
+                "wait_max": round(self.wait_max, 6)
+            }
@@ -0,0 +1,239 @@
+"""
+Campus VVS Navigator - Abfahrtstafeln mit gemeinsamem Polling
+
+Dieses Modul hält die Live-Abfahrten beliebiger Haltestellen (Campus-Haltestellen und
+alle Einträge aus `stop_mapping`) im Speicher und verteilt sie an alle Betrachter.
+
+Ablauf:
+    * Eine Tafel entsteht beim ersten Abruf einer Haltestelle und wird danach von einem
+      Hintergrund-Thread alle `interval` Sekunden genau einmal abgefragt, unabhängig von
+      der Anzahl der Betrachter (Lobby-Bildschirme, Smartphones).
+    * Tafeln ohne aktive Abonnenten (SSE, Long-Poll), die länger als `idle_ttl` Sekunden
+      nicht abgerufen wurden, werden nicht mehr abgefragt und verworfen.
+    * Jede Änderung erhöht die Version der Tafel. Clients erhalten statt der vollständigen
+      Liste nur die Änderungen gegenüber ihrer letzten Version ('upsert', 'remove',
+      'order'), solange diese noch in der Historie (`history` Versionen) liegt.
+
+Blockierende Wartefunktionen dienen dem Flask-Modus, `await_version` dem ASGI-Modus.
+Im ASGI-Modus mit mehreren Workern hält jeder Prozess seine eigenen Tafeln.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import time
+import asyncio
+import threading
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class _Board:
+    """Zustand der Abfahrtstafel einer Haltestelle."""
+
+    def __init__(self, stop_id, name, lock):
+        self.stop_id = stop_id
+        self.name = name
+        self.version = 0
+        self.departures = []
+        self.history = OrderedDict()  # Version -> {id: Abfahrt}
+        self.updated_at = None
+        self.error = None
+        self.subscribers = 0
+        self.last_access = time.monotonic()
+        self.next_poll = 0.0
+        self.polling = False
+        self.changed = threading.Condition(lock)
+        self.async_waiters = set()
+
+
+class DepartureHub:
+    """
+    Gemeinsame, versionierte Abfahrtstafeln mit einem Upstream-Poll je Haltestelle und Intervall.
+
+    Args:
+        fetch (callable): `fetch(stop_id)` -> Liste von Abfahrten (dicts mit eindeutigem 'id').
+        interval (float): Sekunden zwischen zwei Abfragen derselben Haltestelle.
+        idle_ttl (float): Sekunden ohne Abruf, nach denen eine Tafel ohne Abonnenten entfällt.
+        history (int): Anzahl der Versionen je Tafel, gegenüber denen Deltas möglich sind.
+        max_boards (int): Maximale Anzahl gleichzeitig gehaltener Tafeln.
+        max_workers (int): Maximale Anzahl paralleler Upstream-Abfragen.
+    """
+
+    def __init__(self, fetch, interval=30, idle_ttl=120, history=20, max_boards=500, max_workers=4):
+        self.fetch = fetch
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        self.history = history
+        self.max_boards = max_boards
+        self._boards = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='departures')
+        self._thread = None
+        # Kennzahlen
+        self.polls = 0
+        self.poll_errors = 0
+        self.evicted = 0
+
+    def start(self):
+        """Startet den Hintergrund-Thread (idempotent, erfolgt automatisch beim ersten Abruf)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='departures', daemon=True)
+                self._thread.start()
+
+    def board(self, stop_id, name):
+        """
+        Liefert die Tafel einer Haltestelle und legt sie bei Bedarf an (zählt als Abruf).
+
+        Raises:
+            RuntimeError: Wenn bereits `max_boards` Tafeln gehalten werden.
+        """
+        self.start()
+        with self._lock:
+            board = self._boards.get(stop_id)
+            if board is None:
+                if len(self._boards) >= self.max_boards:
+                    raise RuntimeError("Zu viele Abfahrtstafeln gleichzeitig")
+                board = self._boards[stop_id] = _Board(stop_id, name, self._lock)
+                self._wake.set()
+            board.last_access = time.monotonic()
+            return board
+
+    @contextlib.contextmanager
+    def subscription(self, board):
+        """Hält eine Tafel für die Dauer des Blocks aktiv (SSE-Stream oder Long-Poll)."""
+        with self._lock:
+            board.subscribers += 1
+        try:
+            yield board
+        finally:
+            with self._lock:
+                board.subscribers -= 1
+                board.last_access = time.monotonic()
+
+    @staticmethod
+    def _ready(board, version):
+        # version None: erste Abfrage abgeschlossen (Daten oder Fehler)
+        if version is None:
+            return board.version > 0 or board.error is not None
+        return board.version > version
+
+    def wait_version(self, board, version, timeout):
+        """
+        Wartet blockierend, bis die Tafel neuer als `version` ist.
+
+        Args:
+            board (_Board): Die Tafel aus `board()`.
+            version (int | None): Bekannte Version, None wartet auf die erste Abfrage.
+            timeout (float): Maximale Wartezeit in Sekunden.
+
+        Returns:
+            bool: True bei neuer Version, False nach Ablauf von `timeout`.
+        """
+        with board.changed:
+            return board.changed.wait_for(lambda: self._ready(board, version), timeout)
+
+    async def await_version(self, board, version, timeout):
+        """Wie `wait_version`, aber als Coroutine (ohne Thread, für den ASGI-Modus)."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._ready(board, version):
+                return True
+            board.async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                board.async_waiters.discard(waiter)
+
+    def payload(self, board, since=None):
+        """
+        Baut die Antwort für einen Client mit Stand `since`.
+
+        Returns:
+            dict: 'type' = 'snapshot' (vollständige Liste unter 'departures') oder
+                'delta' ('base', 'upsert', 'remove', 'order'), jeweils mit 'stop_id',
+                'name', 'version', 'updated_at' und ggf. 'error'.
+        """
+        with self._lock:
+            result = {"stop_id": board.stop_id, "name": board.name, "version": board.version,
+                      "updated_at": board.updated_at}
+            if board.error:
+                result["error"] = board.error
+            base = board.history.get(since) if since is not None else None
+            if base is None:
+                result.update(type="snapshot", departures=board.departures)
+                return result
+            current = board.history[board.version]
+            result.update(type="delta", base=since,
+                          upsert=[d for d in board.departures if base.get(d['id']) != d],
+                          remove=[key for key in base if key not in current],
+                          order=[d['id'] for d in board.departures])
+            return result
+
+    def _loop(self):
+        while True:
+            self._wake.wait(1.0)
+            self._wake.clear()
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                for stop_id, board in list(self._boards.items()):
+                    if board.subscribers == 0 and now - board.last_access > self.idle_ttl:
+                        del self._boards[stop_id]
+                        self.evicted += 1
+                    elif not board.polling and board.next_poll <= now:
+                        board.polling = True
+                        due.append(board)
+            for board in due:
+                self._executor.submit(self._poll, board)
+
+    def _poll(self, board):
+        try:
+            departures = self.fetch(board.stop_id)
+            error = None
+        except Exception as e:
+            print(f"Fehler Abfahrten {board.stop_id}: {e}")
+            departures, error = None, "VVS nicht erreichbar"
+        with self._lock:
+            self.polls += 1
+            board.polling = False
+            board.next_poll = time.monotonic() + self.interval
+            board.error = error
+            if error:
+                self.poll_errors += 1
+            elif departures != board.departures or board.version == 0:
+                board.version += 1
+                board.departures = departures
+                board.history[board.version] = {d['id']: d for d in departures}
+                while len(board.history) > self.history:
+                    board.history.popitem(last=False)
+            if departures is not None:
+                board.updated_at = datetime.now().isoformat(timespec='seconds')
+            board.changed.notify_all()
+            for loop, event in board.async_waiters:
+                loop.call_soon_threadsafe(event.set)
+
+    def stats(self):
+        """
+        Gibt die Kennzahlen der Abfahrtstafeln zurück.
+
+        Returns:
+            dict: 'boards', 'subscribers', 'polls', 'poll_errors', 'evicted' und 'interval'.
+        """
+        with self._lock:
+            return {
+                "boards": len(self._boards),
+                "subscribers": sum(b.subscribers for b in self._boards.values()),
+                "polls": self.polls,
+                "poll_errors": self.poll_errors,
+                "evicted": self.evicted,
+                "interval": self.interval
+            }
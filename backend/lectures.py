@@ -0,0 +1,356 @@
+"""
+Campus VVS Navigator - Abgleich der Rapla-Vorlesungen mit PostgreSQL
+
+Dieses Modul hält für jeden Kurs aus `user_profiles.timetable_link` eine lokale Kopie
+der Vorlesungstermine der dhbw.app in der Tabelle `lectures` aktuell (Schema siehe
+`migrations/002_lectures.sql`). `/api/timetable` beantwortet Zeitraum-Abfragen daraus
+mit einer einzigen indizierten Abfrage, statt jedes Mal die komplette Terminliste vom
+Upstream zu laden; kursübergreifende Auswertungen sind per SQL möglich.
+
+Ablauf eines Abgleichs (je Kurs, in einer Transaktion):
+    1. Validatoren (ETag/Last-Modified) des letzten Abgleichs aus `lecture_sync` lesen
+       und die Termine bedingt laden. Bei "304 Not Modified" ist der Kurs aktuell.
+    2. Termine über ihre Identität (`event_key`) mit dem gespeicherten Stand vergleichen:
+       neue und geänderte (anderer `content_hash`) werden geschrieben, entfallene gelöscht,
+       unveränderte nicht angefasst.
+    3. Validatoren, Anzahl und Zeitpunkt in `lecture_sync` vermerken.
+
+Ein Hintergrund-Thread gleicht alle Kurse im Abstand von `interval` Sekunden ab; einzelne
+Kurse können vorgezogen werden (`schedule`, z. B. nach dem Speichern eines Profils oder
+bei veralteten Daten). Ein PostgreSQL-Advisory-Lock je Kurs verhindert doppelte
+Abgleiche mehrerer Prozesse, ein globaler Lock doppelte Komplettläufe.
+
+Gespeichert werden nur Kurse, die in mindestens einem Profil stehen: `lookup` liefert für
+andere Kurse nichts (der Aufrufer lädt sie über den Stundenplan-Cache), und jeder
+Komplettlauf löscht Kurse, auf die kein Profil mehr verweist.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+# Third-Party Imports
+from psycopg2.extras import Json, execute_values
+
+# Schlüssel der Advisory-Locks ("VVS2"; je Kurs zusätzlich `hashtext(course)`)
+LOCK_KEY = 0x56565332
+
+SQL_ACTIVE_COURSES = """SELECT DISTINCT timetable_link FROM user_profiles
+                        WHERE COALESCE(timetable_link, '') <> ''"""
+SQL_SYNC_STATE = "SELECT etag, last_modified FROM lecture_sync WHERE course = %s"
+SQL_COURSE_STATE = """SELECT (SELECT synced_at FROM lecture_sync WHERE course = %s),
+                             EXISTS (SELECT 1 FROM user_profiles WHERE timetable_link = %s)"""
+# Kurse, auf die kein Profil (mehr) verweist
+SQL_ORPHANS_DELETE_LECTURES = """DELETE FROM lectures l WHERE NOT EXISTS
+                                 (SELECT 1 FROM user_profiles p WHERE p.timetable_link = l.course)"""
+SQL_ORPHANS_DELETE_SYNC = """DELETE FROM lecture_sync s WHERE NOT EXISTS
+                             (SELECT 1 FROM user_profiles p WHERE p.timetable_link = s.course)"""
+SQL_SYNC_UPSERT = """INSERT INTO lecture_sync (course, etag, last_modified, events, synced_at, last_error)
+                     VALUES (%s, %s, %s, %s, now(), NULL)
+                     ON CONFLICT (course) DO UPDATE SET etag=EXCLUDED.etag, last_modified=EXCLUDED.last_modified,
+                     events=EXCLUDED.events, synced_at=now(), last_error=NULL"""
+SQL_SYNC_NOT_MODIFIED = "UPDATE lecture_sync SET synced_at = now(), last_error = NULL WHERE course = %s"
+SQL_SYNC_ERROR = "UPDATE lecture_sync SET last_error = %s WHERE course = %s"
+SQL_LECTURE_HASHES = "SELECT event_key, content_hash FROM lectures WHERE course = %s"
+SQL_LECTURES_UPSERT = """INSERT INTO lectures (course, event_key, name, start_time, end_time, content_hash, event)
+                         VALUES %s
+                         ON CONFLICT (course, event_key) DO UPDATE SET name=EXCLUDED.name,
+                         start_time=EXCLUDED.start_time, end_time=EXCLUDED.end_time,
+                         content_hash=EXCLUDED.content_hash, event=EXCLUDED.event, updated_at=now()"""
+SQL_LECTURES_DELETE = "DELETE FROM lectures WHERE course = %s AND event_key = ANY(%s)"
+# Zeitraum: Beginn im halboffenen Intervall [von, bis), ohne Grenze +-infinity
+SQL_LECTURES_RANGE = """SELECT event FROM lectures
+                        WHERE course = %s AND start_time >= %s AND start_time < %s
+                        ORDER BY start_time, event_key"""
+
+
+def parse_event_time(timestamp):
+    """
+    Wandelt einen ISO-Zeitstempel der dhbw.app in ein zeitzonenbehaftetes datetime um.
+
+    Beispiele:
+        >>> parse_event_time("2025-12-01T07:00:00.000Z").isoformat()
+        '2025-12-01T07:00:00+00:00'
+        >>> parse_event_time("kaputt") is None
+        True
+    """
+    try:
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def event_key(event):
+    """
+    Identität eines Termins: die Upstream-ID, sonst Beginn, Ende und Name.
+
+    Verschiebt sich ein Termin ohne ID, gilt er als entfallen und neu angelegt.
+
+    Beispiele:
+        >>> event_key({"id": 42, "name": "Mathe"})
+        'id:42'
+        >>> event_key({"name": "Mathe", "startTime": "2025-12-01T07:00:00.000Z",
+        ...            "endTime": "2025-12-01T10:00:00.000Z"})[:4]
+        'md5:'
+    """
+    if event.get('id') not in (None, ''):
+        return f"id:{event['id']}"
+    identity = f"{event.get('startTime')}|{event.get('endTime')}|{event.get('name')}"
+    return "md5:" + hashlib.md5(identity.encode('utf-8')).hexdigest()
+
+
+def content_hash(event):
+    """Prüfsumme über alle Felder eines Termins (Reihenfolge der Schlüssel egal)."""
+    return hashlib.md5(json.dumps(event, sort_keys=True, ensure_ascii=False,
+                                  separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def in_range(events, start=None, end=None):
+    """
+    Filtert Termine auf einen Zeitraum (Beginn in [start, end)), wie `SQL_LECTURES_RANGE`.
+
+    Beispiele:
+        >>> from datetime import timezone
+        >>> events = [{"startTime": "2025-12-01T07:00:00.000Z"}, {"startTime": "2025-12-08T07:00:00.000Z"}]
+        >>> len(in_range(events, start=datetime(2025, 12, 1, tzinfo=timezone.utc),
+        ...              end=datetime(2025, 12, 8, tzinfo=timezone.utc)))
+        1
+    """
+    if start is None and end is None:
+        return events
+    selected = []
+    for event in events or ():
+        t = parse_event_time(event.get('startTime'))
+        if t is not None and (start is None or t >= start) and (end is None or t < end):
+            selected.append(event)
+    return selected
+
+
+class LectureSync:
+    """
+    Abgleich der Vorlesungen aller Kurse mit der Tabelle `lectures` (siehe Modul-Docstring).
+
+    Args:
+        db_connection (callable): Liefert einen Context-Manager mit einer DB-Verbindung.
+        fetch (callable): `fetch(course, entry)` -> `(events, etag, last_modified)` wie
+            `vvs_app.fetch_timetable`; bei "304 Not Modified" ist `events` None.
+        interval (float): Sekunden zwischen zwei Komplettläufen; zugleich das Alter, ab dem
+            ein Kurs als veraltet gilt (`is_stale`).
+    """
+
+    def __init__(self, db_connection, fetch, interval=900):
+        self.db_connection = db_connection
+        self.fetch = fetch
+        self.interval = interval
+        self._dirty = set()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Kennzahlen
+        self.runs = 0
+        self.syncs = 0
+        self.not_modified = 0
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.errors = 0
+        self.orphaned = 0
+        self.last_run = None
+        self.last_duration = None
+
+    def start(self):
+        """Startet den Hintergrund-Thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='lectures', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        next_full = time.monotonic()
+        while True:
+            self._wake.wait(max(0.0, next_full - time.monotonic()))
+            self._wake.clear()
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            try:
+                if time.monotonic() >= next_full:
+                    next_full = time.monotonic() + self.interval
+                    self.run()
+                for course in dirty:
+                    self.sync(course)
+            except Exception as e:
+                print(f"Fehler Vorlesungsabgleich: {e}")
+
+    def schedule(self, course):
+        """Plant einen vorgezogenen Abgleich für `course` ein (z. B. nach einer Profiländerung)."""
+        if not course or self._thread is None:
+            # Ohne Thread (anderer Prozess) übernimmt ihn der nächste Komplettlauf
+            return
+        with self._lock:
+            self._dirty.add(course)
+        self._wake.set()
+
+    def run(self):
+        """
+        Gleicht alle Kurse aus den Profilen ab und löscht Kurse ohne Profil.
+
+        Returns:
+            int: Anzahl der abgeglichenen Kurse (0, wenn ein anderer Prozess gerade abgleicht).
+        """
+        start = time.monotonic()
+        with self.db_connection() as db, db.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_KEY,))
+            if not cursor.fetchone()[0]:
+                return 0
+            try:
+                cursor.execute(SQL_ACTIVE_COURSES)
+                courses = [row[0] for row in cursor.fetchall()]
+                cursor.execute(SQL_ORPHANS_DELETE_LECTURES)
+                cursor.execute(SQL_ORPHANS_DELETE_SYNC)
+                orphaned = cursor.rowcount
+                db.commit()
+                with self._lock:
+                    self.orphaned += orphaned
+                for course in courses:
+                    try:
+                        self._sync(db, course)
+                    except Exception as e:
+                        print(f"Fehler Vorlesungsabgleich ({course}): {e}")
+            finally:
+                db.rollback()
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+                db.commit()
+
+        with self._lock:
+            self.runs += 1
+            self.last_run = datetime.now().isoformat(timespec='seconds')
+            self.last_duration = round(time.monotonic() - start, 3)
+        return len(courses)
+
+    def sync(self, course):
+        """
+        Gleicht einen einzelnen Kurs sofort ab.
+
+        Returns:
+            dict: 'not_modified' oder 'inserted', 'updated', 'deleted', 'unchanged', 'skipped'.
+
+        Raises:
+            Exception: Fehler beim Laden von der dhbw.app (der bisherige Stand bleibt erhalten).
+        """
+        with self.db_connection() as db:
+            return self._sync(db, course)
+
+    def _sync(self, db, course):
+        with db.cursor() as cursor:
+            # Je Kurs höchstens ein Abgleich gleichzeitig; ein wartender Prozess bekommt danach 304
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, hashtext(%s))", (LOCK_KEY, course))
+            cursor.execute(SQL_SYNC_STATE, (course,))
+            state = cursor.fetchone()
+            entry = {"value": None, "etag": state[0], "last_modified": state[1]} if state else None
+            try:
+                events, etag, last_modified = self.fetch(course, entry)
+                if events is not None and not isinstance(events, list):
+                    raise ValueError(f"Unerwartete Antwort für {course}")
+            except Exception as e:
+                db.rollback()
+                with self._lock:
+                    self.errors += 1
+                if state:
+                    cursor.execute(SQL_SYNC_ERROR, (str(e)[:500], course))
+                    db.commit()
+                raise
+
+            if events is None:
+                cursor.execute(SQL_SYNC_NOT_MODIFIED, (course,))
+                db.commit()
+                with self._lock:
+                    self.syncs += 1
+                    self.not_modified += 1
+                return {"not_modified": True}
+
+            rows, skipped = {}, 0
+            for event in events:
+                start, end = parse_event_time(event.get('startTime')), parse_event_time(event.get('endTime'))
+                if start is None or end is None:
+                    skipped += 1
+                    continue
+                rows[event_key(event)] = (event, start, end, content_hash(event))
+
+            cursor.execute(SQL_LECTURE_HASHES, (course,))
+            existing = dict(cursor.fetchall())
+            changed = [key for key, row in rows.items() if existing.get(key) != row[3]]
+            removed = [key for key in existing if key not in rows]
+            if changed:
+                execute_values(cursor, SQL_LECTURES_UPSERT,
+                               [(course, key, rows[key][0].get('name'), rows[key][1], rows[key][2],
+                                 rows[key][3], Json(rows[key][0])) for key in changed])
+            if removed:
+                cursor.execute(SQL_LECTURES_DELETE, (course, removed))
+            cursor.execute(SQL_SYNC_UPSERT, (course, etag, last_modified, len(rows)))
+            db.commit()
+
+        inserted = sum(1 for key in changed if key not in existing)
+        result = {"inserted": inserted, "updated": len(changed) - inserted, "deleted": len(removed),
+                  "unchanged": len(rows) - len(changed), "skipped": skipped}
+        with self._lock:
+            self.syncs += 1
+            self.inserted += result['inserted']
+            self.updated += result['updated']
+            self.deleted += result['deleted']
+        return result
+
+    def lookup(self, course, start=None, end=None):
+        """
+        Liest die Termine eines Kurses mit Beginn im Zeitraum [start, end).
+
+        Args:
+            course (str): Die Kursbezeichnung.
+            start (datetime, optional): Untere Grenze (inklusive), ohne = unbegrenzt.
+            end (datetime, optional): Obere Grenze (exklusive), ohne = unbegrenzt.
+
+        Returns:
+            tuple: `(events, synced_at)` mit den Original-Events (chronologisch) und dem
+                Zeitpunkt des letzten erfolgreichen Abgleichs (None = noch nie abgeglichen).
+                Steht der Kurs in keinem Profil, ist `events` None (nicht abgleichen).
+        """
+        with self.db_connection() as db, db.cursor() as cursor:
+            cursor.execute(SQL_COURSE_STATE, (course, course))
+            synced_at, active = cursor.fetchone()
+            events = [] if active else None
+            if active and synced_at is not None:
+                cursor.execute(SQL_LECTURES_RANGE, (course, start or '-infinity', end or 'infinity'))
+                events = [r[0] for r in cursor.fetchall()]
+            db.rollback()
+        return events, synced_at
+
+    def is_stale(self, synced_at):
+        """Ob ein Abgleich älter als `interval` ist (dann wird er im Hintergrund wiederholt)."""
+        return synced_at is None or time.time() - synced_at.timestamp() > self.interval
+
+    def stats(self):
+        """
+        Gibt die Kennzahlen des Abgleichs zurück.
+
+        Returns:
+            dict: 'interval', 'runs', 'syncs', 'not_modified', 'inserted', 'updated',
+                'deleted', 'errors', 'orphaned' (gelöschte Kurse ohne Profil), 'last_run' und
+                'last_duration' (Sekunden).
+        """
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "runs": self.runs,
+                "syncs": self.syncs,
+                "not_modified": self.not_modified,
+                "inserted": self.inserted,
+                "updated": self.updated,
+                "deleted": self.deleted,
+                "errors": self.errors,
+                "orphaned": self.orphaned,
+                "last_run": self.last_run,
+                "last_duration": self.last_duration
+            }
@@ -0,0 +1,115 @@
+"""
+Campus VVS Navigator - Prometheus-Metriken
+
+Dieses Modul definiert die Metriken des Backends und stellt sie im Prometheus-Textformat
+für den Endpunkt `/metrics` bereit.
+
+Erfasst werden:
+    * HTTP: Anzahl und Latenz je Route (Route-Template, nicht die konkrete URL).
+    * Upstreams: Latenz und Anzahl je Upstream (vvs, dhbw) und Status
+      (HTTP-Statuscode, 'error' bei Verbindungsfehlern, 'rejected' bei offenem Breaker).
+    * Parsing: Dauer von `parse_vvs_data`, des Streaming-Parsers, von `parse_vvs_realtime`
+      bzw. von `parse_vvs_departures`.
+    * Datenbank: Dauer je SQL-Statement (Profil- und Favoriten-Routen).
+    * Verbindungssuche: Anzahl der Verbindungen vor dem Abschneiden auf die besten 5 und
+      Trip-Anfragen je Quelle ('window' = aus geladenem Zeitfenster, 'upstream').
+
+Die Upstream-, Parser- und SQL-Messungen werden zusätzlich als Spans des laufenden
+Requests erfasst (`tracing`, für `Server-Timing` und das Slow-Request-Log).
+
+Mehrere Worker:
+    Ist `PROMETHEUS_MULTIPROC_DIR` gesetzt (Uvicorn mit mehreren Workern, siehe `vvs_app`),
+    schreibt jeder Prozess seine Werte in dieses Verzeichnis und `/metrics` aggregiert
+    über alle Prozesse. Ohne die Variable werden die Werte nur im Prozess gehalten.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import os
+import contextlib
+
+# Third-Party Imports
+from prometheus_client import (CollectorRegistry, Counter, Histogram, REGISTRY,
+                               CONTENT_TYPE_LATEST, generate_latest, multiprocess)
+
+# Lokale Imports
+import tracing
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Latenzen von wenigen Millisekunden (Cache) bis zum EFA-Timeout
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+HTTP_REQUESTS = Counter('http_requests_total', 'Anzahl der HTTP-Requests',
+                        ['route', 'method', 'status'])
+HTTP_LATENCY = Histogram('http_request_duration_seconds', 'Bearbeitungsdauer der HTTP-Requests',
+                         ['route', 'method'], buckets=_LATENCY_BUCKETS)
+UPSTREAM_REQUESTS = Counter('upstream_requests_total', 'Anzahl der Upstream-Requests',
+                            ['upstream', 'status'])
+UPSTREAM_LATENCY = Histogram('upstream_request_duration_seconds', 'Dauer der Upstream-Requests',
+                             ['upstream'], buckets=_LATENCY_BUCKETS)
+PARSE_LATENCY = Histogram('vvs_parse_duration_seconds', 'Dauer des Parsens einer EFA-Antwort',
+                          ['parser'], buckets=_FAST_BUCKETS)
+DB_LATENCY = Histogram('db_query_duration_seconds', 'Dauer der SQL-Statements',
+                       ['statement'], buckets=_FAST_BUCKETS)
+JOURNEYS_BEFORE_TRUNCATION = Histogram('vvs_journeys_before_truncation',
+                                       'Anzahl der Verbindungen vor dem Abschneiden auf die besten 5',
+                                       buckets=(0, 1, 2, 5, 10, 15, 20, 30, 40, 60))
+TRIP_QUERIES = Counter('vvs_trip_queries_total',
+                       'Trip-Anfragen nach Cache-Fehlschlag, beantwortet aus geladenem Zeitfenster, Upstream oder GTFS',
+                       ['source'])
+
+
+def observe_request(route, method, status, seconds):
+    """Erfasst einen abgeschlossenen HTTP-Request."""
+    HTTP_REQUESTS.labels(route, method, str(status)).inc()
+    HTTP_LATENCY.labels(route, method).observe(seconds)
+
+
+def upstream_observer(upstream):
+    """
+    Liefert einen Callback `observe(seconds, status)` für `UpstreamClient(observe=...)`.
+
+    Beispiele:
+        >>> observe = upstream_observer('vvs')
+        >>> observe(0.12, 200)
+        >>> observe(None, 'rejected')  # nur zählen, keine Latenz
+    """
+    latency = UPSTREAM_LATENCY.labels(upstream)
+
+    def observe(seconds, status):
+        UPSTREAM_REQUESTS.labels(upstream, str(status)).inc()
+        if seconds is not None:
+            latency.observe(seconds)
+            tracing.record(upstream, seconds, str(status))
+    return observe
+
+
+@contextlib.contextmanager
+def db_timer(statement):
+    """Context-Manager, der die Dauer eines SQL-Statements erfasst (`with db_timer('fav_select'): ...`)."""
+    with DB_LATENCY.labels(statement).time(), tracing.span('db', statement):
+        yield
+
+
+@contextlib.contextmanager
+def parse_timer(parser):
+    """Context-Manager, der die Dauer eines EFA-Parserlaufs erfasst ('json', 'stream', 'realtime' oder 'departures')."""
+    with PARSE_LATENCY.labels(parser).time(), tracing.span('parse', parser):
+        yield
+
+
+def render():
+    """
+    Erzeugt die Ausgabe für `/metrics`.
+
+    Returns:
+        bytes: Alle Metriken im Prometheus-Textformat (bei mehreren Workern aggregiert).
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -0,0 +1,83 @@
+"""
+Campus VVS Navigator - Datenbank-Migrationen
+
+Dieses Modul spielt die SQL-Skripte aus `migrations/` (Dateinamen `NNN_beschreibung.sql`)
+in aufsteigender Reihenfolge ein. Bereits eingespielte Versionen werden in der Tabelle
+`schema_migrations` vermerkt und übersprungen. Jedes Skript läuft in einer eigenen
+Transaktion; ein PostgreSQL-Advisory-Lock verhindert, dass mehrere Prozesse (z. B.
+Uvicorn-Worker) gleichzeitig migrieren.
+
+Aufruf:
+    * Automatisch beim Start des Backends (abschaltbar über DB_MIGRATE=0).
+    * Manuell: `python migrations.py`
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_FILENAME = re.compile(r'^(\d+)_[\w-]+\.sql$')
+
+# Schlüssel des Advisory-Locks ("VVS0")
+LOCK_KEY = 0x56565330
+
+
+def pending_files(applied, directory=MIGRATIONS_DIR):
+    """
+    Liefert die noch nicht eingespielten Migrationen in Reihenfolge.
+
+    Args:
+        applied (set[str]): Bereits eingespielte Versionen (z. B. {'001'}).
+        directory (str): Verzeichnis mit den SQL-Skripten.
+
+    Returns:
+        list[tuple]: `(version, pfad)` aufsteigend nach Version.
+    """
+    files = []
+    for name in sorted(os.listdir(directory)):
+        match = _FILENAME.match(name)
+        if match and match.group(1) not in applied:
+            files.append((match.group(1), os.path.join(directory, name)))
+    return files
+
+
+def apply_migrations(db_connection):
+    """
+    Spielt alle ausstehenden Migrationen ein.
+
+    Args:
+        db_connection (callable): Liefert einen Context-Manager mit einer psycopg2-Verbindung.
+
+    Returns:
+        list[str]: Die eingespielten Versionen (leer, wenn alles aktuell ist).
+    """
+    done = []
+    with db_connection() as db, db.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+        try:
+            cursor.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+                                  version TEXT PRIMARY KEY,
+                                  applied_at TIMESTAMPTZ NOT NULL DEFAULT now())""")
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+            db.commit()
+            for version, path in pending_files(applied):
+                with open(path, encoding='utf-8') as f:
+                    cursor.execute(f.read())
+                cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+                db.commit()
+                print(f"Migration {os.path.basename(path)} eingespielt")
+                done.append(version)
+        finally:
+            db.rollback()
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+            db.commit()
+    return done
+
+
+if __name__ == '__main__':
+    from vvs_app import get_db_connection
+    print(apply_migrations(get_db_connection) or "Datenbank ist aktuell")
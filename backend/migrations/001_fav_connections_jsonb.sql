@@ -0,0 +1,23 @@
+-- Favoriten: Abschnitte als JSONB, Index für Keyset-Pagination und serverseitige Duplikaterkennung
+
+-- Abschnitte bisher als JSON-Text gespeichert
+ALTER TABLE fav_connections ALTER COLUMN sections_json TYPE JSONB USING sections_json::jsonb;
+
+-- Keyset-Pagination braucht einen vollständigen Sortierschlüssel (created_at, id)
+UPDATE fav_connections SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE fav_connections ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE fav_connections ALTER COLUMN created_at SET NOT NULL;
+
+-- Bereits mehrfach gespeicherte Verbindungen entfernen (ältester Eintrag bleibt)
+DELETE FROM fav_connections a USING fav_connections b
+WHERE a.username = b.username AND a.id > b.id
+  AND a.dep_time = b.dep_time AND a.arr_time = b.arr_time AND a.sections_json = b.sections_json;
+
+-- Identität einer Verbindung: Abfahrt, Ankunft und Abschnitte
+ALTER TABLE fav_connections ADD COLUMN IF NOT EXISTS journey_key TEXT
+    GENERATED ALWAYS AS (md5(dep_time::text || '|' || arr_time::text || '|' || sections_json::text)) STORED;
+CREATE UNIQUE INDEX IF NOT EXISTS fav_connections_username_journey_key
+    ON fav_connections (username, journey_key);
+
+CREATE INDEX IF NOT EXISTS fav_connections_username_created_at
+    ON fav_connections (username, created_at DESC, id DESC);
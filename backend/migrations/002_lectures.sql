@@ -0,0 +1,27 @@
+-- Vorlesungen: lokale Kopie der Rapla-Termine je Kurs (abgeglichen durch `lectures.LectureSync`)
+
+CREATE TABLE IF NOT EXISTS lectures (
+    course TEXT NOT NULL,
+    event_key TEXT NOT NULL,          -- Identität des Termins (siehe `lectures.event_key`)
+    name TEXT,
+    start_time TIMESTAMPTZ NOT NULL,
+    end_time TIMESTAMPTZ NOT NULL,
+    content_hash TEXT NOT NULL,       -- md5 des Original-Events, erkennt geänderte Termine
+    event JSONB NOT NULL,             -- Original-Event der dhbw.app (Antwortformat von /api/timetable)
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (course, event_key)
+);
+
+-- Zeitraum-Abfragen je Kurs (Wochenansicht) und kursübergreifend nach Zeit
+CREATE INDEX IF NOT EXISTS lectures_course_start_time ON lectures (course, start_time);
+CREATE INDEX IF NOT EXISTS lectures_start_time ON lectures (start_time);
+
+-- Abgleichstatus je Kurs: Validatoren für bedingte Anfragen und letzter Erfolg/Fehler
+CREATE TABLE IF NOT EXISTS lecture_sync (
+    course TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    events INTEGER NOT NULL DEFAULT 0,
+    synced_at TIMESTAMPTZ,
+    last_error TEXT
+);
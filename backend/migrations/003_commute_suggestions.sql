@@ -0,0 +1,13 @@
+-- Vorberechnete Pendelverbindungen je Nutzer und Vorlesungstag (geschrieben durch `commute.CommuteScheduler`)
+
+CREATE TABLE IF NOT EXISTS commute_suggestions (
+    username TEXT NOT NULL REFERENCES user_profiles(username) ON DELETE CASCADE,
+    travel_date DATE NOT NULL,
+    mode TEXT NOT NULL,               -- 'to_uni' oder 'from_uni'
+    search_time TEXT NOT NULL,        -- HHMM der Suche (erste Vorlesung bzw. letzte Vorlesung)
+    buffer INTEGER NOT NULL,
+    home_stop_id TEXT NOT NULL,
+    journeys JSONB NOT NULL,          -- Antwortformat von `/api/connections` ('journeys')
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (username, travel_date, mode)
+);
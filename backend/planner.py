@@ -0,0 +1,472 @@
+"""
+Campus VVS Navigator - Suchplanung der Verbindungssuche
+
+Dieses Modul entscheidet, welche EFA-Trip-Anfragen eine Verbindungssuche wirklich
+braucht, und bewertet die Ergebnisse.
+
+Modell:
+    Jede Campus-Haltestelle ist eine sortierte Liste: Eine Ankunftssuche ('arr') liefert
+    die spätesten Verbindungen mit Ankunft <= Suchzeit, eine Abfahrtssuche ('dep') die
+    frühesten mit Abfahrt >= Suchzeit. Mit `calcNumberOfTrips` wird nur der Anfang der
+    Liste geladen. Noch nicht geladene Verbindungen einer Haltestelle sind deshalb
+    höchstens so gut wie ihre schlechteste geladene (die Schwelle der Haltestelle).
+
+Ranking (`pareto_rank`):
+    * Echte Zeitpunkte statt "HH:MM"-Strings (Fahrten über Mitternacht).
+    * Identische Verbindungen (z. B. über beide Campus-Haltestellen) zählen einmal.
+    * Pareto-Kriterien: Ankunft bzw. Abfahrt, Dauer, Umstiege. Verbindungen, die eine
+      andere in allen Kriterien schlägt, rücken nur nach, wenn sonst Plätze frei blieben.
+
+Planung (`ConnectionSearch`):
+    1. Erste Runde: alle Haltestellen parallel, je mit `limit` + 1 Fahrten. Die Reserve
+       macht Folgeanfragen selten und die geladenen Zeitfenster tief genug für spätere
+       Suchen derselben Relation.
+    2. Weitergelesen wird nur bei Haltestellen, deren Schwelle besser ist als die
+       schlechteste ausgewählte Verbindung: Nur dort können ungeladene Verbindungen in
+       der angezeigten Zeitspanne liegen. Die Folgeanfrage beginnt an der Schwelle und
+       fragt nur so viele Fahrten an, wie Plätze dahinter liegen.
+    3. Haltestellen, deren bestes mögliches Ergebnis außerhalb der Auswahl liegt, die
+       erschöpft sind oder bei denen Start = Ziel ist, entfallen. Damit ist jede
+       Verbindung, deren Zeit innerhalb der angezeigten Spanne liegt, geladen.
+    Anfragen, die ein geladenes Zeitfenster beantworten kann (`resolve`), kosten weder
+    einen Upstream-Aufruf noch eine Runde.
+
+Zeitfenster (`TripWindows`):
+    Eine geladene Liste deckt lückenlos den Bereich zwischen ihrer Suchzeit und ihrer
+    schlechtesten Verbindung ab. Eine spätere Anfrage derselben Relation, deren Antwort
+    vollständig in diesem Bereich liegt (z. B. andere Pufferzeit, Folgeanfrage des
+    Planers, Batch-Suchen), wird ohne Upstream-Aufruf aus dem Fenster beantwortet. Liegt
+    nur der Anfang der Antwort darin, übernimmt die Planung diesen und liest bei Bedarf
+    ab dessen Ende weiter.
+
+Die EFA liefert Uhrzeiten in UTC, die Suchzeit (`itdDate`/`itdTime`) ist Ortszeit der
+EFA (`tz`). Vergleiche erfolgen deshalb in UTC.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+_DAY = timedelta(days=1)
+
+
+def clock_minutes(hhmm):
+    """
+    Minuten seit Mitternacht einer Uhrzeit "HH:MM" oder None, wenn sie ungültig ist.
+
+    Beispiele:
+        >>> clock_minutes("08:15")
+        495
+        >>> clock_minutes("--:--") is None
+        True
+    """
+    try:
+        hours, minutes = hhmm.split(':')
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+
+def anchor_time(hhmm, reference):
+    """
+    Der Zeitpunkt mit der Uhrzeit `hhmm`, der `reference` am nächsten liegt (±12 Stunden).
+
+    Beispiele:
+        >>> anchor_time("23:50", datetime(2025, 12, 2, 0, 10))
+        datetime.datetime(2025, 12, 1, 23, 50)
+        >>> anchor_time("00:05", datetime(2025, 12, 1, 23, 40))
+        datetime.datetime(2025, 12, 2, 0, 5)
+    """
+    minutes = clock_minutes(hhmm)
+    if minutes is None:
+        return None
+    candidate = reference.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+    if candidate - reference > _DAY / 2:
+        candidate -= _DAY
+    elif reference - candidate > _DAY / 2:
+        candidate += _DAY
+    return candidate
+
+
+def search_bound(params, tz):
+    """
+    Die Suchzeit einer Trip-Anfrage in UTC (naiv) oder None bei ungültigem Datum/Uhrzeit.
+
+    Beispiele:
+        >>> from zoneinfo import ZoneInfo
+        >>> search_bound({"itdDate": "20251201", "itdTime": "0800"}, ZoneInfo("Europe/Berlin"))
+        datetime.datetime(2025, 12, 1, 7, 0)
+    """
+    try:
+        local = datetime.strptime(f"{params['itdDate']}{params['itdTime']}", "%Y%m%d%H%M")
+    except (KeyError, TypeError, ValueError):
+        return None
+    return local.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def journey_identity(journey):
+    """Schlüssel für identische Verbindungen (gleiche Abschnitte mit gleichen Zeiten)."""
+    return tuple((s.get('line'), s.get('from'), s.get('to'), s.get('departure'), s.get('arrival'))
+                 for s in journey.get('sections', []))
+
+
+def _time_field(deparr):
+    return 'arr' if deparr == 'arr' else 'dep'
+
+
+def _score(moment, deparr):
+    # Kleiner ist besser: späte Ankunft ('arr') bzw. frühe Abfahrt ('dep')
+    seconds = (moment - datetime(2000, 1, 1)).total_seconds()
+    return -seconds if deparr == 'arr' else seconds
+
+
+def _criteria(journey, moment, deparr):
+    return (_score(moment, deparr), journey.get('duration') or 0, journey.get('interchanges') or 0)
+
+
+def dominates(a, b):
+    """
+    Ob Kriterien-Tupel `a` das Tupel `b` Pareto-dominiert (nirgends schlechter, einmal besser).
+
+    Beispiele:
+        >>> dominates((0, 20, 1), (0, 25, 1))
+        True
+        >>> dominates((0, 20, 2), (0, 25, 1))
+        False
+    """
+    return a != b and all(x <= y for x, y in zip(a, b))
+
+
+def _scored(journeys, deparr, reference):
+    """Dedupliziert und bewertet Verbindungen: Liste von (Kriterien, Zeitpunkt, Verbindung)."""
+    field = _time_field(deparr)
+    unique = {}
+    for journey in journeys:
+        unique.setdefault(journey_identity(journey), journey)
+    scored = []
+    for journey in unique.values():
+        if reference is None:
+            minutes = clock_minutes(journey.get(field))
+            if minutes is not None:
+                reference = datetime(2000, 1, 1) + timedelta(minutes=minutes)
+        moment = anchor_time(journey.get(field), reference) if reference else None
+        if moment is None:
+            moment = datetime.max if deparr == 'dep' else datetime.min
+        scored.append((_criteria(journey, moment, deparr), moment, journey))
+    return scored
+
+
+def _select(scored, limit):
+    """Wählt die besten `limit` Einträge: nicht dominierte zuerst, dann auffüllen."""
+    front, dominated = [], []
+    for entry in scored:
+        (dominated if any(dominates(other[0], entry[0]) for other in scored) else front).append(entry)
+    front.sort(key=lambda e: e[0])
+    dominated.sort(key=lambda e: e[0])
+    selected = front[:limit] + dominated[:max(0, limit - len(front))]
+    selected.sort(key=lambda e: e[0])
+    return selected, front
+
+
+def pareto_rank(journeys, deparr, limit=5, reference=None):
+    """
+    Rankt Verbindungen nach echten Zeitpunkten und Pareto-Kriterien (siehe Modul-Docstring).
+
+    Args:
+        journeys (list[dict]): Verbindungen aus `parse_vvs_data` (beliebig vieler Anfragen).
+        deparr (str): 'arr' (späteste Ankunft zuerst) oder 'dep' (früheste Abfahrt zuerst).
+        limit (int): Maximale Anzahl der Ergebnisse.
+        reference (datetime, optional): Bezugszeitpunkt für Tageswechsel (Standard: die
+            Uhrzeit der ersten Verbindung).
+
+    Returns:
+        list[dict]: Höchstens `limit` verschiedene Verbindungen in Anzeigereihenfolge.
+
+    Beispiele:
+        >>> a = {"dep": "23:40", "arr": "00:10", "duration": 30, "interchanges": 0, "sections": [{"line": "U1"}]}
+        >>> b = {"dep": "23:20", "arr": "23:55", "duration": 35, "interchanges": 1, "sections": [{"line": "U2"}]}
+        >>> [j["arr"] for j in pareto_rank([b, a, a], 'arr')]
+        ['00:10', '23:55']
+        >>> len(pareto_rank([b, a], 'arr', limit=1))
+        1
+    """
+    selected, _ = _select(_scored(journeys, deparr, reference), limit)
+    return [journey for _, _, journey in selected]
+
+
+class _Stop:
+    """Planungszustand einer Campus-Haltestelle (eine sortierte Liste)."""
+
+    def __init__(self, params, bound):
+        self.params = params
+        self.bound = bound
+        self.threshold = bound
+        self.journeys = []
+        self.known = set()
+        self.pending = 0
+        self.queried = False
+        self.failed = False
+        # Start = Ziel: nichts zu suchen
+        self.exhausted = str(params.get('name_origin')) == str(params.get('name_destination'))
+
+    @property
+    def closed(self):
+        return self.exhausted or self.failed or (self.queried and self.bound is None)
+
+
+class ConnectionSearch:
+    """
+    Plant die Trip-Anfragen einer Verbindungssuche in Runden (siehe Modul-Docstring).
+
+    Der Aufrufer führt die Anfragen jeder Runde aus (blockierend oder async) und meldet
+    die Ergebnisse zurück, bis `next_queries` keine Anfragen mehr liefert:
+
+        search = ConnectionSearch(all_params, tz)
+        while (queries := search.next_queries()):
+            for index, params in queries:
+                search.add(index, fetch(params))
+        search.journeys()
+
+    Args:
+        all_params (list[dict]): Die Trip-Parameter je Campus-Haltestelle (gleiche Richtung).
+        tz (tzinfo): Zeitzone der EFA-Suchzeiten.
+        limit (int): Anzahl der gesuchten Verbindungen.
+        max_rounds (int): Maximale Anzahl an Runden (die erste eingeschlossen).
+        max_trips (int): Obergrenze für `calcNumberOfTrips` einer Anfrage.
+        resolve (callable, optional): Beantwortet eine Anfrage ohne Upstream-Aufruf, z. B.
+            `TripWindows.lookup(params, partial=True)`; liefert den Anfang der Antwort oder None.
+    """
+
+    def __init__(self, all_params, tz, limit=5, max_rounds=3, max_trips=10, resolve=None):
+        self.deparr = all_params[0]["itdTripDateTimeDepArr"] if all_params else 'dep'
+        self.tz = tz
+        self.limit = limit
+        self.max_rounds = max_rounds
+        self.max_trips = max_trips
+        self.resolve = resolve
+        self.rounds = 0
+        self.stops = [_Stop(params, search_bound(params, tz)) for params in all_params]
+        # Anteilig: jede Haltestelle muss nur ihren Teil der Plätze (plus eine Reserve) liefern
+        self.first_trips = limit + 1
+
+    def _progress(self):
+        """
+        Bewertet alle bisher geladenen Verbindungen.
+
+        Returns:
+            tuple: `(selected, cutoff)` mit der aktuellen Auswahl (nach Kriterien sortiert)
+                und dem Zeitwert der schlechtesten ausgewählten Verbindung (None, solange
+                weniger als `limit` Verbindungen vorliegen).
+        """
+        journeys = [j for stop in self.stops for j in stop.journeys]
+        reference = next((s.bound for s in self.stops if s.bound is not None), None)
+        selected, _ = _select(_scored(journeys, self.deparr, reference), self.limit)
+        cutoff = max(criteria[0] for criteria, _, _ in selected) if len(selected) >= self.limit else None
+        return selected, cutoff
+
+    def _open(self, cutoff):
+        # Offene Haltestellen, deren ungeladene Verbindungen noch in die Auswahl reichen
+        return [s for s in self.stops
+                if not s.closed and (cutoff is None or _score(s.threshold, self.deparr) < cutoff)]
+
+    def proven(self):
+        """Ob weitere Anfragen das Ergebnis nachweislich nicht mehr verbessern können."""
+        return not self._open(self._progress()[1])
+
+    def next_queries(self):
+        """
+        Liefert die Anfragen der nächsten Runde.
+
+        Anfragen, die `resolve` beantworten kann, werden sofort übernommen und nicht
+        zurückgegeben.
+
+        Returns:
+            list[tuple[int, dict]]: Paare aus Haltestellen-Index und Trip-Parametern; leer,
+                wenn die Suche abgeschlossen ist.
+        """
+        while self.rounds < self.max_rounds:
+            queries, resolved = [], False
+            for index, params in self._candidates():
+                journeys = self.resolve(params) if self.resolve else None
+                if journeys is not None and self._absorb(self.stops[index], journeys, partial=True):
+                    resolved = True
+                else:
+                    queries.append((index, params))
+            if queries:
+                self.rounds += 1
+                return queries
+            if not resolved:
+                break
+        return []
+
+    def _candidates(self):
+        """Die Anfragen, die beim aktuellen Stand noch etwas ändern könnten."""
+        if all(not stop.queried for stop in self.stops):
+            return [(index, self._request(stop, stop.params, self.first_trips))
+                    for index, stop in enumerate(self.stops) if not stop.closed]
+        selected, cutoff = self._progress()
+        candidates = []
+        for stop in self._open(cutoff):
+            local = stop.threshold.replace(tzinfo=timezone.utc).astimezone(self.tz)
+            params = {**stop.params, "itdDate": local.strftime("%Y%m%d"), "itdTime": local.strftime("%H%M")}
+            # Höchstens so viele, wie Plätze hinter der Schwelle liegen, plus die Schwelle selbst
+            behind = sum(1 for criteria, _, _ in selected if criteria[0] >= _score(stop.threshold, self.deparr))
+            candidates.append((self.stops.index(stop), self._request(stop, params, behind + 1)))
+        return candidates
+
+    def _request(self, stop, params, trips):
+        stop.pending = min(max(trips, 1), self.max_trips)
+        stop.queried = True
+        return {**params, "calcNumberOfTrips": stop.pending}
+
+    def add(self, index, outcome):
+        """
+        Übernimmt das Ergebnis einer Anfrage.
+
+        Args:
+            index (int): Haltestellen-Index aus `next_queries`.
+            outcome (list[dict] | None): Die geparsten Verbindungen, None bei Fehler.
+        """
+        stop = self.stops[index]
+        if outcome is None:
+            stop.failed = True
+            return
+        self._absorb(stop, outcome)
+
+    def _absorb(self, stop, outcome, partial=False):
+        """
+        Übernimmt Verbindungen einer Haltestelle und verschiebt ihre Schwelle.
+
+        Returns:
+            bool: Ob neue Verbindungen dabei waren.
+        """
+        new = [j for j in outcome if journey_identity(j) not in stop.known]
+        if not partial and (len(outcome) < stop.pending or not new):
+            # Weniger als angefragt (Suchzeitraum erschöpft) oder kein Fortschritt
+            stop.exhausted = True
+        for journey in new:
+            stop.known.add(journey_identity(journey))
+            stop.journeys.append(journey)
+            if stop.bound is not None:
+                moment = anchor_time(journey.get(_time_field(self.deparr)), stop.bound)
+                if moment is not None and _score(moment, self.deparr) > _score(stop.threshold, self.deparr):
+                    stop.threshold = moment
+        return bool(new)
+
+    def outcomes(self):
+        """Die gesammelten Verbindungen je Haltestelle (None, wenn keine Anfrage gelang)."""
+        return [None if stop.failed and not stop.journeys else stop.journeys for stop in self.stops]
+
+    def journeys(self):
+        """Die `limit` besten Verbindungen aller Haltestellen (siehe `pareto_rank`)."""
+        return [journey for _, _, journey in self._progress()[0]]
+
+
+class _Window:
+    __slots__ = ('bound', 'entries', 'expires')
+
+    def __init__(self, bound, entries, expires):
+        self.bound = bound
+        self.entries = entries
+        self.expires = expires
+
+
+class TripWindows:
+    """
+    Beantwortet Trip-Anfragen aus bereits geladenen Zeitfenstern derselben Relation.
+
+    Args:
+        tz (tzinfo): Zeitzone der EFA-Suchzeiten.
+        ttl (float): Lebensdauer eines Fensters in Sekunden (wie der Trip-Cache).
+        maxsize (int): Maximale Anzahl gespeicherter Relationen.
+        per_relation (int): Maximale Anzahl an Fenstern je Relation.
+    """
+
+    def __init__(self, tz, ttl=60, maxsize=1024, per_relation=8):
+        self.tz = tz
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.per_relation = per_relation
+        self._relations = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _relation(params):
+        return (str(params["name_origin"]), str(params["name_destination"]), params["itdTripDateTimeDepArr"])
+
+    def lookup(self, params, partial=False):
+        """
+        Liefert die Antwort einer Anfrage aus einem überdeckenden Fenster oder None.
+
+        Args:
+            params (dict): Die Trip-Parameter.
+            partial (bool): Auch weniger als `calcNumberOfTrips` Verbindungen liefern. Das
+                Ergebnis ist dann der Anfang der Liste, die die EFA liefern würde.
+
+        Returns:
+            list[dict] | None: Die Verbindungen, die die EFA für `params` liefern würde
+                (chronologisch), oder None ohne überdeckendes Fenster.
+        """
+        bound = search_bound(params, self.tz)
+        if bound is None:
+            return None
+        arrival = params["itdTripDateTimeDepArr"] == 'arr'
+        count = int(params["calcNumberOfTrips"])
+        now = time.monotonic()
+        best = []
+        with self._lock:
+            for window in self._relations.get(self._relation(params), []):
+                if window.expires < now or (window.bound < bound if arrival else window.bound > bound):
+                    continue
+                inside = [(m, j) for m, j in window.entries if (m <= bound if arrival else m >= bound)]
+                if len(inside) > len(best):
+                    best = inside
+                if len(best) >= count:
+                    break
+            if not best or (len(best) < count and not partial):
+                self.misses += 1
+                return None
+            self.hits += 1
+        best.sort(key=lambda e: e[0], reverse=arrival)
+        chosen = sorted(best[:count], key=lambda e: e[0])
+        return [j for _, j in chosen]
+
+    def add(self, params, journeys):
+        """Speichert die Antwort einer Upstream-Anfrage als Fenster ihrer Relation."""
+        bound = search_bound(params, self.tz)
+        if bound is None:
+            return
+        field = _time_field(params["itdTripDateTimeDepArr"])
+        entries = [(anchor_time(j.get(field), bound), j) for j in journeys]
+        if any(moment is None for moment, _ in entries):
+            return
+        key = self._relation(params)
+        with self._lock:
+            windows = self._relations.pop(key, [])
+            windows.append(_Window(bound, entries, time.monotonic() + self.ttl))
+            self._relations[key] = windows[-self.per_relation:]
+            while len(self._relations) > self.maxsize:
+                self._relations.popitem(last=False)
+
+    def clear(self):
+        """Verwirft alle Fenster und setzt die Kennzahlen zurück."""
+        with self._lock:
+            self._relations.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Gibt die Kennzahlen der Zeitfenster zurück.
+
+        Returns:
+            dict: 'relations', 'hits' (ohne Upstream-Aufruf beantwortet) und 'misses'.
+        """
+        with self._lock:
+            return {"relations": len(self._relations), "hits": self.hits, "misses": self.misses}
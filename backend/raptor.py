@@ -0,0 +1,548 @@
+"""
+Campus VVS Navigator - Offline-Routing auf GTFS-Fahrplandaten (RAPTOR)
+
+Lädt einen GTFS-Feed des VVS in kompakte, Array-basierte Strukturen und beantwortet
+Trip-Anfragen lokal, ohne `XML_TRIP_REQUEST2`. Die Ergebnisse haben dieselbe Form wie
+`vvs_app.parse_vvs_data` (nur Planzeiten, keine Echtzeit).
+
+Datenmodell:
+    * Haltestellen werden auf Stationsebene zusammengefasst. Steige wie
+      'de:08111:6072:1:2' (bzw. deren `parent_station`) werden auf die globale ID
+      'de:08111:6072' aus `haltestellen.csv` abgebildet (`station_key`).
+    * Fahrten mit gleicher Haltfolge bilden ein Muster (Route-Pattern). Muster, in denen
+      sich Fahrten überholen, werden aufgeteilt, damit jede Zeitspalte sortiert ist.
+    * Alle Muster liegen in flachen `array`-Spalten (CSR-Layout): Haltfolgen, Fahrten,
+      Ab- und Ankunftszeiten in Sekunden ab Mitternacht des Betriebstags.
+    * Eine zweite, gespiegelte Kopie (umgekehrte Haltfolge, negierte Zeiten) beantwortet
+      Ankunftssuchen mit demselben Algorithmus.
+
+Suche (`GtfsRouter.journeys`):
+    RAPTOR in Runden (Runde k = höchstens k Fahrten), mit Mindestumstiegszeit an einer
+    Station und Fußwegen aus `transfers.txt`. Für eine Liste wie bei der EFA wird die
+    Suche ab der Abfahrt der zuletzt gefundenen Verbindung wiederholt. Betriebstage
+    werden über `calendar.txt`/`calendar_dates.txt` bestimmt, Fahrten des Vortags nach
+    Mitternacht (Zeiten über 24:00:00) und des Folgetags werden mitberücksichtigt.
+
+Zeiten:
+    Wie die EFA interpretiert der Router `itdDate`/`itdTime` als Ortszeit (`tz`) und
+    liefert Uhrzeiten in UTC ("HH:MM"), damit die Ergebnisse mit EFA-Antworten
+    austauschbar sind.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import io
+import os
+import csv
+import zipfile
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+DAY = 86400
+_INF = float('inf')
+_WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+def parse_gtfs_time(value):
+    """
+    Wandelt eine GTFS-Uhrzeit in Sekunden ab Mitternacht des Betriebstags um.
+
+    Beispiele:
+        >>> parse_gtfs_time("08:15:30")
+        29730
+        >>> parse_gtfs_time("25:10:00")
+        90600
+        >>> parse_gtfs_time("") is None
+        True
+    """
+    if not value:
+        return None
+    hours, minutes, seconds = value.strip().split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def station_key(stop_id, parent=None):
+    """
+    Bildet einen GTFS-Halt auf seine Station ab (globale ID wie in `haltestellen.csv`).
+
+    Beispiele:
+        >>> station_key("de:08111:6072:1:2")
+        'de:08111:6072'
+        >>> station_key("de:08111:6072:1:2", parent="de:08111:6072")
+        'de:08111:6072'
+        >>> station_key("12345")
+        '12345'
+    """
+    key = (parent or stop_id).strip()
+    parts = key.split(':')
+    if len(parts) >= 3 and parts[0].isalpha() and parts[1].isdigit():
+        return ':'.join(parts[:3])
+    return key
+
+
+def _open_feed(path):
+    """Liefert eine Funktion, die eine GTFS-Tabelle (ZIP oder Verzeichnis) als Zeilen liest."""
+    if os.path.isdir(path):
+        def rows(name):
+            file_path = os.path.join(path, name)
+            if not os.path.exists(file_path):
+                return []
+            with open(file_path, encoding='utf-8-sig', newline='') as f:
+                return list(csv.DictReader(f))
+        return rows
+
+    archive = zipfile.ZipFile(path)
+
+    def rows(name):
+        if name not in archive.namelist():
+            return []
+        with archive.open(name) as raw:
+            return list(csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')))
+    return rows
+
+
+def _fifo_split(trips):
+    """Teilt die Fahrten eines Musters so auf, dass sich keine Fahrten überholen."""
+    groups = []
+    for trip in sorted(trips, key=lambda t: t[2][0]):
+        for group in groups:
+            last = group[-1]
+            if all(d >= ld for d, ld in zip(trip[2], last[2])) and all(a >= la for a, la in zip(trip[3], last[3])):
+                group.append(trip)
+                break
+        else:
+            groups.append([trip])
+    return groups
+
+
+class _Network:
+    """
+    Muster einer Suchrichtung in flachen Arrays.
+
+    Ein Muster `p` hat die Halte `stops[stop_start[p]:stop_start[p + 1]]` und die Fahrten
+    `trip_start[p]` bis `trip_start[p + 1]` (sortiert). Die Zeit der Fahrt `j` (relativ
+    zum Muster) am Halt `i` steht in `dep`/`arr` an `time_start[p] + j * Halte + i`.
+    """
+
+    def __init__(self, n_stations, patterns, footpaths):
+        self.n_stations = n_stations
+        self.stop_start, self.stops = array('i', [0]), array('i')
+        self.trip_start, self.trip_service, self.trip_line = array('i', [0]), array('i'), array('i')
+        self.time_start, self.dep, self.arr = array('i', [0]), array('i'), array('i')
+        serving = [[] for _ in range(n_stations)]
+        for index, (stations, trips) in enumerate(patterns):
+            for position, station in enumerate(stations):
+                serving[station].append((index, position))
+            self.stops.extend(stations)
+            self.stop_start.append(len(self.stops))
+            for service, line, deps, arrs in trips:
+                self.trip_service.append(service)
+                self.trip_line.append(line)
+                self.dep.extend(deps)
+                self.arr.extend(arrs)
+            self.trip_start.append(len(self.trip_service))
+            self.time_start.append(len(self.dep))
+
+        # Station -> (Muster, Position) und Station -> Fußwege, ebenfalls im CSR-Layout
+        self.serving_start, self.serving_pattern, self.serving_position = array('i', [0]), array('i'), array('i')
+        for entries in serving:
+            for pattern, position in entries:
+                self.serving_pattern.append(pattern)
+                self.serving_position.append(position)
+            self.serving_start.append(len(self.serving_pattern))
+        walks = [[] for _ in range(n_stations)]
+        for origin, destination, seconds in footpaths:
+            walks[origin].append((destination, seconds))
+        self.foot_start, self.foot_to, self.foot_seconds = array('i', [0]), array('i'), array('i')
+        for entries in walks:
+            for destination, seconds in entries:
+                self.foot_to.append(destination)
+                self.foot_seconds.append(seconds)
+            self.foot_start.append(len(self.foot_to))
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in vars(self).values() if isinstance(a, array))
+
+    def _earliest(self, pattern, position, ready, days):
+        """Früheste fahrende Fahrt ab `ready` am Halt `position`: (Fahrt, Verschiebung) oder None."""
+        n_stops = self.stop_start[pattern + 1] - self.stop_start[pattern]
+        first, count = self.trip_start[pattern], self.trip_start[pattern + 1] - self.trip_start[pattern]
+        base = self.time_start[pattern] + position
+        dep, services = self.dep, self.trip_service
+        best = None
+        for active, shift in days:
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if dep[base + mid * n_stops] + shift < ready:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            for trip in range(lo, count):
+                if active[services[first + trip]]:
+                    if best is None or dep[base + trip * n_stops] + shift < best[0]:
+                        best = (dep[base + trip * n_stops] + shift, trip, shift)
+                    break
+        return best and best[1:]
+
+    def search(self, source, target, start, days, rounds, change):
+        """
+        RAPTOR von `source` ab `start` (Sekunden) mit höchstens `rounds` Fahrten.
+
+        Fußwege werden nicht verkettet: Sie beginnen an der Quelle oder an einer
+        Fahrt-Ankunft. Deshalb führt die Suche getrennte Marken für Fahrt-Ankünfte
+        (`arrived`, Ausgangspunkt der Fußwege) und für den frühesten Einstieg (`ready`,
+        inkl. Umstiegszeit bzw. nach einem Fußweg).
+
+        Returns:
+            list | None: Abschnitte der frühesten Ankunft am Ziel (bei gleicher Ankunft mit
+                den wenigsten Fahrten): ('trip', Linie, von, nach, ab, an) bzw.
+                ('walk', von, nach, Sekunden), oder None.
+        """
+        stop_start, stops, time_start = self.stop_start, self.stops, self.time_start
+        dep, arr = self.dep, self.arr
+        # Marken verweisen auf ihren Vorgänger als (Runde, Art, Station)
+        source_ref = (0, 'source', source)
+        ready = {source: (start, source_ref)}
+        arrived = {source: start}  # keine Rundfahrten zurück zur Quelle
+        parents = [{}]
+        target_best, target_ref = (start, source_ref) if source == target else (_INF, None)
+        marked = {source}
+        for j in range(self.foot_start[source], self.foot_start[source + 1]):
+            station, arrival = self.foot_to[j], start + self.foot_seconds[j]
+            if arrival < ready.get(station, (_INF,))[0]:
+                ready[station] = (arrival, (0, 'walk', station))
+                parents[0][('walk', station)] = (source, self.foot_seconds[j], source_ref)
+                marked.add(station)
+                if station == target:
+                    target_best, target_ref = arrival, (0, 'walk', station)
+
+        for k in range(1, rounds + 1):
+            queue = {}
+            for station in marked:
+                for j in range(self.serving_start[station], self.serving_start[station + 1]):
+                    pattern, position = self.serving_pattern[j], self.serving_position[j]
+                    if position < queue.get(pattern, _INF):
+                        queue[pattern] = position
+            marked, labels, round_parents, previous = set(), {}, {}, dict(ready)
+            for pattern, first in queue.items():
+                offset, n_stops = stop_start[pattern], stop_start[pattern + 1] - stop_start[pattern]
+                trip, shift, board, board_ref, row = None, 0, 0, None, 0
+                for i in range(first, n_stops):
+                    station = stops[offset + i]
+                    if trip is not None:
+                        arrival = arr[row + i] + shift
+                        if arrival < arrived.get(station, _INF) and arrival < target_best:
+                            arrived[station] = labels[station] = arrival
+                            round_parents[('trip', station)] = (pattern, trip, board, i, shift, board_ref)
+                            marked.add(station)
+                            if station == target:
+                                target_best, target_ref = arrival, (k, 'trip', station)
+                    boarding = previous.get(station)
+                    if boarding is not None and (trip is None or boarding[0] <= dep[row + i] + shift):
+                        found = self._earliest(pattern, i, boarding[0], days)
+                        if found is not None and found != (trip, shift):
+                            trip, shift = found
+                            board, board_ref = i, boarding[1]
+                            row = time_start[pattern] + trip * n_stops
+            for station, arrival in labels.items():
+                if arrival + change < ready.get(station, (_INF,))[0]:
+                    ready[station] = (arrival + change, (k, 'trip', station))
+            for station in labels:
+                for j in range(self.foot_start[station], self.foot_start[station + 1]):
+                    other, arrival = self.foot_to[j], labels[station] + self.foot_seconds[j]
+                    if arrival >= target_best:
+                        continue
+                    improves = arrival < ready.get(other, (_INF,))[0]
+                    if improves or other == target:
+                        round_parents[('walk', other)] = (station, self.foot_seconds[j], (k, 'trip', station))
+                    if improves:
+                        ready[other] = (arrival, (k, 'walk', other))
+                        marked.add(other)
+                    if other == target:
+                        target_best, target_ref = arrival, (k, 'walk', other)
+            parents.append(round_parents)
+            if not marked:
+                break
+
+        if target_ref is None:
+            return None
+        return self._legs(parents, target_ref)
+
+    def _legs(self, parents, ref):
+        """Rekonstruiert die Abschnitte zum Ziel aus den Vorgängern der Runden."""
+        legs = []
+        k, kind, station = ref
+        while kind != 'source':
+            entry = parents[k][(kind, station)]
+            if kind == 'walk':
+                origin, seconds, ref = entry
+                legs.append(('walk', origin, station, seconds))
+            else:
+                pattern, trip, board, alight, shift, ref = entry
+                n_stops = self.stop_start[pattern + 1] - self.stop_start[pattern]
+                row = self.time_start[pattern] + trip * n_stops
+                origin = self.stops[self.stop_start[pattern] + board]
+                legs.append(('trip', self.trip_line[self.trip_start[pattern] + trip], origin, station,
+                             self.dep[row + board] + shift, self.arr[row + alight] + shift))
+            k, kind, station = ref
+        legs.reverse()
+        return legs
+
+
+class GtfsRouter:
+    """
+    Fahrplanauskunft auf Basis eines GTFS-Feeds (siehe Modul-Docstring).
+
+    Args:
+        path (str): GTFS-Feed als ZIP-Datei oder entpacktes Verzeichnis.
+        tz (tzinfo): Zeitzone der Suchzeiten und des Feeds.
+        change_time (int): Mindestumstiegszeit an einer Station in Sekunden.
+        max_transfers (int): Maximale Anzahl an Umstiegen.
+    """
+
+    def __init__(self, path, tz, change_time=120, max_transfers=3):
+        self.tz = tz
+        self.change_time = change_time
+        self.rounds = max_transfers + 1
+        self._days = OrderedDict()
+        self._lock = threading.Lock()
+        self.queries = 0
+        self._load(_open_feed(path))
+
+    def _load(self, rows):
+        stops = rows('stops.txt')
+        parents = {s['stop_id']: s.get('parent_station') or None for s in stops}
+        self.station_ids, self.station_names, index = [], [], {}
+        stop_station = {}
+        # Stationen zuerst (Namen der übergeordneten Station bevorzugt), dann Steige
+        for stop in sorted(stops, key=lambda s: bool(parents.get(s['stop_id']))):
+            key = station_key(stop['stop_id'], parents.get(stop['stop_id']))
+            if key not in index:
+                index[key] = len(self.station_ids)
+                self.station_ids.append(key)
+                self.station_names.append(stop.get('stop_name') or key)
+            stop_station[stop['stop_id']] = index[key]
+        self.station_index = index
+
+        self.lines = []
+        line_index = {}
+        route_lines = {}
+        for route in rows('routes.txt'):
+            name = route.get('route_short_name') or route.get('route_long_name') or route['route_id']
+            route_lines[route['route_id']] = line_index.setdefault(name, len(line_index))
+        self.lines = sorted(line_index, key=line_index.get)
+
+        self.service_ids, service_index = [], {}
+        self._calendar, self._exceptions = [], {}
+        for row in rows('calendar.txt'):
+            service_index[row['service_id']] = len(self.service_ids)
+            self.service_ids.append(row['service_id'])
+            self._calendar.append((tuple(row[d] == '1' for d in _WEEKDAYS), row['start_date'], row['end_date']))
+        for row in rows('calendar_dates.txt'):
+            if row['service_id'] not in service_index:
+                service_index[row['service_id']] = len(self.service_ids)
+                self.service_ids.append(row['service_id'])
+                self._calendar.append(((False,) * 7, '', ''))
+            self._exceptions.setdefault(row['date'], {})[service_index[row['service_id']]] = row['exception_type'] == '1'
+
+        trips = {t['trip_id']: (service_index.get(t['service_id'], -1), route_lines.get(t['route_id'], 0))
+                 for t in rows('trips.txt')}
+        calls = {}
+        for st in rows('stop_times.txt'):
+            if st['trip_id'] in trips and st['stop_id'] in stop_station:
+                arrival = parse_gtfs_time(st.get('arrival_time')) or parse_gtfs_time(st.get('departure_time'))
+                departure = parse_gtfs_time(st.get('departure_time')) or arrival
+                calls.setdefault(st['trip_id'], []).append(
+                    (int(st['stop_sequence']), stop_station[st['stop_id']], arrival, departure))
+
+        grouped = {}
+        for trip_id, trip_calls in calls.items():
+            service, line = trips[trip_id]
+            if service < 0:
+                continue
+            trip_calls.sort()
+            stations, arrs, deps = [], [], []
+            for _, station, arrival, departure in trip_calls:
+                if arrival is None:
+                    continue
+                if stations and stations[-1] == station:
+                    deps[-1] = departure  # Steigwechsel innerhalb der Station zusammenfassen
+                    continue
+                stations.append(station)
+                arrs.append(arrival)
+                deps.append(departure)
+            if len(stations) >= 2:
+                grouped.setdefault(tuple(stations), []).append((service, line, deps, arrs))
+
+        forward, backward = [], []
+        for stations, pattern_trips in grouped.items():
+            for group in _fifo_split(pattern_trips):
+                forward.append((stations, group))
+                # Gespiegelt: umgekehrte Haltfolge, negierte Zeiten (Ab- und Ankunft vertauscht)
+                mirrored = [(service, line, [-a for a in reversed(arrs)], [-d for d in reversed(deps)])
+                            for service, line, deps, arrs in reversed(group)]
+                backward.append((tuple(reversed(stations)), mirrored))
+
+        footpaths = []
+        for row in rows('transfers.txt'):
+            origin, destination = stop_station.get(row['from_stop_id']), stop_station.get(row['to_stop_id'])
+            if origin is None or destination is None or origin == destination or row.get('transfer_type') != '2':
+                continue
+            footpaths.append((origin, destination, int(row.get('min_transfer_time') or 0)))
+
+        self.forward = _Network(len(self.station_ids), forward, footpaths)
+        self.backward = _Network(len(self.station_ids), backward, [(d, o, s) for o, d, s in footpaths])
+
+    def _active(self, date):
+        """Die an einem Betriebstag (YYYYMMDD) verkehrenden Services als Bytemaske."""
+        with self._lock:
+            if date in self._days:
+                self._days.move_to_end(date)
+                return self._days[date]
+        weekday = datetime.strptime(date, "%Y%m%d").weekday()
+        active = bytearray(len(self.service_ids))
+        for service, (days, start, end) in enumerate(self._calendar):
+            active[service] = days[weekday] and start <= date <= end
+        for service, added in self._exceptions.get(date, {}).items():
+            active[service] = added
+        with self._lock:
+            self._days[date] = active
+            while len(self._days) > 32:
+                self._days.popitem(last=False)
+        return active
+
+    def _moment(self, day, seconds):
+        """Ortszeit (Betriebstag + Sekunden) als naive UTC-Zeit."""
+        local = day + timedelta(seconds=seconds)
+        return local.replace(tzinfo=self.tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+    def _format(self, day, legs, walk_start):
+        """
+        Formatiert Abschnitte wie `parse_vvs_data`. Fußwege werden an die Fahrten angelehnt,
+        ein reiner Fußweg beginnt um `walk_start`.
+        """
+        transit = [leg for leg in legs if leg[0] == 'trip']
+        times, clock = [], None if transit else walk_start
+        for index, leg in enumerate(legs):
+            if leg[0] == 'trip':
+                times.append((leg[4], leg[5]))
+                clock = leg[5]
+            elif clock is None:
+                # Fußweg vor der ersten Fahrt: so spät wie möglich losgehen
+                following = next(l for l in legs[index:] if l[0] == 'trip')
+                times.append((following[4] - leg[3], following[4]))
+                clock = following[4]
+            else:
+                times.append((clock, clock + leg[3]))
+                clock += leg[3]
+        sections = []
+        for leg, (start, end) in zip(legs, times):
+            line = self.lines[leg[1]] if leg[0] == 'trip' else "Fußweg"
+            origin, destination = (leg[2], leg[3]) if leg[0] == 'trip' else (leg[1], leg[2])
+            sections.append({
+                "line": line,
+                "from": self.station_names[origin],
+                "to": self.station_names[destination],
+                "departure": self._moment(day, start).strftime("%H:%M"),
+                "arrival": self._moment(day, end).strftime("%H:%M")
+            })
+        return {
+            "dep": sections[0]['departure'],
+            "arr": sections[-1]['arrival'],
+            "duration": (times[-1][1] - times[0][0]) // 60,
+            "interchanges": max(0, len(transit) - 1),
+            "sections": sections
+        }, times[0][0], times[-1][1]
+
+    def journeys(self, origin, destination, date, time, deparr='dep', count=4):
+        """
+        Beantwortet eine Suche wie `XML_TRIP_REQUEST2`.
+
+        Args:
+            origin (str): Globale ID der Start-Haltestelle ('de:08111:...').
+            destination (str): Globale ID der Ziel-Haltestelle.
+            date (str): Datum im Format YYYYMMDD (Ortszeit).
+            time (str): Uhrzeit im Format HHMM (Ortszeit).
+            deparr (str): 'dep' (Abfahrt ab `time`) oder 'arr' (Ankunft bis `time`).
+            count (int): Anzahl der Verbindungen.
+
+        Returns:
+            list[dict]: Höchstens `count` Verbindungen im Format von `parse_vvs_data`,
+                chronologisch sortiert. Leer bei unbekannten Haltestellen.
+        """
+        source, target = self.station_index.get(station_key(origin)), self.station_index.get(station_key(destination))
+        if source is None or target is None or source == target:
+            return []
+        day = datetime.strptime(date, "%Y%m%d")
+        bound = int(time[:2]) * 3600 + int(time[2:4]) * 60
+        arrival = deparr == 'arr'
+        # Betriebstage Vortag/Tag/Folgetag; gespiegelt sind die Zeiten negiert
+        days = [(self._active((day + timedelta(days=o)).strftime("%Y%m%d")), -o * DAY if arrival else o * DAY)
+                for o in (-1, 0, 1)]
+        network = self.backward if arrival else self.forward
+        self.queries += 1
+
+        found, seen = [], set()
+        cursor = -bound if arrival else bound
+        for _ in range(count * 3):
+            if len(found) >= count:
+                break
+            legs = network.search(target if arrival else source, source if arrival else target,
+                                  cursor, days, self.rounds, self.change_time)
+            if legs is None:
+                break
+            if arrival:
+                legs = [('trip', l[1], l[3], l[2], -l[5], -l[4]) if l[0] == 'trip' else ('walk', l[2], l[1], l[3])
+                        for l in reversed(legs)]
+            walk_only = all(leg[0] == 'walk' for leg in legs)
+            walk_start = bound - sum(leg[3] for leg in legs) if arrival else bound
+            journey, start, end = self._format(day, legs, walk_start)
+            # Nächste Suche knapp hinter der gefundenen Verbindung
+            cursor = -(end - 60) if arrival else start + 60
+            key = tuple((s['line'], s['departure'], s['arrival']) for s in journey['sections'])
+            if key in seen:
+                continue
+            seen.add(key)
+            if found and (found[-1][2] == end if not arrival else found[-1][1] == start):
+                # Gleiche Ankunft (bzw. Abfahrt) mit weniger Wartezeit ersetzt die vorige
+                found[-1] = (journey, start, end)
+            else:
+                found.append((journey, start, end))
+            if walk_only:
+                # Zu Fuß ist man früher da als mit jeder Fahrt, weitere Suchen ergäben dasselbe
+                break
+        found.sort(key=lambda e: (e[1], e[2]))
+        return [journey for journey, _, _ in found]
+
+    def trips(self, params):
+        """Beantwortet Trip-Parameter wie aus `vvs_app.build_search_params`."""
+        return self.journeys(str(params['name_origin']), str(params['name_destination']), str(params['itdDate']),
+                             str(params['itdTime']), params['itdTripDateTimeDepArr'],
+                             int(params['calcNumberOfTrips']))
+
+    def stats(self, known_ids=()):
+        """
+        Gibt die Kennzahlen des geladenen Fahrplans zurück.
+
+        Args:
+            known_ids (iterable): IDs aus `haltestellen.csv` für den Anteil abgebildeter Haltestellen.
+
+        Returns:
+            dict: 'stations', 'patterns', 'trips', 'stop_times', 'services', 'bytes',
+                'queries' sowie 'mapped' (abgebildete `known_ids`).
+        """
+        known = set(known_ids)
+        return {
+            "stations": len(self.station_ids),
+            "patterns": len(self.forward.stop_start) - 1,
+            "trips": len(self.forward.trip_service),
+            "stop_times": len(self.forward.dep),
+            "services": len(self.service_ids),
+            "bytes": self.forward.nbytes() + self.backward.nbytes(),
+            "queries": self.queries,
+            "mapped": len(known & self.station_index.keys())
+        }
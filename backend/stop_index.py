@@ -0,0 +1,161 @@
+"""
+Campus VVS Navigator - Haltestellen-Suchindex
+
+Dieses Modul stellt einen In-Memory-Suchindex über die VVS-Haltestellen bereit, damit
+das Frontend nicht mehr die komplette Haltestellenliste (ca. 4.500 Einträge) laden
+und im Browser filtern muss.
+
+Suchlogik:
+    * Normalisierung: Groß-/Kleinschreibung, Umlaute (ä/ae -> a, ...) und ß/ss werden
+      vereinheitlicht, Satzzeichen trennen Wörter.
+    * Präfix-Suche über den vollständigen Namen und über einzelne Wörter (Tokens),
+      inklusive Zusatz/Teilort (z. B. "ortsmitte otl" -> "Ortsmitte (Ötlingen)").
+    * Fuzzy-Suche: Findet ein Wort keinen Präfix-Treffer, werden Wörter mit einem
+      Editierabstand von 1 gesucht (Deletion-Index, ohne lineare Suche).
+
+Ranking (bester zuerst):
+    0. Exakter Treffer auf den Namen
+    1. Name beginnt mit der Anfrage
+    2. Alle Wörter der Anfrage sind Präfixe von Wörtern der Haltestelle
+    3. Mindestens ein Wort nur über die Fuzzy-Suche gefunden
+    Bei Gleichstand gewinnt der kürzere, danach der alphabetisch kleinere Name.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import re
+import heapq
+from bisect import bisect_left
+
+_FOLD = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 's'})
+_DIGRAPHS = re.compile(r'(?<=[aou])e')
+_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    """
+    Normalisiert einen Text für die umlaut- und ß-unabhängige Suche.
+
+    Beispiele:
+        >>> normalize("Rosenberg-/Seidenstraße")
+        'rosenberg seidenstrase'
+        >>> normalize("Muehlhausen") == normalize("Mühlhausen")
+        True
+    """
+    text = _DIGRAPHS.sub('', text.lower()).translate(_FOLD).replace('ss', 's')
+    return _SEPARATORS.sub(' ', text).strip()
+
+
+def _deletions(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+class StopIndex:
+    """
+    Unveränderlicher Suchindex über Haltestellen.
+
+    Args:
+        stops (iterable): Tupel `(display_name, stop_id, teilort)`, optional ergänzt um die
+            bereits normalisierten Formen `(..., normalize(display_name), normalize(teilort))`
+            (z. B. aus dem Haltestellen-Snapshot, spart die Normalisierung beim Aufbau).
+
+    Beispiele:
+        >>> index = StopIndex([("Hauptbahnhof", "de:08111:6118", "Stuttgart"),
+        ...                    ("Ortsmitte (Gerlingen)", "de:08119:1", "Gerlingen")])
+        >>> [s["name"] for s in index.search("hauptbanhof")]
+        ['Hauptbahnhof']
+        >>> [s["name"] for s in index.search("ortsm gerl")]
+        ['Ortsmitte (Gerlingen)']
+    """
+
+    FUZZY_MIN_LENGTH = 4
+
+    def __init__(self, stops):
+        # Einträge nach (Länge, Name) sortieren: kleinere ID = besserer Tie-Break
+        entries = sorted(stops, key=lambda s: (len(s[0]), s[0]))
+        self.names = [s[0] for s in entries]
+        self.ids = [s[1] for s in entries]
+        self._exact = {}
+        self._tokens = {}
+        normalized = []
+        for i, entry in enumerate(entries):
+            if len(entry) > 3:
+                norm, norm_teilort = entry[3], entry[4]
+            else:
+                norm, norm_teilort = normalize(entry[0]), normalize(entry[2] or '')
+            normalized.append((norm, i))
+            self._exact.setdefault(norm, i)
+            for token in set(norm.split()) | set(norm_teilort.split()):
+                self._tokens.setdefault(token, []).append(i)
+        normalized.sort()
+        self._sorted_names = [n for n, _ in normalized]
+        self._sorted_name_ids = [i for _, i in normalized]
+        self._vocabulary = sorted(self._tokens)
+        self._fuzzy = {}
+        for token in self._vocabulary:
+            if len(token) >= self.FUZZY_MIN_LENGTH - 1:
+                for variant in _deletions(token) | {token}:
+                    self._fuzzy.setdefault(variant, []).append(token)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix_range(self, keys, prefix):
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '￿', lo=start)
+        return start, end
+
+    def _token_matches(self, token):
+        start, end = self._prefix_range(self._vocabulary, token)
+        matched = set()
+        for vocab_token in self._vocabulary[start:end]:
+            matched.update(self._tokens[vocab_token])
+        return matched
+
+    def _fuzzy_matches(self, token):
+        if len(token) < self.FUZZY_MIN_LENGTH:
+            return set()
+        matched = set()
+        for variant in _deletions(token) | {token}:
+            for vocab_token in self._fuzzy.get(variant, ()):
+                matched.update(self._tokens[vocab_token])
+        return matched
+
+    def search(self, query, limit=10):
+        """
+        Sucht die besten Haltestellen zu einer Freitext-Anfrage.
+
+        Args:
+            query (str): Suchtext (z. B. "rosenb" oder "strasse stuttg").
+            limit (int): Maximale Anzahl an Ergebnissen.
+
+        Returns:
+            list[dict]: Bis zu `limit` Einträge mit 'name' und 'id', bestes Ergebnis zuerst.
+        """
+        q = normalize(query or '')
+        if not q or limit <= 0:
+            return []
+
+        ranked = {}
+        exact = self._exact.get(q)
+        if exact is not None:
+            ranked[exact] = 0
+        start, end = self._prefix_range(self._sorted_names, q)
+        for i in self._sorted_name_ids[start:end]:
+            ranked.setdefault(i, 1)
+
+        candidates, fuzzy_used = None, False
+        # Bei genügend Namens-Präfixtreffern kann die Wortsuche das Ergebnis nicht verbessern
+        for token in (q.split() if len(ranked) < limit else ()):
+            matched = self._token_matches(token)
+            if not matched:
+                matched, fuzzy_used = self._fuzzy_matches(token), True
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                break
+        for i in candidates or ():
+            ranked.setdefault(i, 3 if fuzzy_used else 2)
+
+        best = heapq.nsmallest(limit, ranked.items(), key=lambda item: (item[1], item[0]))
+        return [{"name": self.names[i], "id": self.ids[i]} for i, _ in best]
@@ -0,0 +1,404 @@
+"""
+Campus VVS Navigator - Vorkompilierte Haltestellentabelle
+
+Dieses Modul ersetzt das Einlesen von `haltestellen.csv` mit `csv.DictReader` bei jedem
+Worker-Start durch einen kompakten Snapshot, der einmal aus der CSV erzeugt und danach
+von den Worker-Prozessen per `mmap` nur gelesen wird. Ein Worker-Start spart damit das
+Parsen der CSV und die Normalisierung der Suchbegriffe.
+
+Speicher: Geteilt wird nur die Snapshot-Datei selbst (Page-Cache). Die daraus abgeleiteten
+Strukturen des `StopCatalog` (dekodierte Strings, Zuordnungen, Suchindex, JSON-Antwort)
+baut jeder Prozess weiterhin für sich auf.
+
+Snapshot-Format (native Bytereihenfolge, Zahlen als uint32):
+    * Header: Magic (inkl. Format-Version und Bytereihenfolge), Anzahl Zeilen, Spalten
+      und Strings sowie der SHA-1 der Quell-CSV.
+    * Spaltennamen als String-Nummern: alle Spalten der CSV (auch 'Teilort') plus die
+      abgeleiteten Spalten `DERIVED_COLUMNS` (Anzeigename und normalisierte Suchformen,
+      damit der Suchindex ohne erneute Normalisierung aufgebaut wird).
+    * String-Offsets und Zellen (Zeile x Spalte -> String-Nummer; uint16, solange es
+      höchstens 65.536 Strings gibt).
+    * String-Pool (UTF-8): jeder Wert genau einmal (z. B. 'Stuttgart' als Teilort von
+      über tausend Haltestellen). Beim Lesen wird jeder String einmal dekodiert und
+      mit `sys.intern` geteilt.
+
+Der Snapshot ist ein Cache: Passt sein SHA-1 nicht zur CSV (oder fehlt er), wird er neu
+erzeugt und atomar (`os.replace`) ersetzt. `StopStore` prüft die CSV zudem im Hintergrund
+und tauscht bei Änderungen den kompletten `StopCatalog` (Zuordnungen, Suchindex,
+`/api/stops`-Antwort) mit einer einzigen Zuweisung aus, ohne Neustart und ohne laufende
+Requests zu blockieren.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import io
+import os
+import sys
+import csv
+import json
+import mmap
+import time
+import struct
+import hashlib
+import threading
+from array import array
+from datetime import datetime
+
+# Lokale Imports
+from stop_index import StopIndex, normalize
+
+MAGIC = b'VVSSTP1' + (b'<' if sys.byteorder == 'little' else b'>')
+_HEADER = struct.Struct('=8sIII20s')
+DERIVED_COLUMNS = ('Anzeigename', 'Suchname', 'Suchteilort')
+
+
+def _cell_type(count):
+    """Typecode der Zellen: uint16 bei bis zu 65.536 Strings, sonst uint32."""
+    return 'H' if count <= 0x10000 else 'I'
+
+
+def display_name(name, zusatz):
+    """
+    Anzeigename einer Haltestelle (Zusatz bei mehrdeutigen Namen in Klammern).
+
+    Beispiele:
+        >>> display_name("Ortsmitte", "Gerlingen")
+        'Ortsmitte (Gerlingen)'
+        >>> display_name("Hauptbahnhof", "")
+        'Hauptbahnhof'
+    """
+    return f"{name} ({zusatz})" if zusatz else name
+
+
+def compile_table(csv_path):
+    """
+    Erzeugt einen Snapshot aus der Haltestellen-CSV.
+
+    Dateiformat der CSV:
+        - Trennzeichen: Semikolon (;)
+        - Kodierung: UTF-8 mit BOM (utf-8-sig)
+        - Erwartete Header: 'Name', 'Globale ID', optional 'Teilort' und 'Zusatz'
+          (weitere Spalten werden unverändert übernommen)
+
+    Returns:
+        bytes: Der Snapshot (siehe Modul-Docstring).
+
+    Raises:
+        FileNotFoundError: Wenn die CSV nicht existiert.
+        KeyError: Wenn die Spalten 'Name' oder 'Globale ID' fehlen.
+    """
+    with open(csv_path, 'rb') as f:
+        raw = f.read()
+    reader = csv.reader(io.StringIO(raw.decode('utf-8-sig')), delimiter=';')
+    header = [h.strip() for h in next(reader, [])]
+    for required in ('Name', 'Globale ID'):
+        if required not in header:
+            raise KeyError(required)
+    name_col, zusatz_col = header.index('Name'), header.index('Zusatz') if 'Zusatz' in header else None
+    teilort_col = header.index('Teilort') if 'Teilort' in header else None
+
+    pool, strings = {}, []
+
+    def intern(value):
+        number = pool.get(value)
+        if number is None:
+            number = pool[value] = len(strings)
+            strings.append(value)
+        return number
+
+    columns = [intern(c) for c in header + list(DERIVED_COLUMNS)]
+    cells, rows, width = [], 0, len(header)
+    for row in reader:
+        if not any(v.strip() for v in row):
+            continue
+        values = [v.strip() for v in row[:width]] + [''] * (width - len(row))
+        display = display_name(values[name_col], values[zusatz_col] if zusatz_col is not None else '')
+        teilort = values[teilort_col] if teilort_col is not None else ''
+        cells.extend(intern(v) for v in values + [display, normalize(display), normalize(teilort)])
+        rows += 1
+
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets, position = array('I', [0]), 0
+    for data in encoded:
+        position += len(data)
+        offsets.append(position)
+    header_bytes = _HEADER.pack(MAGIC, rows, len(columns), len(strings), hashlib.sha1(raw).digest())
+    return b''.join([header_bytes, array('I', columns).tobytes(), offsets.tobytes(),
+                     array(_cell_type(len(strings)), cells).tobytes()] + encoded)
+
+
+def source_digest(csv_path):
+    """SHA-1 der CSV, wie er im Snapshot vermerkt wird."""
+    with open(csv_path, 'rb') as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+class StopTable:
+    """
+    Lesezugriff auf einen Snapshot (per `mmap` oder aus `bytes`).
+
+    Args:
+        buffer: Der Snapshot (`mmap.mmap` oder bytes).
+
+    Raises:
+        ValueError: Wenn der Puffer kein gültiger Snapshot dieser Version ist.
+
+    Beispiele:
+        >>> import tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'h.csv')
+        >>> _ = open(path, 'w', encoding='utf-8-sig').write(
+        ...     "Name;Globale ID;Teilort;Zusatz\\nOrtsmitte;de:1;Gerlingen;Gerlingen\\n")
+        >>> table = StopTable(compile_table(path))
+        >>> table.row(0)['Anzeigename'], table.row(0)['Teilort']
+        ('Ortsmitte (Gerlingen)', 'Gerlingen')
+        >>> table.value(0, 'Teilort') is table.value(0, 'Zusatz')
+        True
+    """
+
+    def __init__(self, buffer):
+        if len(buffer) < _HEADER.size:
+            raise ValueError("Snapshot zu kurz")
+        magic, rows, width, count, self.source = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Unbekanntes Snapshot-Format")
+        view = memoryview(buffer)
+        position = _HEADER.size
+        parts = []
+        for typecode, length in (('I', width), ('I', count + 1), (_cell_type(count), rows * width)):
+            size = length * array(typecode).itemsize
+            parts.append(view[position:position + size].cast(typecode))
+            position += size
+        column_ids, self._offsets, self._cells = parts
+        if len(self._cells) != rows * width or len(view) - position < self._offsets[-1]:
+            raise ValueError("Snapshot unvollständig")
+        self._pool = view[position:]
+        self._buffer = buffer
+        self._strings = [None] * count
+        self._rows, self._width = rows, width
+        self.columns = tuple(self.string(i) for i in column_ids)
+        self._column_index = {c: i for i, c in enumerate(self.columns)}
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def nbytes(self):
+        """Größe des Snapshots in Bytes."""
+        return len(self._buffer)
+
+    @property
+    def strings(self):
+        """Anzahl der unterschiedlichen Strings im Pool."""
+        return len(self._strings)
+
+    @property
+    def mapped(self):
+        """Ob der Snapshot per `mmap` eingeblendet ist (statt als Kopie im Prozess)."""
+        return isinstance(self._buffer, mmap.mmap)
+
+    def string(self, number):
+        """Der String mit der Nummer `number` (einmal dekodiert und interniert)."""
+        value = self._strings[number]
+        if value is None:
+            value = sys.intern(str(self._pool[self._offsets[number]:self._offsets[number + 1]], 'utf-8'))
+            self._strings[number] = value
+        return value
+
+    def value(self, row, column):
+        """Wert einer Zelle ('' für Spalten, die es in der CSV nicht gibt)."""
+        index = self._column_index.get(column)
+        return '' if index is None else self.string(self._cells[row * self._width + index])
+
+    def column(self, column):
+        """Alle Werte einer Spalte in CSV-Reihenfolge."""
+        index = self._column_index.get(column)
+        if index is None:
+            return [''] * self._rows
+        return [self.string(n) for n in self._cells[index::self._width]]
+
+    def row(self, row):
+        """Eine Zeile als Dictionary über alle Spalten."""
+        start = row * self._width
+        return {c: self.string(self._cells[start + i]) for i, c in enumerate(self.columns)}
+
+
+def map_table(snapshot_path):
+    """Blendet einen Snapshot per `mmap` ein; None, wenn er fehlt oder ungültig ist."""
+    try:
+        with open(snapshot_path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        return StopTable(buffer)
+    except (ValueError, TypeError, struct.error):
+        return None
+
+
+def open_table(csv_path, snapshot_path):
+    """
+    Liefert die Tabelle zur aktuellen CSV, bei Bedarf über einen neu erzeugten Snapshot.
+
+    Ein vorhandener Snapshot mit passendem SHA-1 wird nur eingeblendet. Sonst wird er
+    erzeugt und über eine temporäre Datei atomar ersetzt (mehrere Worker dürfen das
+    gleichzeitig tun). Ist das Verzeichnis nicht beschreibbar, wird der Snapshot nur im
+    Prozess gehalten.
+
+    Raises:
+        FileNotFoundError, KeyError: Siehe `compile_table`.
+    """
+    table = map_table(snapshot_path)
+    if table is not None and table.source == source_digest(csv_path):
+        return table
+    data = compile_table(csv_path)
+    temp_path = f"{snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, snapshot_path)
+    except OSError as e:
+        print(f"Fehler Haltestellen-Snapshot: {e}")
+        return StopTable(data)
+    return map_table(snapshot_path) or StopTable(data)
+
+
+class StopCatalog:
+    """
+    Unveränderlicher Stand aller aus der Tabelle abgeleiteten Strukturen.
+
+    Attributes:
+        table (StopTable | None): Die zugrunde liegende Tabelle.
+        mapping (dict): Anzeigename -> globale ID (bei doppelten Namen gewinnt die letzte Zeile).
+        names (dict): Globale ID -> Anzeigename (erster Eintrag je ID, für die Abfahrtstafeln).
+        index (StopIndex): Suchindex inkl. Teilort.
+        json (bytes): Vorserialisierte Antwort von `/api/stops`.
+        etag (str): ETag zu `json`.
+    """
+
+    def __init__(self, table=None):
+        self.table = table
+        self.mapping, self.names, searchable = {}, {}, {}
+        if table is not None:
+            for name, stop_id, teilort, norm, norm_teilort in zip(
+                    table.column('Anzeigename'), table.column('Globale ID'), table.column('Teilort'),
+                    table.column('Suchname'), table.column('Suchteilort')):
+                self.mapping[name] = stop_id
+                self.names.setdefault(stop_id, name)
+                searchable[name] = (name, stop_id, teilort, norm, norm_teilort)
+        self.index = StopIndex(searchable.values())
+        self.json = json.dumps([{"id": i, "name": n} for n, i in self.mapping.items()],
+                               ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.json).hexdigest()
+
+
+class StopStore:
+    """
+    Hält den aktuellen `StopCatalog` und lädt ihn neu, sobald sich die CSV ändert.
+
+    Requests lesen `store.catalog` einmal und arbeiten mit diesem Stand weiter; ein
+    Neuladen baut den neuen Katalog vollständig im Hintergrund-Thread auf und ersetzt
+    die Referenz erst danach. Neue CSV-Stände am besten per `os.replace` einspielen,
+    damit nie eine halb geschriebene Datei gelesen wird.
+
+    Args:
+        csv_path (str): Pfad zu `haltestellen.csv`.
+        snapshot_path (str): Pfad des Snapshots (wird bei Bedarf erzeugt).
+        interval (float): Sekunden zwischen zwei Prüfungen der CSV (0 = kein Neuladen).
+    """
+
+    def __init__(self, csv_path, snapshot_path, interval=30):
+        self.csv_path = csv_path
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self.catalog = StopCatalog()
+        self._stat = None
+        self._lock = threading.Lock()
+        self._thread = None
+        # Kennzahlen
+        self.loads = 0
+        self.errors = 0
+        self.loaded_at = None
+        self.load_duration = None
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.csv_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def load(self):
+        """
+        Lädt die Tabelle (Snapshot, ggf. neu erzeugt) und tauscht den Katalog aus.
+
+        Returns:
+            StopCatalog: Der neue Katalog.
+
+        Raises:
+            Exception: Fehler beim Lesen der CSV; der bisherige Katalog bleibt aktiv.
+        """
+        with self._lock:
+            stat = self._file_stat()
+            start = time.perf_counter()
+            try:
+                catalog = StopCatalog(open_table(self.csv_path, self.snapshot_path))
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                # Eine fehlerhafte Datei erst nach der nächsten Änderung erneut versuchen
+                self._stat = stat
+            self.catalog = catalog
+            self.loads += 1
+            self.loaded_at = datetime.now().isoformat(timespec='seconds')
+            self.load_duration = round(time.perf_counter() - start, 4)
+            return catalog
+
+    def check(self):
+        """Lädt neu, wenn sich die CSV seit dem letzten Laden geändert hat."""
+        if self._file_stat() == self._stat:
+            return False
+        self.load()
+        return True
+
+    def start(self):
+        """Startet den Hintergrund-Thread, der die CSV überwacht (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='stops', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self.check():
+                    print(f"Haltestellen neu geladen: {len(self.catalog.mapping)} Einträge")
+            except Exception as e:
+                print(f"Fehler Haltestellen neu laden: {e}")
+
+    def stats(self):
+        """
+        Gibt die Kennzahlen zurück.
+
+        Returns:
+            dict: 'stops' (Anzeigenamen), 'rows', 'columns', 'strings' (im Pool),
+                'bytes' (Snapshot), 'mmap' (per mmap eingeblendet), 'source' (SHA-1
+                der CSV), 'loads', 'errors', 'loaded_at', 'load_duration' und 'interval'.
+        """
+        catalog = self.catalog
+        table = catalog.table
+        return {
+            "stops": len(catalog.mapping),
+            "rows": len(table) if table is not None else 0,
+            "columns": list(table.columns) if table is not None else [],
+            "strings": table.strings if table is not None else 0,
+            "bytes": table.nbytes if table is not None else 0,
+            "mmap": table.mapped if table is not None else False,
+            "source": table.source.hex() if table is not None else None,
+            "loads": self.loads,
+            "errors": self.errors,
+            "loaded_at": self.loaded_at,
+            "load_duration": self.load_duration,
+            "interval": self.interval
+        }
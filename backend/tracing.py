@@ -0,0 +1,314 @@
+"""
+Campus VVS Navigator - Request-Tracing und Profiling
+
+Dieses Modul misst, wohin die Zeit eines einzelnen Requests geht. Ein `Trace` sammelt
+die Abschnitte (Spans) eines Requests, z. B.:
+    * params: Aufbau der Suchparameter (`build_search_params`)
+    * trip: eine Trip-Anfrage je Campus-Haltestelle (inkl. Cache und Zeitfenster)
+    * vvs, dhbw: einzelne Upstream-Aufrufe (auch Hedge-Versuche)
+    * decode, parse: JSON-Dekodierung und Parsen der EFA-Antwort
+    * rank: Ranking und Abschneiden auf die besten Verbindungen
+    * db: SQL-Statements der Profil- und Favoriten-Routen
+
+Spans werden über `contextvars` dem laufenden Request zugeordnet. Sie funktionieren
+daher in Threads (sofern der Aufruf mit `bind` übergeben wird) und in asyncio-Tasks.
+Außerhalb eines Requests (Hintergrund-Jobs, Benchmarks) sind `span` und `record`
+wirkungslos.
+
+Ausgabe:
+    * `Server-Timing`-Header: Summe je Span-Name, bei mehreren Spans mit Anzahl und
+      Maximum (`trip;dur=812.4;desc="4x, max 240.1"`), dazu `total`.
+    * Slow-Request-Log: Requests über der Schwelle werden mit allen Spans (Startzeit
+      relativ zum Request, Dauer, Detail) als JSON-Zeile protokolliert.
+
+Profiling:
+    `Profiler` zeichnet einzelne Requests mit `cProfile` auf, wenn der Header
+    `X-Profile-Token` das konfigurierte Token enthält. Die Profile werden als
+    `.prof`-Dateien (pstats) für die Offline-Analyse abgelegt
+    (`python -m pstats datei.prof` oder snakeviz). Es läuft höchstens ein Profil
+    gleichzeitig; erfasst wird nur der Thread des Requests (bzw. im ASGI-Modus der
+    Event-Loop mit allen in dieser Zeit laufenden Coroutinen).
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import os
+import hmac
+import json
+import time
+import uuid
+import cProfile
+import threading
+import contextvars
+import functools
+from datetime import datetime
+
+_current = contextvars.ContextVar('trace', default=None)
+
+
+class Trace:
+    """
+    Die Spans eines Requests.
+
+    Beispiele:
+        >>> trace = Trace()
+        >>> trace.add('trip', 0.25, 'a>b')
+        >>> trace.add('trip', 0.5, 'c>b')
+        >>> trace.header(total=False)
+        'trip;dur=750.0;desc="2x, max 500.0"'
+    """
+
+    MAX_SPANS = 256
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+        self.done = False
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add(self, name, seconds, detail=None, started=None):
+        """Erfasst einen abgeschlossenen Span (`started` = perf_counter beim Beginn)."""
+        if self.done:
+            return
+        if started is None:
+            started = time.perf_counter() - seconds
+        with self._lock:
+            total = self._totals.setdefault(name, [0.0, 0, 0.0])
+            total[0] += seconds
+            total[1] += 1
+            total[2] = max(total[2], seconds)
+            if len(self.spans) < self.MAX_SPANS:
+                self.spans.append((name, started - self.start, seconds, detail))
+            else:
+                self.dropped += 1
+
+    def duration(self):
+        """Bisherige Dauer des Requests in Sekunden."""
+        return time.perf_counter() - self.start
+
+    def header(self, total=True):
+        """Wert des `Server-Timing`-Headers (Millisekunden, Summe je Span-Name)."""
+        with self._lock:
+            totals = list(self._totals.items())
+        parts = []
+        for name, (seconds, count, longest) in totals:
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                part += f';desc="{count}x, max {longest * 1000:.1f}"'
+            parts.append(part)
+        if total:
+            parts.append(f"total;dur={self.duration() * 1000:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self):
+        """Alle Spans für das Slow-Request-Log."""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "ms": round(self.duration() * 1000, 1),
+            "spans": [{"name": name, "detail": detail, "start_ms": round(offset * 1000, 1),
+                       "ms": round(seconds * 1000, 1)} for name, offset, seconds, detail in spans],
+            "dropped": self.dropped
+        }
+
+
+def current():
+    """Der Trace des laufenden Requests oder None."""
+    return _current.get()
+
+
+def record(name, seconds, detail=None):
+    """Erfasst einen bereits gemessenen Span im laufenden Request (ohne Request wirkungslos)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds, detail)
+
+
+class span:
+    """
+    Context-Manager, der einen Abschnitt im laufenden Request misst.
+
+    Beispiele:
+        >>> with span('parse', 'json'):
+        ...     pass
+    """
+
+    __slots__ = ('name', 'detail', 'trace', 'started')
+
+    def __init__(self, name, detail=None):
+        self.name, self.detail = name, detail
+
+    def __enter__(self):
+        self.trace = _current.get()
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter() - self.started, self.detail, self.started)
+        return False
+
+
+def bind(fn):
+    """
+    Bindet `fn` an den aktuellen Kontext, damit Spans aus einem Thread-Pool dem Request
+    zugeordnet werden (`executor.submit(bind(fn), ...)`; je Aufruf neu binden).
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+class Tracer:
+    """
+    Startet und beendet Traces und schreibt das Slow-Request-Log.
+
+    Args:
+        header (bool): Ob `finish` den `Server-Timing`-Header liefert.
+        slow_ms (float): Schwelle für das Slow-Request-Log in Millisekunden (0 = aus).
+        log_path (str, optional): Datei für das Slow-Request-Log (JSON-Zeilen),
+            ohne Pfad auf der Konsole.
+    """
+
+    def __init__(self, header=True, slow_ms=2000, log_path=None):
+        self.header = header
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.slow = 0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        """Legt den Trace des aktuellen Requests an."""
+        trace = Trace()
+        trace._token = _current.set(trace)
+        return trace
+
+    def finish(self, trace, route, method, status, path=None):
+        """
+        Schließt den Trace ab (mehrfacher Aufruf ist wirkungslos).
+
+        Args:
+            trace (Trace): Der Trace aus `begin`.
+            route (str): Route-Template (wie bei den Metriken).
+            method (str): HTTP-Methode.
+            status (int): HTTP-Status der Antwort.
+            path (str, optional): Konkreter Pfad für das Log (ohne Query-String).
+
+        Returns:
+            str | None: Wert des `Server-Timing`-Headers, None wenn deaktiviert oder
+                bereits abgeschlossen.
+        """
+        if trace is None or trace.done:
+            return None
+        value = trace.header() if self.header else None
+        trace.done = True
+        if trace._token is not None:
+            try:
+                _current.reset(trace._token)
+            except ValueError:
+                # Anderer Kontext (z. B. Abschluss im Teardown eines anderen Threads)
+                _current.set(None)
+        if self.slow_ms and trace.duration() * 1000 >= self.slow_ms:
+            self._log({"time": datetime.now().isoformat(timespec='seconds'), "route": route,
+                       "method": method, "path": path, "status": status, **trace.to_dict()})
+        return value
+
+    def _log(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self.slow += 1
+            if not self.log_path:
+                print(f"Langsamer Request: {line}")
+                return
+            try:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Fehler Slow-Log: {e}")
+
+
+class Profiler:
+    """
+    Zeichnet einzelne Requests mit `cProfile` auf (siehe Modul-Docstring).
+
+    Args:
+        token (str): Geheimes Token für `X-Profile-Token`; leer = Profiling deaktiviert.
+        directory (str): Ablageort der `.prof`-Dateien (wird bei Bedarf angelegt).
+        keep (int): Maximale Anzahl aufbewahrter Profile (älteste werden gelöscht).
+    """
+
+    SUFFIX = '.prof'
+
+    def __init__(self, token, directory, keep=50):
+        self.token = token or ''
+        self.directory = directory
+        self.keep = keep
+        self._busy = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def authorized(self, token):
+        """Prüft das übergebene Token in konstanter Zeit."""
+        return self.enabled and bool(token) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def start(self):
+        """
+        Startet eine Aufzeichnung.
+
+        Returns:
+            cProfile.Profile | None: Das laufende Profil, None wenn bereits ein anderes läuft.
+        """
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Ein anderes Profiling-Werkzeug ist aktiv
+            self._busy.release()
+            return None
+        return profile
+
+    def stop(self, profile, route):
+        """
+        Beendet die Aufzeichnung und speichert sie.
+
+        Returns:
+            str | None: Dateiname des Profils (None bei Schreibfehlern).
+        """
+        try:
+            profile.disable()
+        finally:
+            self._busy.release()
+        slug = ''.join(c if c.isalnum() else '-' for c in route).strip('-') or 'root'
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:6]}{self.SUFFIX}"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(os.path.join(self.directory, name))
+            self._prune()
+        except OSError as e:
+            print(f"Fehler Profil: {e}")
+            return None
+        return name
+
+    def _prune(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(self.SUFFIX))
+        for name in names[:max(0, len(names) - self.keep)]:
+            os.remove(os.path.join(self.directory, name))
+
+    def list(self):
+        """Die gespeicherten Profile (neueste zuerst) mit 'name', 'bytes' und 'created'."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(self.SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append({"name": name, "bytes": stat.st_size,
+                                "created": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds')})
+        return entries
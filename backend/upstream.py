@@ -0,0 +1,450 @@
+"""
+Campus VVS Navigator - Upstream HTTP-Clients
+
+Dieses Modul kapselt die HTTP-Kommunikation mit den externen Schnittstellen
+(VVS EFA und dhbw.app). Jeder Upstream bekommt eine eigene, langlebige
+`requests.Session` mit Keep-Alive-Connection-Pool, sodass TCP- und TLS-Handshake
+nicht bei jedem Aufruf erneut anfallen.
+
+Eigenschaften:
+    * Eigener Connection-Pool pro Host (konfigurierbare Größe).
+    * Getrennte Connect- und Read-Timeouts.
+    * Transparente gzip/deflate-Dekomprimierung (über urllib3).
+    * Circuit-Breaker pro Upstream: Nach wiederholten Fehlern wird sofort mit
+      `CircuitOpenError` abgebrochen, statt jeden Request in den Timeout laufen zu lassen.
+      Nach `reset_timeout` Sekunden lässt der Breaker einzelne Probe-Requests durch
+      (half-open) und schließt sich bei Erfolg wieder.
+    * Hedged Requests (optional): Antwortet der Upstream nicht innerhalb seiner
+      gemessenen p95-Latenz, wird ein zweiter Versuch gestartet und die schnellere
+      Antwort verwendet. Ein Budget begrenzt den Anteil zusätzlicher Requests.
+
+Für den ASGI-Modus stellt `AsyncUpstreamClient` dieselbe Schnittstelle als Coroutinen
+auf Basis von `httpx.AsyncClient` bereit. Er teilt sich Circuit-Breaker, Latenzmessung
+und Zähler mit dem zugehörigen `UpstreamClient`.
+
+Datum: Dezember 2025
+"""
+
+# Standard-Library Imports
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Third-Party Imports
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # nur für den ASGI-Modus benötigt
+    httpx = None
+
+
+class CircuitOpenError(Exception):
+    """Wird ausgelöst, wenn der Circuit-Breaker eines Upstreams geöffnet ist."""
+
+
+class CircuitBreaker:
+    """
+    Einfacher Circuit-Breaker mit den Zuständen 'closed', 'open' und 'half_open'.
+
+    Args:
+        failure_threshold (int): Anzahl aufeinanderfolgender Fehler bis zum Öffnen.
+        reset_timeout (float): Sekunden, nach denen ein geöffneter Breaker Probe-Requests zulässt.
+
+    Beispiele:
+        >>> breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        >>> breaker.record_failure(); breaker.record_failure()
+        >>> breaker.state, breaker.allow()
+        ('open', False)
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Prüft, ob ein Request durchgelassen wird (im Zustand half-open nur ein Probe-Request)."""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        """Meldet einen erfolgreichen Request; schließt den Breaker."""
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """Meldet einen fehlgeschlagenen Request; öffnet den Breaker ggf. (erneut)."""
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.trips += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """
+        Gibt eine laufende Probe frei, ohne Erfolg oder Fehler zu melden (z. B. nach einem Abbruch).
+
+        Beispiele:
+            >>> breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+            >>> breaker.record_failure()
+            >>> breaker.allow(), breaker.allow()
+            (True, False)
+            >>> breaker.release_probe()
+            >>> breaker.state, breaker.allow()
+            ('half_open', True)
+        """
+        with self._lock:
+            self._probing = False
+
+    def is_open(self):
+        """True, solange der Breaker Requests abweist."""
+        with self._lock:
+            return self.state == 'open' and time.monotonic() - self.opened_at < self.reset_timeout
+
+
+class LatencyTracker:
+    """
+    Gleitendes Fenster der letzten Antwortzeiten eines Upstreams.
+
+    Beispiele:
+        >>> tracker = LatencyTracker(window=100)
+        >>> for ms in range(1, 101): tracker.add(ms / 1000)
+        >>> tracker.percentile(95)
+        0.095
+    """
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, p):
+        """Liefert das p-Perzentil (Nearest-Rank) in Sekunden oder None ohne Messwerte."""
+        with self._lock:
+            values = sorted(self._samples)
+        if not values:
+            return None
+        rank = max(1, -(-len(values) * p // 100))
+        return values[int(rank) - 1]
+
+
+class UpstreamClient:
+    """
+    Wiederverwendbarer HTTP-Client für einen einzelnen Upstream-Host.
+
+    Args:
+        base_url (str): Basis-URL des Upstreams (ohne abschließenden Slash).
+        pool_size (int): Maximale Anzahl gleichzeitig offener Keep-Alive-Verbindungen.
+        connect_timeout (float): Timeout für den Verbindungsaufbau in Sekunden.
+        read_timeout (float): Timeout für das Lesen der Antwort in Sekunden.
+        breaker (CircuitBreaker, optional): Circuit-Breaker dieses Upstreams.
+        hedge (bool): Hedged Requests für `get(..., hedge=True)` aktivieren.
+        hedge_max_ratio (float): Maximaler Anteil an Requests, die einen zweiten Versuch auslösen.
+        hedge_min_samples (int): Mindestanzahl an Messwerten, bevor gehedged wird.
+        observe (callable, optional): `observe(seconds, status)` wird nach jedem einzelnen
+            Versuch aufgerufen (status = HTTP-Statuscode, 'error', 'cancelled' bei im
+            ASGI-Modus abgebrochenen Versuchen oder 'rejected' ohne Dauer).
+
+    Beispiele:
+        >>> client = UpstreamClient("https://api.dhbw.app", pool_size=4)
+        >>> client.url("/rapla/lectures/STG-TINF23C/events")
+        'https://api.dhbw.app/rapla/lectures/STG-TINF23C/events'
+    """
+
+    def __init__(self, base_url, pool_size=10, connect_timeout=3, read_timeout=10, breaker=None,
+                 hedge=False, hedge_max_ratio=0.1, hedge_min_samples=20, observe=None):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.hedge = hedge
+        self.hedge_max_ratio = hedge_max_ratio
+        self.hedge_min_samples = hedge_min_samples
+        self.observe = observe or _ignore
+        self.requests = 0
+        self.hedged = 0
+        self.rejected = 0
+        self._stats_lock = threading.Lock()
+        self._hedge_executor = (ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='hedge')
+                                if hedge else None)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+
+    def url(self, path=''):
+        """Setzt die vollständige URL aus Basis-URL und Pfad zusammen."""
+        return f"{self.base_url}{path}"
+
+    def get(self, path='', params=None, headers=None, read_timeout=None, stream=False, hedge=False):
+        """
+        Führt einen GET-Request über die gemeinsame Session aus.
+
+        Args:
+            path (str): Pfad relativ zur Basis-URL (z. B. '/XML_TRIP_REQUEST2').
+            params (dict, optional): Query-Parameter.
+            headers (dict, optional): Zusätzliche Header für diesen Request.
+            read_timeout (float, optional): Überschreibt den Standard-Read-Timeout.
+            stream (bool): Body nicht vorab laden, sondern über `response.raw` streamen.
+            hedge (bool): Zweiten Versuch starten, wenn die Antwort länger als die p95-Latenz
+                dauert (nur wirksam, wenn der Client mit `hedge=True` erzeugt wurde).
+
+        Returns:
+            requests.Response: Die (bereits dekomprimierte) Antwort.
+
+        Raises:
+            CircuitOpenError: Wenn der Circuit-Breaker des Upstreams geöffnet ist.
+            requests.RequestException: Bei Verbindungs- oder Timeout-Fehlern.
+        """
+        self._admit()
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+        kwargs = dict(params=params, headers=headers, timeout=timeout, stream=stream)
+        threshold = self._hedge_threshold() if hedge else None
+        start = time.monotonic()
+        if threshold is None:
+            res = self._request(path, kwargs)
+        else:
+            res = self._hedged_request(path, kwargs, threshold)
+        # Effektive Latenz aus Sicht des Aufrufers (bei Hedging die der schnelleren Antwort)
+        if res.status_code < 500:
+            self.latency.add(time.monotonic() - start)
+        return res
+
+    def _admit(self):
+        # Breaker prüfen und Request zählen (gemeinsam mit AsyncUpstreamClient)
+        if not self.breaker.allow():
+            with self._stats_lock:
+                self.rejected += 1
+            self.observe(None, 'rejected')
+            raise CircuitOpenError(f"Upstream {self.base_url} vorübergehend nicht erreichbar")
+        with self._stats_lock:
+            self.requests += 1
+
+    def _request(self, path, kwargs):
+        start = time.monotonic()
+        try:
+            res = self.session.get(self.url(path), **kwargs)
+        except BaseException:
+            # Jeder Fehler gibt eine laufende Probe (half-open) wieder frei
+            self.breaker.record_failure()
+            self.observe(time.monotonic() - start, 'error')
+            raise
+        self.observe(time.monotonic() - start, res.status_code)
+        if res.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return res
+
+    def _hedge_threshold(self):
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        with self._stats_lock:
+            if self.hedged >= self.requests * self.hedge_max_ratio:
+                return None
+        return self.latency.percentile(95)
+
+    def _hedged_request(self, path, kwargs, threshold):
+        # Kontext mitgeben, damit die Versuche dem aufrufenden Request zugeordnet bleiben
+        primary = self._hedge_executor.submit(contextvars.copy_context().run, self._request, path, kwargs)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+        if not self.breaker.allow():
+            # Auch der zweite Versuch braucht die Freigabe des Breakers (half-open: nur die Probe)
+            return primary.result()
+
+        with self._stats_lock:
+            self.hedged += 1
+            self.requests += 1
+        secondary = self._hedge_executor.submit(contextvars.copy_context().run, self._request, path, kwargs)
+        pending = {primary, secondary}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result().status_code < 500:
+                    # Verlierer-Antwort schließen, damit die Verbindung in den Pool zurückgeht
+                    for loser in pending:
+                        loser.add_done_callback(_close_response)
+                    return future.result()
+                error = future
+        return error.result()
+
+    def stats(self):
+        """
+        Gibt Kennzahlen des Upstreams zurück (Breaker-Zustand, Latenzen, Hedging).
+
+        Returns:
+            dict: 'breaker', 'failures', 'trips', 'requests', 'rejected', 'hedged',
+                'p50_ms' und 'p95_ms'.
+        """
+        p50, p95 = self.latency.percentile(50), self.latency.percentile(95)
+        with self._stats_lock:
+            return {
+                "breaker": self.breaker.state,
+                "failures": self.breaker.failures,
+                "trips": self.breaker.trips,
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "hedged": self.hedged,
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+            }
+
+    def close(self):
+        """Schließt alle offenen Verbindungen der Session."""
+        self.session.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+
+
+class AsyncUpstreamClient:
+    """
+    Asynchrones Gegenstück zu `UpstreamClient` für den ASGI-Modus (httpx.AsyncClient).
+
+    Basis-URL, Timeouts, Circuit-Breaker, Latenzmessung, Hedging-Budget und Zähler
+    werden vom übergebenen synchronen Client übernommen bzw. mit ihm geteilt, sodass
+    `/api/upstreams` beide Modi gemeinsam ausweist.
+
+    Args:
+        client (UpstreamClient): Der synchrone Client desselben Upstreams.
+        pool_size (int): Maximale Anzahl gleichzeitig offener Verbindungen.
+
+    Raises:
+        RuntimeError: Wenn `httpx` nicht installiert ist.
+    """
+
+    def __init__(self, client, pool_size=100):
+        if httpx is None:
+            raise RuntimeError("Für den ASGI-Modus wird das Paket 'httpx' benötigt")
+        self.client = client
+        self.session = httpx.AsyncClient(
+            base_url=client.base_url,
+            headers={'Accept': 'application/json'},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def get(self, path='', params=None, headers=None, read_timeout=None, hedge=False):
+        """
+        Führt einen GET-Request aus, ohne den Event-Loop zu blockieren.
+
+        Args und Verhalten wie bei `UpstreamClient.get` (ohne `stream`).
+
+        Returns:
+            httpx.Response: Die (bereits dekomprimierte) Antwort.
+
+        Raises:
+            CircuitOpenError: Wenn der Circuit-Breaker des Upstreams geöffnet ist.
+            httpx.HTTPError: Bei Verbindungs- oder Timeout-Fehlern.
+        """
+        client = self.client
+        client._admit()
+        timeout = httpx.Timeout(read_timeout or client.read_timeout, connect=client.connect_timeout)
+        kwargs = dict(params=params, headers=headers, timeout=timeout)
+        threshold = client._hedge_threshold() if hedge else None
+        start = time.monotonic()
+        if threshold is None:
+            res = await self._request(path, kwargs)
+        else:
+            res = await self._hedged_request(path, kwargs, threshold)
+        if res.status_code < 500:
+            client.latency.add(time.monotonic() - start)
+        return res
+
+    async def _request(self, path, kwargs):
+        breaker, observe = self.client.breaker, self.client.observe
+        start = time.monotonic()
+        try:
+            res = await self.session.get(path, **kwargs)
+        except asyncio.CancelledError:
+            # Abbruch (Deadline, Client getrennt, Hedge-Verlierer) sagt nichts über den Upstream:
+            # nur eine ggf. laufende Probe freigeben, damit sie nicht für immer reserviert bleibt
+            breaker.release_probe()
+            observe(time.monotonic() - start, 'cancelled')
+            raise
+        except Exception:
+            breaker.record_failure()
+            observe(time.monotonic() - start, 'error')
+            raise
+        observe(time.monotonic() - start, res.status_code)
+        if res.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return res
+
+    async def _hedged_request(self, path, kwargs, threshold):
+        client = self.client
+        primary = asyncio.ensure_future(self._request(path, kwargs))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=threshold)
+            if done:
+                return primary.result()
+            if client.breaker.allow():
+                # Zweiter Versuch nur mit Freigabe des Breakers (half-open: nur die Probe)
+                with client._stats_lock:
+                    client.hedged += 1
+                    client.requests += 1
+                pending.add(asyncio.ensure_future(self._request(path, kwargs)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        return task.result()
+                    error = task
+            return error.result()
+        finally:
+            # Verlierer (bzw. bei Abbruch des Aufrufers alle Versuche) abbrechen; httpx gibt
+            # die Verbindung dabei an den Pool zurück
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        """Schließt alle offenen Verbindungen des Clients."""
+        await self.session.aclose()
+
+
+def _ignore(seconds, status):
+    pass
+
+
+def _close_response(future):
+    if future.exception() is None:
+        future.result().close()
@@ -8,7 +8,8 @@ externen Mobilitäts- sowie Stundenplan-Schnittstellen (VVS EFA & DHBW RAPLA).
 Hauptfunktionen:
     * Verbindungssuche: Intelligente Routenplanung zwischen Campus und Wohnort 
       unter Berücksichtigung von individuellen Pufferzeiten.
-    * Stundenplan-Proxy: Abfrage von Vorlesungsterminen über die dhbw.app-Seite.
+    * Stundenplan: Vorlesungstermine der dhbw.app, abgeglichen in die Tabelle `lectures`
+      und nach Zeitraum abfragbar.
     * Profilverwaltung: Persistierung von Benutzereinstellungen und Favoriten 
       in einer PostgreSQL-Datenbank.
     * Echtzeit-Parsing: Verarbeitung von VVS-EFA-Daten (RapidJSON) mit 
@@ -22,6 +23,95 @@ Architektur:
 Konfiguration:
     Die Konfiguration erfolgt über Umgebungsvariablen in einer .env-Datei:
     - DB_HOST, DB_NAME, DB_USER, DB_PASS, DB_PORT: Datenbank-Zugangsdaten.
+    - DB_POOL_MIN, DB_POOL_MAX: Mindest-/Maximalgröße des Connection-Pools (Standard: 1/10).
+    - DB_POOL_TIMEOUT: Maximale Wartezeit auf eine freie Verbindung in Sekunden (Standard: 5).
+    - DB_CONNECT_TIMEOUT: Maximale Dauer eines Verbindungsaufbaus in Sekunden (Standard:
+      DB_POOL_TIMEOUT); eine nicht erreichbare Datenbank wird danach als 503 gemeldet.
+    - VVS_BASE_URL, DHBW_BASE_URL: Basis-URLs der Upstreams (VVS EFA, dhbw.app).
+    - UPSTREAM_POOL_SIZE: Keep-Alive-Verbindungen pro Upstream-Host (Standard: 10).
+    - UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT: Connect-/Read-Timeout der
+      Upstream-Aufrufe in Sekunden (Standard: 3/10).
+    - UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_RESET: Fehler in Folge bis zum Öffnen
+      des Circuit-Breakers (Standard: 5) und Sekunden bis zum Probe-Request (Standard: 30).
+    - EFA_HEDGE: '1' aktiviert Hedged Requests gegen die EFA (Standard: '0').
+    - EFA_HEDGE_MAX_RATIO: Maximaler Anteil zusätzlicher Hedge-Requests (Standard: 0.1).
+    - EFA_MAX_WORKERS: Maximale Anzahl paralleler EFA-Anfragen (Standard: 8).
+    - EFA_DEADLINE: Gesamt-Deadline einer Verbindungssuche in Sekunden (Standard: 12).
+    - EFA_CACHE_TTL, EFA_CACHE_SIZE: Lebensdauer (Sekunden, Standard: 60) und maximale
+      Größe (Standard: 1024) des Caches für EFA-Trip-Ergebnisse.
+    - EFA_TIME_BUCKET: Rasterung der Suchzeit in Minuten für bessere Cache-Trefferquoten
+      (Standard: 5).
+    - EFA_TIMEZONE: Zeitzone der EFA-Suchzeiten (Standard: 'Europe/Berlin').
+    - SEARCH_MAX_ROUNDS: Maximale Anzahl an Anfragerunden einer Verbindungssuche, bis das
+      Ergebnis bewiesen vollständig ist (Standard: 3, '1' = nur eine Runde).
+    - SEARCH_MAX_TRIPS: Obergrenze für `calcNumberOfTrips` einer Anfrage (Standard: 10).
+    - GTFS_PATH: GTFS-Feed (ZIP oder Verzeichnis) für das Offline-Routing mit `raptor`
+      (Standard: leer = deaktiviert).
+    - ROUTING_MODE: 'efa' (nur EFA), 'fallback' (GTFS-Planzeiten, wenn die EFA-Anfrage
+      fehlschlägt) oder 'gtfs' (nur GTFS). Standard: 'fallback' mit GTFS_PATH, sonst 'efa'.
+    - GTFS_CHANGE_TIME, GTFS_MAX_TRANSFERS: Mindestumstiegszeit in Sekunden (Standard: 120)
+      und maximale Anzahl an Umstiegen (Standard: 3) des Offline-Routings.
+    - EFA_STREAM_PARSER: '1' aktiviert den speichersparenden Streaming-Parser für
+      EFA-Antworten (benötigt das Paket `ijson`, Standard: '0').
+    - BATCH_MAX_ITEMS: Maximale Anzahl an Suchen pro `/api/connections/batch` (Standard: 50).
+    - TIMETABLE_CACHE_TTL, TIMETABLE_CACHE_SIZE: Aktualisierungsintervall (Sekunden,
+      Standard: 900) und maximale Anzahl gecachter Kurse (Standard: 256) des Stundenplan-Caches.
+    - LECTURE_SYNC_INTERVAL: Sekunden zwischen zwei Abgleichen der Vorlesungen aller Kurse
+      mit der Tabelle `lectures` (Standard: 900, '0' = `/api/timetable` nur als Proxy über
+      den Stundenplan-Cache, siehe `lectures`). Der Abgleich läuft nur in einem Prozess,
+      siehe JOBS_LOCK_FILE.
+    - STOPS_CSV: Haltestellenliste (Standard: 'haltestellen.csv' neben `vvs_app.py`).
+    - STOPS_SNAPSHOT: Vorkompilierter Snapshot der Haltestellen, den die Worker per mmap
+      lesen, statt die CSV zu parsen (Standard: STOPS_CSV mit Endung '.stops', wird bei
+      Bedarf erzeugt).
+    - STOPS_RELOAD_INTERVAL: Sekunden zwischen zwei Prüfungen der CSV auf Änderungen;
+      geänderte Haltestellen werden ohne Neustart übernommen (Standard: 30, '0' = aus).
+    - PRECOMPUTE_INTERVAL: Sekunden zwischen zwei Vorberechnungen der Pendelverbindungen
+      aller aktiven Profile (Standard: 1800, '0' deaktiviert den Scheduler). Läuft nur in
+      einem Prozess, siehe JOBS_LOCK_FILE.
+    - PRECOMPUTE_DAYS: Anzahl vorberechneter Vorlesungstage (Standard: 3).
+    - PRECOMPUTE_COURSE_DAILY_LIMIT: Maximale Anzahl an neuen Verbindungssuchen je Kurs und
+      Kalendertag durch die Vorberechnung (Standard: 200).
+    - PRECOMPUTE_MAX_AGE: Sekunden, die ein vorberechnetes Ergebnis als aktuell gilt und nicht
+      neu gesucht wird (Standard: 10800).
+    - JOBS_LOCK_FILE: Sperrdatei, über die die Hintergrundjobs nur in einem Worker-Prozess
+      laufen (Standard: 'vvs-jobs.lock' im Temp-Verzeichnis).
+    - PROMETHEUS_MULTIPROC_DIR: Verzeichnis für die Metriken mehrerer Worker-Prozesse
+      (`/metrics`). Wird bei SERVER_MODE=asgi und ASGI_WORKERS > 1 automatisch angelegt.
+    - FAVORITES_PAGE_SIZE, FAVORITES_MAX_PAGE_SIZE: Standard- und Maximalgröße einer Seite
+      der Favoritenliste (Standard: 50/200).
+    - DEPARTURES_INTERVAL: Sekunden zwischen zwei EFA-Abfragen derselben Abfahrtstafel
+      (Standard: 30, gemeinsam für alle Betrachter).
+    - DEPARTURES_IDLE_TTL: Sekunden ohne Betrachter, nach denen eine Tafel verworfen wird
+      (Standard: 120).
+    - DEPARTURES_LIMIT, DEPARTURES_MAX_BOARDS: Abfahrten je Tafel (Standard: 10) und
+      maximale Anzahl gleichzeitiger Tafeln (Standard: 500).
+    - DEPARTURES_LONGPOLL_MAX: Maximale Wartezeit eines Long-Polls in Sekunden (Standard: 25).
+    - FAVORITES_REALTIME_WINDOW: Zeitfenster in Minuten, in dem Favoriten mit gleichem Start
+      und Ziel eine gemeinsame Echtzeit-Abfrage teilen (Standard: 60).
+    - FAVORITES_REALTIME_TRIPS: Anzahl der Fahrten je Echtzeit-Abfrage (Standard: 8).
+    - DB_MIGRATE: '0' deaktiviert das Einspielen der Migrationen aus `migrations/` beim
+      Start (Standard: '1').
+    - JWT_SECRET: Gemeinsames Secret des Auth-Dienstes für HS-signierte Tokens.
+    - JWT_PUBLIC_KEY, JWT_JWKS_URL: Public Key (PEM) bzw. JWKS-URL für RS/ES-signierte
+      Tokens (benötigt `PyJWT[crypto]`). Ohne Secret/Key wird die Signatur nicht geprüft
+      und `/api/auth/verify` antwortet mit 503.
+    - JWT_ALGORITHMS: Kommagetrennte Liste erlaubter Algorithmen (Standard: 'HS256').
+    - JWT_LEEWAY: Toleranz für `exp`/`nbf` in Sekunden (Standard: 30).
+    - JWT_ISSUER, JWT_AUDIENCE: Optional erwartete Werte für `iss` und `aud`.
+    - AUTH_CACHE_SIZE, AUTH_CACHE_TTL: Maximale Anzahl geprüfter Tokens im Cache (Standard:
+      4096) und maximale Verweildauer in Sekunden (Standard: 300, höchstens bis `exp`).
+    - SERVER_TIMING: '0' unterdrückt den `Server-Timing`-Header mit den Spans je Request
+      (Standard: '1', siehe `tracing`).
+    - TRACE_SLOW_MS: Schwelle in Millisekunden, ab der ein Request mit allen Spans ins
+      Slow-Request-Log geschrieben wird (Standard: 2000, '0' = aus).
+    - TRACE_SLOW_LOG: Datei für das Slow-Request-Log (JSON-Zeilen, Standard: Konsole).
+    - PROFILE_TOKEN: Token für `X-Profile-Token`, mit dem einzelne Requests per cProfile
+      aufgezeichnet werden (Standard: leer = deaktiviert).
+    - PROFILE_DIR, PROFILE_KEEP: Ablageort der Profile (Standard: Temp-Verzeichnis
+      'vvs-profiles') und Anzahl aufbewahrter Profile (Standard: 50).
+    - SERVER_MODE: 'dev' (Flask-Entwicklungsserver, Standard) oder 'asgi' (Uvicorn mit den
+      asynchronen Routen aus `asgi_app`, siehe dort für ASGI_WORKERS/ASGI_UPSTREAM_POOL_SIZE).
 
 Datum: Dezember 2025
 Version: 1.0.0
@@ -29,22 +119,50 @@ Version: 1.0.0
 
 # Standard-Library Imports
 import os
-import csv
+import time
 import json
 import base64
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+try:
+    import fcntl
+except ImportError:  # Windows: keine Dateisperren, Jobs laufen in jedem Prozess
+    fcntl = None
 
 # Third-Party Imports
-import requests
-import psycopg2
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
+import psycopg2
 from psycopg2.extras import RealDictCursor
+try:
+    import ijson  # optional: Streaming-Parser für EFA-Antworten
+except ImportError:
+    ijson = None
+
+# Lokale Imports
+from cache import TTLCache, RevalidatingCache
+from db_pool import ConnectionPool, PoolTimeout
+from upstream import UpstreamClient, CircuitBreaker, CircuitOpenError
+from stop_table import StopStore
+from auth import TokenVerifier, TokenError
+from commute import CommuteScheduler
+from lectures import LectureSync, in_range
+from departures import DepartureHub
+from planner import ConnectionSearch, TripWindows
+from raptor import GtfsRouter
+from migrations import apply_migrations
+import metrics
+import tracing
 
 # App Initialisierung
 app = Flask(__name__)
-CORS(app)
+# Eigene Header (Cache-Status, Pagination) für das Frontend lesbar machen
+CORS(app, expose_headers=['X-Cache', 'X-Next-Cursor', 'Server-Timing', 'X-Profile'])
 load_dotenv()
 
 
@@ -57,13 +175,140 @@ db_config = {
     'port': os.getenv('DB_PORT', '5432')
 }
 
+db_pool = ConnectionPool(db_config,
+                         minconn=int(os.getenv('DB_POOL_MIN', '1')),
+                         maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+                         timeout=float(os.getenv('DB_POOL_TIMEOUT', '5')),
+                         connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', '0')) or None)
+
 def get_db_connection():
-    # Verbindung zu PostgreSQL aufbauen
-    return psycopg2.connect(**db_config)
+    # Verbindung aus dem Pool leihen (Context-Manager, gibt sie danach automatisch zurück)
+    return db_pool.connection()
+
+def get_dedicated_db_connection():
+    # Eigene Verbindung außerhalb des Pools (für Locks, die über lange Läufe gehalten werden)
+    return db_pool.dedicated()
+
+# SQL-Statements (gemeinsam genutzt vom Flask- und vom ASGI-Modus)
+SQL_PROFILE_SELECT = "SELECT * FROM user_profiles WHERE username = %s"
+SQL_PROFILE_UPSERT = """INSERT INTO user_profiles (username, timetable_link, home_stop_id, home_stop_name, buffer_time) 
+                     VALUES (%s, %s, %s, %s, %s) 
+                     ON CONFLICT (username) DO UPDATE SET 
+                     timetable_link=EXCLUDED.timetable_link, 
+                     home_stop_id=EXCLUDED.home_stop_id, 
+                     home_stop_name=EXCLUDED.home_stop_name, 
+                     buffer_time=EXCLUDED.buffer_time"""
+SQL_ENSURE_USER = "INSERT INTO user_profiles (username) VALUES (%s) ON CONFLICT (username) DO NOTHING"
+# Duplikate erkennt der Unique-Index auf (username, journey_key), siehe migrations/001
+SQL_FAV_INSERT = """INSERT INTO fav_connections 
+                     (username, dep_time, arr_time, duration, interchanges, sections_json) 
+                     VALUES (%s, %s, %s, %s, %s, %s::jsonb)
+                     ON CONFLICT (username, journey_key) DO NOTHING
+                     RETURNING id"""
+FAV_COLUMNS = "id, username, dep_time, arr_time, duration, interchanges, created_at"
+# Keyset-Pagination über (created_at, id), passend zum Index (username, created_at DESC, id DESC)
+SQL_FAV_PAGE = {
+    (summary, after): f"""SELECT {FAV_COLUMNS}{'' if summary else ', sections_json'} FROM fav_connections
+                          WHERE username = %s{' AND (created_at, id) < (%s, %s)' if after else ''}
+                          ORDER BY created_at DESC, id DESC LIMIT %s"""
+    for summary in (False, True) for after in (False, True)
+}
+SQL_FAV_DELETE = "DELETE FROM fav_connections WHERE id = %s AND username = %s"
+SQL_FAV_REALTIME = """SELECT id, dep_time, arr_time, sections_json FROM fav_connections
+                       WHERE username = %s ORDER BY created_at DESC, id DESC LIMIT %s"""
+
+# Tracing (Server-Timing, Slow-Request-Log) und Profiling einzelner Requests
+request_tracer = tracing.Tracer(header=os.getenv('SERVER_TIMING', '1') == '1',
+                                slow_ms=float(os.getenv('TRACE_SLOW_MS', '2000')),
+                                log_path=os.getenv('TRACE_SLOW_LOG') or None)
+profiler = tracing.Profiler(os.getenv('PROFILE_TOKEN', ''),
+                            os.getenv('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'vvs-profiles'),
+                            keep=int(os.getenv('PROFILE_KEEP', '50')))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.trace = request_tracer.begin()
+    if profiler.authorized(request.headers.get('X-Profile-Token')):
+        g.profile = profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    # Route-Template statt konkreter URL, damit die Label-Anzahl begrenzt bleibt
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.observe_request(rule, request.method, response.status_code,
+                            time.perf_counter() - g.get('request_start', time.perf_counter()))
+    timing = request_tracer.finish(g.get('trace'), rule, request.method, response.status_code, request.path)
+    if timing:
+        response.headers['Server-Timing'] = timing
+    if g.get('profile') is not None:
+        response.headers['X-Profile'] = profiler.stop(g.pop('profile'), rule) or 'error'
+    return response
+
+@app.teardown_request
+def finish_request_trace(error=None):
+    # Nach unbehandelten Fehlern: Trace abschließen und ein laufendes Profil freigeben
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    if g.get('profile') is not None:
+        profiler.stop(g.pop('profile'), rule)
+    request_tracer.finish(g.get('trace'), rule, request.method, 500, request.path)
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(e):
+    # Pool ausgeschöpft: lieber schnell 503 als hängende Requests
+    return jsonify({"error": "Datenbank ausgelastet, bitte später erneut versuchen"}), 503
+
+
+# --- UPSTREAM KONFIGURATION ---
+# Langlebige Keep-Alive-Sessions, von allen Routen gemeinsam genutzt
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '10'))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3'))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', '10'))
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv('UPSTREAM_BREAKER_THRESHOLD', '5'))
+UPSTREAM_BREAKER_RESET = float(os.getenv('UPSTREAM_BREAKER_RESET', '30'))
+# Circuit-Breaker pro Upstream: bei VVS-Ausfall sofort abbrechen statt Worker zu blockieren
+vvs_client = UpstreamClient(os.getenv('VVS_BASE_URL', 'https://www3.vvs.de/mngvvs'),
+                            pool_size=UPSTREAM_POOL_SIZE,
+                            connect_timeout=UPSTREAM_CONNECT_TIMEOUT,
+                            read_timeout=UPSTREAM_READ_TIMEOUT,
+                            breaker=CircuitBreaker(UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_RESET),
+                            hedge=os.getenv('EFA_HEDGE', '0') == '1',
+                            hedge_max_ratio=float(os.getenv('EFA_HEDGE_MAX_RATIO', '0.1')),
+                            observe=metrics.upstream_observer('vvs'))
+dhbw_client = UpstreamClient(os.getenv('DHBW_BASE_URL', 'https://api.dhbw.app'),
+                             pool_size=UPSTREAM_POOL_SIZE,
+                             connect_timeout=UPSTREAM_CONNECT_TIMEOUT,
+                             read_timeout=UPSTREAM_READ_TIMEOUT,
+                             breaker=CircuitBreaker(UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_RESET),
+                             observe=metrics.upstream_observer('dhbw'))
+
+
+
+# --- STUNDENPLAN KONFIGURATION ---
+# Rapla-Daten ändern sich selten: sofort aus dem Cache liefern, im Hintergrund aktualisieren
+background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='refresh')
+timetable_cache = RevalidatingCache(maxsize=int(os.getenv('TIMETABLE_CACHE_SIZE', '256')),
+                                    ttl=float(os.getenv('TIMETABLE_CACHE_TTL', '900')),
+                                    executor=background_executor)
+
+
+# --- AUTH KONFIGURATION ---
+# Tokens werden lokal geprüft und bis zum Ablauf gecacht (kein Aufruf des Auth-Dienstes)
+token_verifier = TokenVerifier(secret=os.getenv('JWT_SECRET'),
+                               public_key=os.getenv('JWT_PUBLIC_KEY'),
+                               jwks_url=os.getenv('JWT_JWKS_URL'),
+                               algorithms=os.getenv('JWT_ALGORITHMS', 'HS256').split(','),
+                               leeway=float(os.getenv('JWT_LEEWAY', '30')),
+                               issuer=os.getenv('JWT_ISSUER'),
+                               audience=os.getenv('JWT_AUDIENCE'),
+                               cache_size=int(os.getenv('AUTH_CACHE_SIZE', '4096')),
+                               cache_ttl=float(os.getenv('AUTH_CACHE_TTL', '300')))
 
 
 # --- VVS KONFIGURATION ---
-BASE_URL = "https://www3.vvs.de/mngvvs/XML_TRIP_REQUEST2"
+TRIP_PATH = "/XML_TRIP_REQUEST2"
+DM_PATH = "/XML_DM_REQUEST"
+BASE_URL = vvs_client.url(TRIP_PATH)
 UNI_STOPS = [
     {"name": "Rosenberg-/Seidenstraße", "id": "de:08111:6072"},
     {"name": "Linden-Museum", "id": "de:08111:2196"}
@@ -98,45 +343,114 @@ STATIC_EFA_PARAMS = {
     "useUT": 0, 
     "version": "10.2.10.139"
 }
-stop_mapping = {}
+# Abfahrtsmonitor (XML_DM_REQUEST) für die Abfahrtstafeln, ohne Zeitangabe = ab jetzt
+STATIC_DM_PARAMS = {
+    "coordOutputFormat": "WGS84[dd.ddddd]",
+    "depType": "stopEvents",
+    "itdDateTimeDepArr": "dep",
+    "locationServerActive": 1,
+    "mode": "direct",
+    "outputFormat": "rapidJSON",
+    "type_dm": "any",
+    "useAllStops": 1,
+    "useRealtime": 1,
+    "version": "10.2.10.139"
+}
+EFA_TIMEOUT = UPSTREAM_READ_TIMEOUT
+EFA_DEADLINE = float(os.getenv('EFA_DEADLINE', '12'))
+# Gemeinsamer, begrenzter Thread-Pool für parallele EFA-Anfragen aller Requests
+efa_executor = ThreadPoolExecutor(max_workers=int(os.getenv('EFA_MAX_WORKERS', '8')),
+                                  thread_name_prefix='efa')
+# Kurzlebiger Cache für Trip-Ergebnisse (Echtzeitdaten veralten schnell)
+EFA_TIME_BUCKET = max(1, int(os.getenv('EFA_TIME_BUCKET', '5')))
+efa_cache = TTLCache(maxsize=int(os.getenv('EFA_CACHE_SIZE', '1024')),
+                     ttl=float(os.getenv('EFA_CACHE_TTL', '60')))
+# Verbindungssuche: Planung der Trip-Anfragen und Wiederverwendung geladener Zeitfenster
+EFA_TIMEZONE = ZoneInfo(os.getenv('EFA_TIMEZONE', 'Europe/Berlin'))
+SEARCH_RESULTS = 5
+SEARCH_MAX_ROUNDS = max(1, int(os.getenv('SEARCH_MAX_ROUNDS', '3')))
+SEARCH_MAX_TRIPS = int(os.getenv('SEARCH_MAX_TRIPS', '10'))
+trip_windows = TripWindows(EFA_TIMEZONE, ttl=efa_cache.ttl, maxsize=efa_cache.maxsize)
+# Offline-Routing auf GTFS-Planzeiten (in `load_gtfs` geladen)
+GTFS_PATH = os.getenv('GTFS_PATH', '')
+ROUTING_MODE = os.getenv('ROUTING_MODE', 'fallback' if GTFS_PATH else 'efa')
+GTFS_CHANGE_TIME = int(os.getenv('GTFS_CHANGE_TIME', '120'))
+GTFS_MAX_TRANSFERS = int(os.getenv('GTFS_MAX_TRANSFERS', '3'))
+gtfs_router = None
+# Streaming-Parser (benötigt ijson): weniger Speicher pro Antwort, aber mehr CPU-Zeit
+EFA_STREAM_PARSER = os.getenv('EFA_STREAM_PARSER', '0') == '1' and ijson is not None
+EFA_STREAM_BUFFER = 4096
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '50'))
+FAVORITES_PAGE_SIZE = int(os.getenv('FAVORITES_PAGE_SIZE', '50'))
+FAVORITES_MAX_PAGE_SIZE = int(os.getenv('FAVORITES_MAX_PAGE_SIZE', '200'))
+# Abfahrtstafeln: Abfahrten je Tafel und maximale Wartezeit eines Long-Polls
+DEPARTURES_LIMIT = int(os.getenv('DEPARTURES_LIMIT', '10'))
+DEPARTURES_LONGPOLL_MAX = float(os.getenv('DEPARTURES_LONGPOLL_MAX', '25'))
+DEPARTURES_HEARTBEAT = 15  # Sekunden zwischen Keep-Alive-Kommentaren im SSE-Stream
+# Echtzeit-Abgleich der Favoriten: ein Trip-Request je (Start, Ziel) und Zeitfenster
+FAVORITES_REALTIME_WINDOW = int(os.getenv('FAVORITES_REALTIME_WINDOW', '60'))
+FAVORITES_REALTIME_TRIPS = int(os.getenv('FAVORITES_REALTIME_TRIPS', '8'))
+REALTIME_LOOKBACK = 10  # Minuten vor der gespeicherten Abfahrt (gespeichert ist ggf. schon die Echtzeit)
+REALTIME_MATCH_TOLERANCE = 30  # maximale Abweichung der Plan-Abfahrt in Minuten
+# Haltestellen aus `haltestellen.csv` über einen per mmap gelesenen Snapshot (siehe `stop_table`)
+STOPS_CSV = os.getenv('STOPS_CSV', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'haltestellen.csv'))
+STOPS_SNAPSHOT = os.getenv('STOPS_SNAPSHOT', os.path.splitext(STOPS_CSV)[0] + '.stops')
+stop_store = StopStore(STOPS_CSV, STOPS_SNAPSHOT, interval=float(os.getenv('STOPS_RELOAD_INTERVAL', '30')))
+STOP_SEARCH_MAX_LIMIT = 50
 
 
 # --- VVS-Funktionen ---
 def load_stops():
     """
-    Lädt Haltestellendaten aus einer CSV-Datei und speichert sie im globalen Mapping.
+    Lädt die Haltestellen aus 'haltestellen.csv' (`STOPS_CSV`) in `stop_store`.
 
-    Die Funktion liest die Datei 'haltestellen.csv' ein, die sich im selben Verzeichnis 
-    wie das Skript befinden muss. Dabei werden die Spalten 'Name', 'Globale ID' und 
-    optional 'Zusatz' verarbeitet (Zusatz hat einen Wert, wenn ein Name im VVS-Netz 
-    mehrmals vorkommt, z.B. "Ortsmitte". In dem Fall wird zusätzlich der Teilort mitgegeben). 
-    Die Daten werden in das globale Dictionary `stop_mapping` geschrieben, wobei der Name 
-    (ggf. mit Zusatz) als Key und die ID als Value dient.
+    Die CSV wird nicht mehr bei jedem Start geparst: `stop_table` erzeugt daraus einmalig
+    einen kompakten Snapshot (`STOPS_SNAPSHOT`, alle Spalten inkl. Teilort, jeder String
+    nur einmal), den alle Worker per mmap einblenden. Daraus entsteht der `StopCatalog`
+    mit den Zuordnungen Anzeigename <-> ID ('Name' ggf. mit 'Zusatz', z. B.
+    "Ortsmitte (Gerlingen)"), dem Suchindex inkl. Teilort sowie der vorserialisierten
+    JSON-Liste mit ETag für `/api/stops`. Ändert sich die CSV, lädt der Hintergrund-Thread
+    von `stop_store` alle `STOPS_RELOAD_INTERVAL` Sekunden neu und tauscht den Katalog
+    atomar aus.
 
     Dateiformat der CSV:
         - Trennzeichen: Semikolon (;)
         - Kodierung: UTF-8 mit BOM (utf-8-sig)
-        - Erwartete Header: 'Name', 'Globale ID', 'Zusatz' (optional)
+        - Erwartete Header: 'Name', 'Globale ID', 'Teilort' und 'Zusatz' (optional)
 
     Raises:
-        FileNotFoundError: Wenn die Datei 'haltestellen.csv' nicht gefunden wird.
-        KeyError: Wenn die erforderlichen Spalten 'Name' oder 'Globale ID' fehlen.
-        Exception: Fängt allgemeine Fehler beim Dateizugriff ab und gibt eine 
-                  Fehlermeldung auf der Konsole aus.
+        Exception: Fängt Fehler beim Dateizugriff (fehlende Datei, fehlende Spalten) ab
+                  und gibt eine Fehlermeldung auf der Konsole aus.
     """
     try:
-        file_path = os.path.join(os.path.dirname(__file__), 'haltestellen.csv')
-        with open(file_path, mode='r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f, delimiter=';')
-            for row in reader:
-                name, stop_id = row['Name'].strip(), row['Globale ID'].strip()
-                zusatz = row.get('Zusatz', '').strip() 
-                display_name = f"{name} ({zusatz})" if zusatz else name
-                stop_mapping[display_name] = stop_id
+        stop_store.load()
     except Exception as e:
         print(f"Fehler CSV: {e}")
 
 load_stops()
+if stop_store.interval > 0:
+    stop_store.start()
+
+
+def load_gtfs():
+    """
+    Lädt den GTFS-Feed aus `GTFS_PATH` in den globalen `gtfs_router`.
+
+    Ohne `GTFS_PATH` bleibt das Offline-Routing deaktiviert. Ein fehlerhafter Feed wird
+    auf der Konsole gemeldet; Trip-Anfragen laufen dann weiter nur über die EFA.
+    """
+    global gtfs_router
+    if not GTFS_PATH:
+        return
+    try:
+        start = time.perf_counter()
+        gtfs_router = GtfsRouter(GTFS_PATH, EFA_TIMEZONE, change_time=GTFS_CHANGE_TIME,
+                                 max_transfers=GTFS_MAX_TRANSFERS)
+        print(f"GTFS geladen in {time.perf_counter() - start:.1f} s: {gtfs_router.stats()}")
+    except Exception as e:
+        print(f"Fehler GTFS: {e}")
+
+load_gtfs()
 
 
 def format_vvs_time(time_str):
@@ -213,61 +527,1073 @@ def parse_vvs_data(vvs_json):
         return []
 
     for journey in vvs_json.get('journeys', []):
-        legs = journey.get('legs', [])
-        if not legs: continue
-        
-        sections = []
-        for leg in legs:
+        parsed = parse_vvs_journey(journey)
+        if parsed: processed.append(parsed)
+    return processed
+
+
+def parse_vvs_journey(journey):
+    """
+    Bereitet eine einzelne EFA-Fahrt (Journey) auf (siehe `parse_vvs_data`).
+
+    Wird sowohl vom vollständigen Parser als auch vom Streaming-Parser genutzt, damit
+    beide Wege identische Ergebnisse liefern.
+
+    Args:
+        journey (dict): Eine Fahrt aus `journeys[]` der EFA-Antwort (ggf. auf die
+            benötigten Felder reduziert).
+
+    Returns:
+        dict | None: Die aufbereitete Verbindung oder None, wenn die Fahrt keine Legs hat.
+    """
+    legs = journey.get('legs', [])
+    if not legs: return None
+    
+    sections = []
+    for leg in legs:
+        origin = leg.get('origin', {})
+        destination = leg.get('destination', {})
+        dep_raw = (leg.get('departureTimeEstimated') or leg.get('departureTimePlanned') or 
+                   origin.get('departureTimeEstimated') or origin.get('departureTimePlanned'))
+        arr_raw = (leg.get('arrivalTimeEstimated') or leg.get('arrivalTimePlanned') or 
+                   destination.get('arrivalTimeEstimated') or destination.get('arrivalTimePlanned'))
+
+        sections.append({
+            "line": leg.get('transportation', {}).get('number', "Fußweg"),
+            "from": origin.get('name', 'Unbekannt'),
+            "to": destination.get('name', 'Unbekannt'),
+            "departure": format_vvs_time(dep_raw),
+            "arrival": format_vvs_time(arr_raw)
+        })
+
+    first_dep = sections[0]['departure']
+    last_arr = sections[-1]['arrival']
+    duration_minutes = 0
+    try:
+        t1 = datetime.strptime(first_dep, "%H:%M")
+        t2 = datetime.strptime(last_arr, "%H:%M")
+        delta = t2 - t1
+        seconds = delta.total_seconds()
+        if seconds < 0:
+            seconds += 86400 
+        duration_minutes = int(seconds / 60)
+    except Exception:
+        duration_minutes = journey.get('duration', 0) // 60
+
+    return {
+        "dep": first_dep,
+        "arr": last_arr,
+        "duration": duration_minutes,
+        "interchanges": journey.get('interchanges', 0),
+        "sections": sections
+    }
+
+
+# Pfade (ijson-Präfixe) der Felder, die `parse_vvs_journey` tatsächlich liest
+_STREAM_JOURNEY = 'journeys.item'
+_STREAM_LEG = 'journeys.item.legs.item'
+_STREAM_JOURNEY_FIELDS = {
+    f'{_STREAM_JOURNEY}.interchanges': 'interchanges',
+    f'{_STREAM_JOURNEY}.duration': 'duration'
+}
+_STREAM_LEG_FIELDS = {
+    f'{_STREAM_LEG}.{path}': tuple(path.split('.')) for path in (
+        'departureTimeEstimated', 'departureTimePlanned', 'arrivalTimeEstimated', 'arrivalTimePlanned',
+        'transportation.number', 'origin.name', 'origin.departureTimeEstimated',
+        'origin.departureTimePlanned', 'destination.name', 'destination.arrivalTimeEstimated',
+        'destination.arrivalTimePlanned'
+    )
+}
+_STREAM_SCALARS = {'string', 'number', 'null', 'boolean'}
+
+
+def parse_vvs_stream(fp):
+    """
+    Streaming-Variante von `parse_vvs_data`, die die EFA-Antwort inkrementell liest.
+
+    Statt die komplette Antwort (inkl. Koordinaten, Haltfolgen, Infos und Fußwegen) in
+    ein Dictionary zu dekodieren, werden nur die Felder aus `journeys[].legs[]` übernommen,
+    die `parse_vvs_journey` tatsächlich nutzt. Jede Fahrt wird aufbereitet, sobald sie
+    vollständig gelesen wurde. Das Ergebnis ist identisch zu `parse_vvs_data`.
+
+    Benötigt das optionale Paket `ijson`.
+
+    Args:
+        fp (file-like): Binärer Datenstrom der EFA-Antwort (z. B. `response.raw`).
+
+    Returns:
+        list[dict]: Eine Liste prozessierter Verbindungen (siehe `parse_vvs_data`).
+
+    Raises:
+        RuntimeError: Wenn `ijson` nicht installiert ist.
+        ijson.JSONError: Bei ungültigem JSON.
+    """
+    if ijson is None:
+        raise RuntimeError("Streaming-Parser benötigt das Paket 'ijson'")
+
+    processed = []
+    journey = leg = None
+    for prefix, event, value in ijson.parse(fp, use_float=True, buf_size=EFA_STREAM_BUFFER):
+        if prefix == _STREAM_LEG and journey is not None:
+            if event == 'start_map':
+                leg = {}
+            elif event == 'end_map':
+                journey['legs'].append(leg)
+                leg = None
+        elif prefix == _STREAM_JOURNEY:
+            if event == 'start_map':
+                journey = {'legs': []}
+            elif event == 'end_map':
+                parsed = parse_vvs_journey(journey)
+                if parsed: processed.append(parsed)
+                journey = None
+        elif event in _STREAM_SCALARS:
+            if leg is not None:
+                path = _STREAM_LEG_FIELDS.get(prefix)
+                if path:
+                    target = leg
+                    for key in path[:-1]:
+                        target = target.setdefault(key, {})
+                    target[path[-1]] = value
+            elif journey is not None and prefix in _STREAM_JOURNEY_FIELDS:
+                journey[_STREAM_JOURNEY_FIELDS[prefix]] = value
+    return processed
+
+
+def fetch_vvs_trips(params, timeout=EFA_TIMEOUT):
+    """
+    Führt eine einzelne Trip-Anfrage an die EFA-Schnittstelle aus und parst das Ergebnis.
+
+    Args:
+        params (dict): Vollständige Query-Parameter für `XML_TRIP_REQUEST2`.
+        timeout (float): Read-Timeout der HTTP-Anfrage in Sekunden.
+
+    Returns:
+        list[dict]: Die von `parse_vvs_data` aufbereiteten Verbindungen.
+    """
+    if EFA_STREAM_PARSER:
+        res = vvs_client.get(TRIP_PATH, params=params, read_timeout=timeout, stream=True, hedge=True)
+        try:
+            res.raw.decode_content = True
+            with metrics.parse_timer('stream'):
+                return parse_vvs_stream(res.raw)
+        finally:
+            res.close()
+    res = vvs_client.get(TRIP_PATH, params=params, read_timeout=timeout, hedge=True)
+    with tracing.span('decode'):
+        data = res.json()
+    with metrics.parse_timer('json'):
+        return parse_vvs_data(data)
+
+
+def snap_search_time(search_dt, t_type):
+    """
+    Rastert die Suchzeit auf `EFA_TIME_BUCKET` Minuten, damit ähnliche Anfragen denselben
+    Cache-Eintrag nutzen.
+
+    Bei Ankunftssuchen ('arr') wird abgerundet, bei Abfahrtssuchen ('dep') aufgerundet.
+    So verschiebt die Rasterung die Suche nie auf die "unsichere" Seite des Puffers.
+
+    Args:
+        search_dt (datetime): Die berechnete Suchzeit.
+        t_type (str): 'arr' oder 'dep'.
+
+    Returns:
+        str: Die gerasterte Uhrzeit im Format HHMM.
+
+    Beispiele:
+        >>> snap_search_time(datetime(1900, 1, 1, 8, 47), 'arr')
+        '0845'
+        >>> snap_search_time(datetime(1900, 1, 1, 8, 47), 'dep')
+        '0850'
+    """
+    minutes = search_dt.hour * 60 + search_dt.minute
+    if t_type == 'arr':
+        minutes -= minutes % EFA_TIME_BUCKET
+    else:
+        minutes = min(minutes + (-minutes % EFA_TIME_BUCKET), 23 * 60 + 59)
+    return f"{minutes // 60:02d}{minutes % 60:02d}"
+
+
+def trip_cache_key(params):
+    """Bildet den normalisierten Cache-Key einer Trip-Anfrage aus den variablen Parametern."""
+    return (str(params["name_origin"]), str(params["name_destination"]), str(params["itdDate"]),
+            params["itdTime"], params["itdTripDateTimeDepArr"], params["calcNumberOfTrips"])
+
+
+def cached_vvs_trips(params, timeout=EFA_TIMEOUT):
+    """
+    Wie `fetch_vvs_trips`, aber über den gemeinsamen TTL-Cache `efa_cache`.
+
+    Identische, gleichzeitige Anfragen werden zu einem einzigen Upstream-Aufruf
+    zusammengelegt (Single-Flight). Fehler werden nicht gecacht. Liegt die Antwort
+    vollständig in einem bereits geladenen Zeitfenster derselben Relation (`trip_windows`),
+    entfällt der Upstream-Aufruf ganz.
+    """
+    def load():
+        journeys = trip_windows.lookup(params)
+        if journeys is not None:
+            metrics.TRIP_QUERIES.labels('window').inc()
+            return journeys
+        metrics.TRIP_QUERIES.labels('upstream').inc()
+        journeys = fetch_vvs_trips(params, timeout)
+        trip_windows.add(params, journeys)
+        return journeys
+
+    return efa_cache.get_or_load(trip_cache_key(params), load)
+
+
+def gtfs_trips(params, timeout=None):
+    """Beantwortet eine Trip-Anfrage offline aus `gtfs_router` (nur Planzeiten, ohne Cache)."""
+    metrics.TRIP_QUERIES.labels('gtfs').inc()
+    return gtfs_router.trips(params)
+
+
+def routed_trips(params, timeout=EFA_TIMEOUT):
+    """
+    Lädt eine Trip-Anfrage je nach `ROUTING_MODE` über die EFA oder den GTFS-Fahrplan.
+
+    Im Modus 'fallback' wird zuerst `cached_vvs_trips` versucht; schlägt die EFA-Anfrage
+    fehl (Timeout, Fehlerstatus, offener Circuit-Breaker), antwortet `gtfs_trips`.
+
+    Args:
+        params (dict): Vollständige Query-Parameter für `XML_TRIP_REQUEST2`.
+        timeout (float): Read-Timeout der EFA-Anfrage in Sekunden.
+
+    Returns:
+        list[dict]: Verbindungen im Format von `parse_vvs_data`.
+    """
+    with tracing.span('trip', trip_span_detail(params)):
+        if gtfs_router is None or ROUTING_MODE == 'efa':
+            return cached_vvs_trips(params, timeout)
+        if ROUTING_MODE == 'gtfs':
+            return gtfs_trips(params)
+        try:
+            return cached_vvs_trips(params, timeout)
+        except Exception as e:
+            print(f"Fehler VVS: {e} (Fallback auf GTFS)")
+            return gtfs_trips(params)
+
+
+def trip_span_detail(params):
+    """Kurzbeschreibung einer Trip-Anfrage für das Tracing ('Start>Ziel@HHMM')."""
+    return f"{params['name_origin']}>{params['name_destination']}@{params['itdTime']}"
+
+
+def parse_vvs_realtime(vvs_json):
+    """
+    Extrahiert Plan- und Echtzeiten je Teilstrecke aus einer EFA-Antwort.
+
+    Anders als `parse_vvs_data` werden Plan- und Echtzeit getrennt behalten, damit sich
+    Verspätungen gespeicherter Favoriten berechnen lassen.
+
+    Args:
+        vvs_json (dict): Die unbearbeitete JSON-Antwort der VVS-EFA-API.
+
+    Returns:
+        list[list[dict]]: Pro Fahrt die Teilstrecken mit 'line', 'from', 'to',
+            'planned_departure', 'departure', 'planned_arrival', 'arrival' (HH:MM,
+            Echtzeit falls vorhanden) und 'realtime' (bool).
+    """
+    journeys = []
+    for journey in (vvs_json or {}).get('journeys', []):
+        legs = []
+        for leg in journey.get('legs', []):
             origin = leg.get('origin', {})
             destination = leg.get('destination', {})
-            dep_raw = (leg.get('departureTimeEstimated') or leg.get('departureTimePlanned') or 
-                       origin.get('departureTimeEstimated') or origin.get('departureTimePlanned'))
-            arr_raw = (leg.get('arrivalTimeEstimated') or leg.get('arrivalTimePlanned') or 
-                       destination.get('arrivalTimeEstimated') or destination.get('arrivalTimePlanned'))
-
-            sections.append({
+            dep_planned = leg.get('departureTimePlanned') or origin.get('departureTimePlanned')
+            dep_estimated = leg.get('departureTimeEstimated') or origin.get('departureTimeEstimated')
+            arr_planned = leg.get('arrivalTimePlanned') or destination.get('arrivalTimePlanned')
+            arr_estimated = leg.get('arrivalTimeEstimated') or destination.get('arrivalTimeEstimated')
+            legs.append({
                 "line": leg.get('transportation', {}).get('number', "Fußweg"),
                 "from": origin.get('name', 'Unbekannt'),
                 "to": destination.get('name', 'Unbekannt'),
-                "departure": format_vvs_time(dep_raw),
-                "arrival": format_vvs_time(arr_raw)
+                "planned_departure": format_vvs_time(dep_planned),
+                "departure": format_vvs_time(dep_estimated or dep_planned),
+                "planned_arrival": format_vvs_time(arr_planned),
+                "arrival": format_vvs_time(arr_estimated or arr_planned),
+                "realtime": bool(dep_estimated or arr_estimated)
             })
+        if legs: journeys.append(legs)
+    return journeys
+
+
+def fetch_vvs_realtime(params, timeout=EFA_TIMEOUT):
+    """Wie `fetch_vvs_trips`, liefert aber Plan- und Echtzeiten (siehe `parse_vvs_realtime`)."""
+    res = vvs_client.get(TRIP_PATH, params=params, read_timeout=timeout, hedge=True)
+    with tracing.span('decode'):
+        data = res.json()
+    with metrics.parse_timer('realtime'):
+        return parse_vvs_realtime(data)
+
+
+def cached_vvs_realtime(params, timeout=EFA_TIMEOUT):
+    """Wie `cached_vvs_trips` für `fetch_vvs_realtime` (eigener Key-Raum im `efa_cache`)."""
+    return efa_cache.get_or_load(('realtime',) + trip_cache_key(params),
+                                 lambda: fetch_vvs_realtime(params, timeout))
+
+
+def local_time(time_str):
+    """
+    Wandelt einen ISO-Zeitstempel der EFA ("...Z", UTC) in die lokale Uhrzeit (HH:MM) um.
+
+    Anders als `format_vvs_time` wird die Zeitzone des Servers berücksichtigt
+    (`TZ=Europe/Berlin`, siehe Dockerfile). Andere Formate gehen an `format_vvs_time`.
+
+    Beispiele:
+        >>> local_time(None)
+        '--:--'
+        >>> local_time("0915")
+        '09:15'
+    """
+    try:
+        return datetime.fromisoformat(time_str.replace('Z', '+00:00')).astimezone().strftime("%H:%M")
+    except (AttributeError, ValueError):
+        return format_vvs_time(time_str)
+
+
+def parse_vvs_departures(vvs_json):
+    """
+    Bereitet die Antwort des EFA-Abfahrtsmonitors (`stopEvents`) für die Abfahrtstafel auf.
+
+    Args:
+        vvs_json (dict): Die unbearbeitete JSON-Antwort von `XML_DM_REQUEST`.
+
+    Returns:
+        list[dict]: Abfahrten mit 'id' (Fahrt + Plan-Abfahrt, stabil zwischen zwei Abfragen),
+            'line', 'product', 'direction', 'platform', 'planned', 'estimated' (HH:MM bzw.
+            None ohne Echtzeit), 'delay' (Minuten bzw. None) und 'realtime'.
+    """
+    departures = []
+    for event in (vvs_json or {}).get('stopEvents', []):
+        transportation = event.get('transportation', {})
+        planned = event.get('departureTimePlanned')
+        estimated = event.get('departureTimeEstimated')
+        line = transportation.get('number') or transportation.get('disassembledName', '')
+        delay = None
+        if planned and estimated:
+            try:
+                delay = int((datetime.fromisoformat(estimated.replace('Z', '+00:00')) -
+                             datetime.fromisoformat(planned.replace('Z', '+00:00'))).total_seconds() // 60)
+            except ValueError:
+                pass
+        departures.append({
+            "id": f"{transportation.get('id', line)}|{planned}",
+            "line": line,
+            "product": transportation.get('product', {}).get('name', ''),
+            "direction": transportation.get('destination', {}).get('name', 'Unbekannt'),
+            "platform": event.get('location', {}).get('properties', {}).get('platform'),
+            "planned": local_time(planned),
+            "estimated": local_time(estimated) if estimated else None,
+            "delay": delay,
+            "realtime": bool(event.get('isRealtimeControlled'))
+        })
+    return departures
+
+
+def fetch_departures(stop_id):
+    """
+    Fragt den EFA-Abfahrtsmonitor einer Haltestelle ab (Poll-Funktion von `departure_hub`).
+
+    Returns:
+        list[dict]: Die nächsten `DEPARTURES_LIMIT` Abfahrten (siehe `parse_vvs_departures`).
+    """
+    params = {**STATIC_DM_PARAMS, "name_dm": stop_id, "limit": DEPARTURES_LIMIT}
+    res = vvs_client.get(DM_PATH, params=params, read_timeout=EFA_TIMEOUT)
+    data = res.json()
+    with metrics.parse_timer('departures'):
+        return parse_vvs_departures(data)[:DEPARTURES_LIMIT]
+
+
+def fetch_timetable(course, entry=None):
+    """
+    Lädt die Vorlesungstermine eines Kurses von der dhbw.app, bei Bedarf als bedingte Anfrage.
+
+    Args:
+        course (str): Die Kursbezeichnung (z. B. 'STG-TINF23C').
+        entry (dict, optional): Bisheriger Cache-Eintrag. Dessen 'etag' bzw. 'last_modified'
+            werden als `If-None-Match` / `If-Modified-Since` mitgeschickt.
+
+    Returns:
+        tuple: `(events, etag, last_modified)`. Bei "304 Not Modified" die bisherigen Daten.
+
+    Raises:
+        requests.HTTPError: Wenn die dhbw.app mit einem Fehlerstatus antwortet.
+    """
+    res = dhbw_client.get(timetable_path(course), headers=conditional_headers(entry))
+    return timetable_from_response(res, entry)
+
+
+def timetable_path(course):
+    """Pfad der Vorlesungstermine eines Kurses relativ zu `DHBW_BASE_URL`."""
+    return f"/rapla/lectures/{course}/events"
+
+
+def conditional_headers(entry):
+    """Baut `If-None-Match`/`If-Modified-Since` aus einem Cache-Eintrag (oder None)."""
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers or None
+
+
+def timetable_from_response(res, entry):
+    """
+    Wertet die (ggf. bedingte) Antwort der dhbw.app aus.
+
+    Returns:
+        tuple: `(events, etag, last_modified)`. Bei "304 Not Modified" die Daten aus `entry`.
+    """
+    if res.status_code == 304 and entry:
+        return entry['value'], entry['etag'], entry['last_modified']
+    res.raise_for_status()
+    return res.json(), res.headers.get('ETag'), res.headers.get('Last-Modified')
+
+
+def build_search_params(mode, user_stop_id, t_date, t_time, buffer=0):
+    """
+    Baut die EFA-Parameter einer Verbindungssuche für alle Campus-Haltestellen.
+
+    Enthält die Zeitlogik von `/api/connections` (Zeit-Offset, Puffer, Richtungswahl,
+    Rasterung) und wird von der Einzel- und der Batch-Suche gemeinsam genutzt.
+
+    Args:
+        mode (str): 'to_uni' oder 'from_uni'.
+        user_stop_id (str): Die globale VVS-ID der Benutzer-Haltestelle.
+        t_date (str): Datum im Format YYYYMMDD.
+        t_time (str): Uhrzeit im Format HHMM.
+        buffer (int|str): Benutzer-Puffer in Minuten (ungültige Werte zählen als 0).
+
+    Returns:
+        list[dict]: Ein Parameter-Dictionary pro Eintrag in `UNI_STOPS`.
+
+    Raises:
+        ValueError: Bei ungültigem Zeitformat.
+    """
+    try:
+        total_buffer_minutes = int(buffer) + 10
+    except (ValueError, TypeError):
+        total_buffer_minutes = 10
+
+    try:
+        base_time = datetime.strptime(t_time, "%H%M")
+    except TypeError:
+        raise ValueError("Ungültiges Zeitformat")
+    # "Quick and Dirty" Fix: 60 Minuten korrigieren
+    corrected_time = base_time + timedelta(hours=1)
+
+    all_params = []
+    for uni in UNI_STOPS:
+        if mode == 'to_uni':
+            search_dt = corrected_time - timedelta(minutes=total_buffer_minutes)
+            origin, dest, t_type = user_stop_id, uni["id"], "arr"
+        else:
+            search_dt = corrected_time + timedelta(minutes=total_buffer_minutes)
+            origin, dest, t_type = uni["id"], user_stop_id, "dep"
+
+        search_time = snap_search_time(search_dt, t_type)
+        all_params.append({
+            **STATIC_EFA_PARAMS, 
+            "name_origin": origin, 
+            "name_destination": dest, 
+            "itdDate": t_date, 
+            "itdTime": search_time,
+            "itdTripDateTimeDepArr": t_type,
+            "calcNumberOfTrips": 4
+        })
+    return all_params
+
+
+def run_trip_queries(all_params, loader=routed_trips, deadline=None):
+    """
+    Führt mehrere Trip-Anfragen parallel über den gemeinsamen EFA-Thread-Pool aus.
+
+    Alle Anfragen teilen sich eine Gesamt-Deadline (`EFA_DEADLINE`). Fehlgeschlagene
+    oder zu langsame Anfragen werden protokolliert und als None zurückgegeben.
+
+    Args:
+        all_params (list[dict]): Parameter der einzelnen Trip-Anfragen.
+        loader (callable): Lädt eine Anfrage `(params, timeout)`, Standard: `routed_trips`.
+        deadline (float, optional): Absolute Deadline (`time.monotonic()`), z. B. die
+            einer mehrrundigen Suche; Standard: jetzt plus `EFA_DEADLINE`.
+
+    Returns:
+        list[list[dict] | None]: Die geparsten Verbindungen je Anfrage (gleiche Reihenfolge).
+    """
+    outcomes = [None] * len(all_params)
+    for index, outcome in iter_trip_queries(all_params, loader, deadline):
+        outcomes[index] = outcome
+    return outcomes
+
+
+def iter_trip_queries(all_params, loader=routed_trips, deadline=None):
+    """
+    Wie `run_trip_queries`, liefert die Ergebnisse aber in der Reihenfolge ihres Eintreffens.
+
+    Args:
+        all_params (list[dict]): Parameter der einzelnen Trip-Anfragen.
+        loader (callable): Lädt eine Anfrage `(params, timeout)`, Standard: `routed_trips`.
+        deadline (float, optional): Absolute Deadline (`time.monotonic()`), siehe `run_trip_queries`.
+
+    Yields:
+        tuple: `(index, outcome)` mit dem Index in `all_params` und den geparsten
+            Verbindungen bzw. None bei Fehler oder überschrittener Deadline.
+    """
+    remaining = (deadline or time.monotonic() + EFA_DEADLINE) - time.monotonic()
+    if remaining <= 0:
+        for index in range(len(all_params)):
+            print("Fehler VVS: Deadline überschritten")
+            yield index, None
+        return
+    timeout = min(EFA_TIMEOUT, remaining)
+    futures = {efa_executor.submit(tracing.bind(loader), p, timeout): i for i, p in enumerate(all_params)}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=remaining):
+            pending.discard(future)
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                print(f"Fehler VVS: {e}")
+                yield futures[future], None
+    except FuturesTimeout:
+        for future in pending:
+            future.cancel()
+            print("Fehler VVS: Deadline überschritten")
+            yield futures[future], None
+    finally:
+        # Abbruch durch den Aufrufer (z. B. Client trennt den Stream): Wartendes verwerfen
+        for future in futures:
+            future.cancel()
+
+
+def window_trips(params):
+    """Der Anfang der Antwort einer Trip-Anfrage aus `trip_windows` (None ohne Überdeckung)."""
+    journeys = trip_windows.lookup(params, partial=True)
+    if journeys is not None:
+        metrics.TRIP_QUERIES.labels('window').inc()
+    return journeys
+
+
+def new_search(all_params):
+    """Legt die Suchplanung für die Parameter aus `build_search_params` an."""
+    return ConnectionSearch(all_params, EFA_TIMEZONE, limit=SEARCH_RESULTS, max_rounds=SEARCH_MAX_ROUNDS,
+                            max_trips=SEARCH_MAX_TRIPS, resolve=window_trips)
+
+
+def search_journeys(search):
+    """Die 5 besten Verbindungen einer abgeschlossenen Suche (erfasst die Kandidatenzahl)."""
+    metrics.JOURNEYS_BEFORE_TRUNCATION.observe(sum(len(o) for o in search.outcomes() if o))
+    with tracing.span('rank'):
+        return search.journeys()
+
+
+def plan_round(searches):
+    """
+    Sammelt die Anfragen der nächsten Runde mehrerer Suchen; identische Anfragen nur einmal.
+
+    Args:
+        searches (list[ConnectionSearch | None]): Die Suchen (None wird übersprungen).
+
+    Returns:
+        tuple: `(unique_params, routes)`. `routes` enthält je angefragter Haltestelle
+            `(Suche, Haltestellen-Index, Index in unique_params)`; leer, wenn alle Suchen
+            abgeschlossen sind.
+    """
+    unique_params, slots, routes = [], {}, []
+    for search in searches:
+        if search is None:
+            continue
+        for stop, params in search.next_queries():
+            key = trip_cache_key(params)
+            if key not in slots:
+                slots[key] = len(unique_params)
+                unique_params.append(params)
+            routes.append((search, stop, slots[key]))
+    return unique_params, routes
+
+
+def run_searches(searches, loader=routed_trips):
+    """
+    Führt Suchen rundenweise aus, bis jede bewiesen vollständig ist oder keine Runden mehr hat.
+
+    Jede Runde läuft parallel über den EFA-Thread-Pool (siehe `run_trip_queries`). Alle
+    Runden teilen sich eine Gesamt-Deadline (`EFA_DEADLINE`); ist sie verbraucht, wird
+    keine weitere Runde geplant und das bisherige Ergebnis gilt.
+
+    Returns:
+        list[ConnectionSearch | None]: Die übergebenen Suchen.
+    """
+    deadline = time.monotonic() + EFA_DEADLINE
+    while time.monotonic() < deadline:
+        unique_params, routes = plan_round(searches)
+        if not unique_params:
+            break
+        outcomes = run_trip_queries(unique_params, loader, deadline)
+        for search, stop, slot in routes:
+            search.add(stop, outcomes[slot])
+    return searches
+
+
+# Header für Server-Sent Events (kein Caching, kein Puffern durch Reverse-Proxies)
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def sse_event(event, data):
+    """Formatiert ein Server-Sent Event mit JSON-Daten (Serialisierung wie `jsonify`)."""
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+
+def stream_partial(index, outcome):
+    """Daten des 'partial'-Events von `/api/connections/stream` für die Campus-Haltestelle `index`."""
+    event = {"stop": UNI_STOPS[index]["name"], "stop_id": UNI_STOPS[index]["id"], "journeys": outcome or []}
+    if outcome is None:
+        event["error"] = "VVS nicht erreichbar"
+    return event
+
+
+def stream_done(search):
+    """Daten des abschließenden 'done'-Events: die 5 besten Verbindungen (wie `get_connections`)."""
+    if all(o is None for o in search.outcomes()):
+        error = "VVS derzeit nicht erreichbar" if vvs_client.breaker.is_open() else "VVS nicht erreichbar"
+        return {"error": error, "journeys": []}
+    return {"journeys": search_journeys(search)}
+
+
+def plan_batch(items):
+    """
+    Legt für jedes Batch-Element die Suchplanung an.
+
+    Identische EFA-Anfragen verschiedener Elemente werden später je Runde nur einmal
+    gestellt (siehe `plan_round`).
+
+    Args:
+        items (list): Elemente von `/api/connections/batch`.
+
+    Returns:
+        list[ConnectionSearch | None]: Eine Suche je Element, None bei ungültigem Element.
+    """
+    searches = []
+    for item in items:
+        try:
+            if not isinstance(item, dict):
+                raise ValueError
+            searches.append(new_search(build_search_params(item.get('mode'), item.get('userStopId'),
+                                                           item.get('date'), item.get('time'),
+                                                           item.get('buffer', 0))))
+        except ValueError:
+            searches.append(None)
+    return searches
+
+
+def assemble_batch(searches):
+    """
+    Baut die Ergebnisse der Batch-Elemente aus ihren abgeschlossenen Suchen.
+
+    Returns:
+        list[dict]: Pro Element entweder {'journeys': [...]} oder {'error': ...}.
+    """
+    results = []
+    for search in searches:
+        if search is None:
+            results.append({"error": "Ungültiges Zeitformat"})
+        elif all(o is None for o in search.outcomes()):
+            results.append({"error": "VVS nicht erreichbar", "journeys": []})
+        else:
+            results.append({"journeys": search_journeys(search)})
+    return results
+
+
+def run_batch(items):
+    """Führt die Suchen eines Batches aus (Deduplizierung, paralleler Abruf, Ranking)."""
+    return assemble_batch(run_searches(plan_batch(items)))
+
+
+def minutes_between(start, end):
+    """
+    Differenz zweier Uhrzeiten (HH:MM) in Minuten, auch über Mitternacht hinweg.
+
+    Beispiele:
+        >>> minutes_between("08:58", "09:03")
+        5
+        >>> minutes_between("23:59", "00:01")
+        2
+        >>> minutes_between("--:--", "09:03") is None
+        True
+    """
+    try:
+        delta = datetime.strptime(end, "%H:%M") - datetime.strptime(start, "%H:%M")
+    except (TypeError, ValueError):
+        return None
+    return (int(delta.total_seconds()) // 60 + 720) % 1440 - 720
+
+
+def favorite_sections(favorite):
+    """Abschnitte eines Favoriten (JSONB oder Altbestand als JSON-Text), None wenn unbrauchbar."""
+    sections = favorite.get('sections_json')
+    if isinstance(sections, str):
+        try:
+            sections = json.loads(sections)
+        except ValueError:
+            return None
+    if not isinstance(sections, list) or not sections or not all(isinstance(s, dict) for s in sections):
+        return None
+    return sections
+
+
+def journey_signature(sections, time_key):
+    """
+    Linien-Signatur einer Verbindung für den Abgleich mit Echtzeitdaten.
+
+    Fußwege zählen nicht (sie ändern sich mit der Echtzeitlage), außer die Verbindung
+    besteht nur aus Fußwegen.
+
+    Returns:
+        tuple: `(signatur, abfahrt)` mit der Signatur als Tupel aus (Linie, Start, Ziel)
+            und der Abfahrt (Feld `time_key`) des ersten Abschnitts der Signatur.
+    """
+    transit = [s for s in sections if s.get('line') != 'Fußweg'] or sections
+    return tuple((s.get('line'), s.get('from'), s.get('to')) for s in transit), transit[0].get(time_key)
+
+
+def plan_realtime(favorites, t_date):
+    """
+    Plant die Trip-Anfragen für den Echtzeit-Abgleich mehrerer Favoriten.
+
+    Favoriten mit gleichem Start und Ziel (erster bzw. letzter Abschnitt) teilen sich eine
+    Abfahrtssuche, solange ihre Abfahrten innerhalb von `FAVORITES_REALTIME_WINDOW`
+    Minuten liegen. Die Suchzeit nutzt denselben Zeit-Offset wie `build_search_params`.
+
+    Args:
+        favorites (list[dict]): Zeilen aus `SQL_FAV_REALTIME`.
+        t_date (str): Datum im Format YYYYMMDD.
+
+    Returns:
+        tuple: `(unique_params, fav_slots)`. `fav_slots[i]` ist der Index in
+            `unique_params` für Favorit i oder None bei unbrauchbaren Abschnitten.
+    """
+    groups = {}
+    for i, favorite in enumerate(favorites):
+        sections = favorite_sections(favorite)
+        try:
+            dep = datetime.strptime(sections[0]['departure'], "%H:%M")
+        except (TypeError, KeyError, ValueError):
+            continue
+        groups.setdefault((sections[0].get('from'), sections[-1].get('to')), []).append((dep, i))
+
+    unique_params, fav_slots = [], [None] * len(favorites)
+    stop_mapping = stop_store.catalog.mapping
+    for (origin, dest), entries in groups.items():
+        window_start = None
+        for dep, i in sorted(entries):
+            if window_start is None or dep - window_start > timedelta(minutes=FAVORITES_REALTIME_WINDOW):
+                window_start = dep
+                # "Quick and Dirty" Fix wie in `build_search_params`, Suchzeit abgerundet
+                search_dt = dep + timedelta(hours=1) - timedelta(minutes=REALTIME_LOOKBACK)
+                unique_params.append({
+                    **STATIC_EFA_PARAMS,
+                    "name_origin": stop_mapping.get(origin, origin),
+                    "name_destination": stop_mapping.get(dest, dest),
+                    "itdDate": t_date,
+                    "itdTime": snap_search_time(search_dt, 'arr'),
+                    "itdTripDateTimeDepArr": "dep",
+                    "calcNumberOfTrips": FAVORITES_REALTIME_TRIPS
+                })
+            fav_slots[i] = len(unique_params) - 1
+    return unique_params, fav_slots
+
+
+def match_favorite(sections, journeys):
+    """
+    Sucht die aktuelle Fahrt zu einem Favoriten (gleiche Linien und Haltestellen).
+
+    Bei mehreren Kandidaten gewinnt die Fahrt, deren Plan-Abfahrt der gespeicherten
+    Abfahrt am nächsten liegt (höchstens `REALTIME_MATCH_TOLERANCE` Minuten).
+
+    Returns:
+        list[dict] | None: Die Teilstrecken aus `parse_vvs_realtime` oder None.
+    """
+    signature, reference = journey_signature(sections, 'departure')
+    best, best_gap = None, REALTIME_MATCH_TOLERANCE + 1
+    for legs in journeys:
+        candidate, planned = journey_signature(legs, 'planned_departure')
+        gap = minutes_between(reference, planned)
+        if candidate == signature and gap is not None and abs(gap) < best_gap:
+            best, best_gap = legs, abs(gap)
+    return best
+
+
+def assemble_realtime(favorites, fav_slots, outcomes):
+    """
+    Ordnet die Echtzeitdaten den Favoriten zu und berechnet die Verspätungen.
+
+    Returns:
+        list[dict]: Pro Favorit 'id', 'saved_dep', 'saved_arr' und 'status':
+            'ok' (zusätzlich 'planned_dep', 'dep', 'planned_arr', 'arr', 'delay_dep',
+            'delay_arr', 'realtime' und 'sections' mit Verspätung je Abschnitt),
+            'not_found' (Fahrt heute nicht gefunden), 'unavailable' (VVS-Anfrage
+            fehlgeschlagen) oder 'invalid' (unbrauchbare Abschnitte).
+    """
+    results = []
+    for favorite, slot in zip(favorites, fav_slots):
+        entry = {"id": favorite['id'], "saved_dep": favorite['dep_time'], "saved_arr": favorite['arr_time']}
+        legs = None
+        if slot is None:
+            entry["status"] = "invalid"
+        elif outcomes[slot] is None:
+            entry["status"] = "unavailable"
+        else:
+            legs = match_favorite(favorite_sections(favorite), outcomes[slot])
+            entry["status"] = "ok" if legs else "not_found"
+        if legs:
+            entry.update({
+                "planned_dep": legs[0]['planned_departure'],
+                "dep": legs[0]['departure'],
+                "planned_arr": legs[-1]['planned_arrival'],
+                "arr": legs[-1]['arrival'],
+                "delay_dep": minutes_between(legs[0]['planned_departure'], legs[0]['departure']),
+                "delay_arr": minutes_between(legs[-1]['planned_arrival'], legs[-1]['arrival']),
+                "realtime": any(leg['realtime'] for leg in legs),
+                "sections": [{**leg,
+                              "delay_departure": minutes_between(leg['planned_departure'], leg['departure']),
+                              "delay_arrival": minutes_between(leg['planned_arrival'], leg['arrival'])}
+                             for leg in legs]
+            })
+        results.append(entry)
+    return results
+
+
+# --- VORLESUNGEN ---
+# Abgleich der Rapla-Termine aller Kurse in die Tabelle `lectures`
+lecture_sync = LectureSync(get_db_connection, fetch_timetable,
+                           interval=float(os.getenv('LECTURE_SYNC_INTERVAL', '900')))
+
+
+def timetable_range(date_from, date_to):
+    """
+    Wandelt die Query-Parameter 'from'/'to' (YYYYMMDD, beide inklusive) in die Grenzen
+    `[start, end)` in `EFA_TIMEZONE` um.
+
+    Raises:
+        ValueError: Bei ungültigem Datum.
+
+    Beispiele:
+        >>> start, end = timetable_range('20251201', '20251205')
+        >>> start.isoformat(), end.isoformat()
+        ('2025-12-01T00:00:00+01:00', '2025-12-06T00:00:00+01:00')
+        >>> timetable_range(None, None)
+        (None, None)
+    """
+    start = datetime.strptime(date_from, "%Y%m%d").replace(tzinfo=EFA_TIMEZONE) if date_from else None
+    end = ((datetime.strptime(date_to, "%Y%m%d") + timedelta(days=1)).replace(tzinfo=EFA_TIMEZONE)
+           if date_to else None)
+    return start, end
+
+
+def lecture_events(course, start=None, end=None):
+    """
+    Vorlesungen eines Kurses im Zeitraum `[start, end)` aus der Tabelle `lectures`.
+
+    Ein noch nie abgeglichener Kurs wird sofort abgeglichen, ein veralteter (älter als
+    `LECTURE_SYNC_INTERVAL`) im Hintergrund; bis dahin wird der gespeicherte Stand geliefert.
+    Kurse, die in keinem Profil stehen, werden weder abgeglichen noch gespeichert.
+
+    Returns:
+        tuple: `(events, status)` mit status 'DB' (bzw. 'SYNC' nach einem sofortigen Abgleich)
+            oder None, wenn der Kurs in keinem Profil steht (Stundenplan-Cache verwenden).
+
+    Raises:
+        psycopg2.Error, PoolTimeout: Datenbank nicht verfügbar (Aufrufer weicht auf den
+            Stundenplan-Cache aus).
+        Exception: Fehler der dhbw.app beim ersten Abgleich eines Kurses.
+    """
+    with metrics.db_timer('lectures_range'):
+        events, synced_at = lecture_sync.lookup(course, start, end)
+    if events is None:
+        return None
+    if synced_at is not None:
+        if lecture_sync.is_stale(synced_at):
+            lecture_sync.schedule(course)
+        return events, 'DB'
+    with tracing.span('sync', course):
+        lecture_sync.sync(course)
+    with metrics.db_timer('lectures_range'):
+        events, _ = lecture_sync.lookup(course, start, end)
+    return events, 'SYNC'
+
+
+def timetable_events(course, start=None, end=None):
+    """
+    Vorlesungen eines Kurses im Zeitraum `[start, end)` (für `/api/timetable` und die
+    Vorberechnung): aus der Tabelle `lectures`, ohne Datenbank über den Stundenplan-Cache.
+
+    Returns:
+        tuple: `(events, status)`, status wie `X-Cache` (DB/SYNC bzw. HIT/STALE/MISS).
+    """
+    if lecture_sync.interval > 0:
+        try:
+            result = lecture_events(course, start, end)
+            if result is not None:
+                return result
+        except (psycopg2.Error, PoolTimeout) as e:
+            print(f"Fehler Vorlesungen aus DB ({course}): {e}")
+    events, status = timetable_cache.get(course, lambda entry: fetch_timetable(course, entry))
+    return in_range(events, start, end), status
+
+
+# --- VORBERECHNUNG ---
+def commute_events(course):
+    """Alle Vorlesungen eines Kurses (für die Vorberechnung)."""
+    return timetable_events(course)[0]
+
+
+commute_scheduler = CommuteScheduler(get_db_connection, commute_events, run_batch, EFA_TIMEZONE,
+                                     interval=float(os.getenv('PRECOMPUTE_INTERVAL', '1800')),
+                                     days=int(os.getenv('PRECOMPUTE_DAYS', '3')),
+                                     course_daily_limit=int(os.getenv('PRECOMPUTE_COURSE_DAILY_LIMIT', '200')),
+                                     max_age=float(os.getenv('PRECOMPUTE_MAX_AGE', '10800')),
+                                     chunk_size=BATCH_MAX_ITEMS,
+                                     lock_connection=get_dedicated_db_connection)
+
+
+# --- HINTERGRUNDJOBS ---
+# Nicht beim Import starten: Migrationen, Benchmarks und der Uvicorn-Hauptprozess importieren
+# das Modul ebenfalls. Bei mehreren Workern laufen die Jobs nur in einem Prozess (Dateisperre),
+# sonst würde sich u. a. das Tagesbudget der Vorberechnung mit der Anzahl der Worker vervielfachen.
+JOBS_LOCK_FILE = os.getenv('JOBS_LOCK_FILE') or os.path.join(tempfile.gettempdir(), 'vvs-jobs.lock')
+JOBS_LOCK_RETRY = 60
+_jobs_lock = None
+
+
+def _acquire_jobs_lock():
+    """Versucht die prozessübergreifende Sperre der Hintergrundjobs zu erhalten (nicht blockierend)."""
+    global _jobs_lock
+    if fcntl is None:
+        return True
+    lock = open(JOBS_LOCK_FILE, 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    # Offen halten: die Sperre gilt, solange der Prozess lebt
+    _jobs_lock = lock
+    return True
+
+
+def _start_jobs():
+    if lecture_sync.interval > 0:
+        lecture_sync.start()
+    if commute_scheduler.interval > 0:
+        commute_scheduler.start()
+
+
+def _await_jobs_lock():
+    # Übernimmt die Jobs, sobald der bisherige Prozess (z. B. ein neu gestarteter Worker) endet
+    while not _acquire_jobs_lock():
+        time.sleep(JOBS_LOCK_RETRY)
+    _start_jobs()
+
+
+def start_background_jobs():
+    """
+    Startet Vorlesungsabgleich und Vorberechnung in höchstens einem Prozess je Rechner.
+
+    Aufgerufen im Flask-Entwicklungsserver (`__main__`) und im Lifespan von `asgi_app`.
+    Hält bereits ein anderer Worker die Sperre (`JOBS_LOCK_FILE`), wartet ein Thread
+    darauf und übernimmt die Jobs, sobald dieser Worker endet.
+
+    Returns:
+        bool: True, wenn die Jobs in diesem Prozess gestartet wurden.
+    """
+    if lecture_sync.interval <= 0 and commute_scheduler.interval <= 0:
+        return False
+    if _acquire_jobs_lock():
+        _start_jobs()
+        return True
+    threading.Thread(target=_await_jobs_lock, name='jobs-lock', daemon=True).start()
+    return False
+
+
+# --- ABFAHRTSTAFELN ---
+# Ein Poll je Haltestelle und Intervall, geteilt von allen Betrachtern
+departure_hub = DepartureHub(fetch_departures,
+                             interval=float(os.getenv('DEPARTURES_INTERVAL', '30')),
+                             idle_ttl=float(os.getenv('DEPARTURES_IDLE_TTL', '120')),
+                             max_boards=int(os.getenv('DEPARTURES_MAX_BOARDS', '500')))
+
+
+# --- HILFSFUNKTIONEN ---
+def departure_stop_name(stop_id):
+    """Anzeigename einer Haltestelle für die Abfahrtstafel oder None, wenn die ID unbekannt ist."""
+    for uni in UNI_STOPS:
+        if uni["id"] == stop_id:
+            return uni["name"]
+    return stop_store.catalog.names.get(stop_id)
+
+
+def departures_sse(payload):
+    """SSE-Event einer Abfahrtstafel (Event-ID = Version, für `Last-Event-ID` beim Reconnect)."""
+    return f"id: {payload['version']}\n" + sse_event(payload['type'], payload)
+
+
+def favorites_page_params(args):
+    """
+    Liest die Pagination-Parameter der Favoritenliste.
+
+    Args:
+        args (Mapping): Query-Parameter ('limit', 'cursor', 'summary').
+
+    Returns:
+        tuple: `(limit, after, summary)` mit `after` = (created_at, id) oder None.
+
+    Raises:
+        ValueError: Bei ungültigem Limit oder Cursor.
+    """
+    limit = int(args.get('limit', FAVORITES_PAGE_SIZE))
+    if not 1 <= limit <= FAVORITES_MAX_PAGE_SIZE:
+        raise ValueError("limit")
+    after = None
+    if args.get('cursor'):
+        try:
+            created_at, fav_id = base64.urlsafe_b64decode(args['cursor'].encode()).decode().split('|')
+            after = (datetime.fromisoformat(created_at), int(fav_id))
+        except (UnicodeDecodeError, ValueError, TypeError) as e:
+            raise ValueError("cursor") from e
+    return limit, after, args.get('summary') in ('1', 'true')
+
+
+def favorites_page_query(username, limit, after, summary):
+    """Liefert `(sql, params)` für eine Seite der Favoritenliste (ein Datensatz mehr als `limit`)."""
+    params = (username, *after, limit + 1) if after else (username, limit + 1)
+    return SQL_FAV_PAGE[(summary, after is not None)], params
 
-        first_dep = sections[0]['departure']
-        last_arr = sections[-1]['arrival']
-        duration_minutes = 0
-        try:
-            t1 = datetime.strptime(first_dep, "%H:%M")
-            t2 = datetime.strptime(last_arr, "%H:%M")
-            delta = t2 - t1
-            seconds = delta.total_seconds()
-            if seconds < 0:
-                seconds += 86400 
-            duration_minutes = int(seconds / 60)
-        except Exception:
-            duration_minutes = journey.get('duration', 0) // 60
-
-        processed.append({
-            "dep": first_dep,
-            "arr": last_arr,
-            "duration": duration_minutes,
-            "interchanges": journey.get('interchanges', 0),
-            "sections": sections
-        })
-    return processed
+
+def favorites_cursor(row):
+    """Opaker Cursor auf den letzten Eintrag einer Seite (`created_at|id`, base64url)."""
+    return base64.urlsafe_b64encode(f"{row['created_at'].isoformat()}|{row['id']}".encode()).decode()
 
 
-# --- HILFSFUNKTIONEN ---
 def get_username_from_token(token):
-    if not token: return None
-    try:
-        token_clean = token.split(" ")[1] if " " in token else token
-        payload_b64 = token_clean.split('.')[1]
-        payload_b64 += '=' * (-len(payload_b64) % 4)
-        return json.loads(base64.b64decode(payload_b64).decode('utf-8')).get('sub')
-    except: return None
+    """Benutzername (`sub`) eines lokal geprüften Tokens oder None (siehe `auth.TokenVerifier`)."""
+    return token_verifier.username(token)
 
 
+def verify_token_response(token):
+    """Antwort von `/api/auth/verify` als `(body, status)` (gemeinsam für Flask und ASGI)."""
+    try:
+        claims = token_verifier.verify(token)
+    except TokenError as e:
+        return {"valid": False, "error": str(e)}, 401
+    if token_verifier.mode == 'unverified':
+        # Ohne Schlüsselmaterial ist nur die Payload gelesen: nie als gültig melden
+        return {"valid": False, "error": "Signatur kann nicht geprüft werden"}, 503
+    return {"valid": True, "username": claims.get('sub'), "exp": claims.get('exp')}, 200
+
 
 # --- API ROUTEN ---
 # - VVS -
@@ -276,9 +1602,12 @@ def get_stops():
     """
     Gibt eine Liste aller verfügbaren Haltestellen für das Frontend zurück.
 
-    Dieser Endpunkt transformiert das interne `stop_mapping` Dictionary in ein 
-    JSON-Array, das direkt für Autocomplete-Felder oder Auswahllisten im 
-    Frontend (z. B. in der `suggestBox`) verwendet werden kann.
+    Dieser Endpunkt liefert die Zuordnung Anzeigename -> ID als JSON-Array, 
+    das direkt für Autocomplete-Felder oder Auswahllisten im Frontend 
+    (z. B. in der `suggestBox`) verwendet werden kann. Die Liste wird je Stand des
+    Haltestellen-Katalogs einmal serialisiert und mit ETag ausgeliefert, sodass wiederholte
+    Abrufe mit `If-None-Match` nur noch ein 304 erhalten (nach einem Neuladen der CSV
+    ändert sich der ETag).
 
     Returns:
         Response: Ein JSON-Objekt (Liste von Dictionaries) mit:
@@ -291,10 +1620,59 @@ def get_stops():
             {"name": "Linden-Museum", "id": "de:08111:25"}
         ]
 
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+        304: Liste unverändert (ETag stimmt mit `If-None-Match` überein).
+    """
+    catalog = stop_store.catalog
+    response = Response(catalog.json, mimetype='application/json')
+    response.set_etag(catalog.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/stops/search')
+def search_stops():
+    """
+    Durchsucht die Haltestellen serverseitig und liefert die besten Treffer.
+
+    Nutzt den Suchindex des aktuellen Haltestellen-Katalogs (Präfix-, Wort- und Fuzzy-Suche,
+    unabhängig von Umlauten und ß, inklusive Zusatz/Teilort).
+
+    Query-Parameter:
+        q (str): Suchtext (z. B. 'rosenb' oder 'ortsmitte otl').
+        limit (int, optional): Maximale Anzahl an Treffern (Standard: 10, maximal 50).
+
+    Returns:
+        Response: JSON-Array mit Objekten {'name', 'id'}, bester Treffer zuerst.
+
+    Example Response (JSON):
+        [
+            {"name": "Rosenberg-/Seidenstraße", "id": "de:08111:6072"}
+        ]
+
+    Status Codes:
+        200: Erfolgreiche Suche (auch bei leeren Ergebnissen).
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 0), STOP_SEARCH_MAX_LIMIT)
+    except ValueError:
+        limit = 10
+    return jsonify(stop_store.catalog.index.search(request.args.get('q', ''), limit))
+
+@app.route('/api/stops/stats')
+def get_stop_stats():
+    """
+    Gibt die Kennzahlen des Haltestellen-Snapshots zurück.
+
+    Returns:
+        Response: JSON-Objekt mit 'stops', 'rows', 'columns', 'strings', 'bytes',
+            'mmap' (per mmap eingeblendet), 'source' (SHA-1 der CSV), 'loads', 'errors',
+            'loaded_at', 'load_duration' und 'interval'.
+
     Status Codes:
         200: Erfolgreiche Abfrage.
     """
-    return jsonify([{"name": n, "id": i} for n, i in stop_mapping.items()])
+    return jsonify(stop_store.stats())
 
 @app.route('/api/connections')
 def get_connections():
@@ -320,7 +1698,16 @@ def get_connections():
         3. Richtungswahl:
             - 'to_uni': Sucht Verbindungen, die VOR (Ankunftszeit minus Puffer) ankommen.
             - 'from_uni': Sucht Verbindungen, die NACH (Abfahrtszeit plus Puffer) starten.
-        4. Aggregation: Fragt Daten für alle Campus-Haltestellen (UNI_STOPS) ab.
+        4. Rasterung: Die Suchzeit wird auf `EFA_TIME_BUCKET` Minuten gerastert
+           (Ankunft abgerundet, Abfahrt aufgerundet).
+        5. Aggregation: Fragt Daten für alle Campus-Haltestellen (UNI_STOPS) parallel ab
+           (gemeinsamer Thread-Pool, Gesamt-Deadline `EFA_DEADLINE` über alle Runden). Weitere
+           Fahrten werden nur nachgeladen, solange nicht bewiesen ist, dass sie das
+           Ergebnis nicht mehr ändern (`planner.ConnectionSearch`). Ergebnisse werden für
+           `EFA_CACHE_TTL` Sekunden gecacht, überdeckte Anfragen aus geladenen
+           Zeitfenstern beantwortet.
+        6. Offline-Routing: Je nach `ROUTING_MODE` beantwortet der GTFS-Fahrplan die
+           Anfragen direkt oder bei fehlgeschlagenen EFA-Anfragen (nur Planzeiten).
 
     Returns:
         Response: JSON-Objekt mit einer Liste der 5 besten Verbindungen unter dem Key 'journeys'.
@@ -328,59 +1715,191 @@ def get_connections():
     Status Codes:
         200: Erfolgreiche Suche (auch bei leeren Ergebnissen).
         400: Ungültiges Zeitformat übergeben.
+        503: VVS-Schnittstelle nach wiederholten Fehlern gesperrt (Circuit-Breaker offen)
+             und kein GTFS-Fallback.
     """
-    mode = request.args.get('mode')
-    user_stop_id = request.args.get('userStopId')
-    t_date = request.args.get('date') 
-    t_time = request.args.get('time')
-
     try:
-        user_buffer = int(request.args.get('buffer', 0))
-        total_buffer_minutes = user_buffer + 10 
-    except (ValueError, TypeError):
-        total_buffer_minutes = 10
+        with tracing.span('params'):
+            all_params = build_search_params(request.args.get('mode'), request.args.get('userStopId'),
+                                             request.args.get('date'), request.args.get('time'),
+                                             request.args.get('buffer', 0))
+    except ValueError:
+        return jsonify({"error": "Ungültiges Zeitformat"}), 400
 
-    results = []
+    search = new_search(all_params)
+    run_searches([search])
+    if all(o is None for o in search.outcomes()) and vvs_client.breaker.is_open():
+        return jsonify({"error": "VVS derzeit nicht erreichbar", "journeys": []}), 503
+    return jsonify({"journeys": search_journeys(search)})
+
+@app.route('/api/connections/batch', methods=['POST'])
+def get_connections_batch():
+    """
+    Führt mehrere Verbindungssuchen (z. B. für eine ganze Stundenplan-Woche) in einem Request aus.
+
+    Jedes Element entspricht den Query-Parametern von `/api/connections`. Identische
+    EFA-Anfragen aller Elemente werden nur einmal gestellt und gemeinsam über den
+    begrenzten EFA-Thread-Pool ausgeführt. Suche und Ranking sind identisch zu
+    `get_connections` (gemeinsame Hilfsfunktionen).
+
+    Datenstruktur (JSON POST-Body):
+        - items (list): Liste von Objekten mit 'mode', 'userStopId', 'date', 'time'
+          und optional 'buffer' (maximal `BATCH_MAX_ITEMS` Elemente).
+
+    Returns:
+        Response: JSON-Objekt mit dem Key 'results', einer Liste in Reihenfolge der 'items'.
+            Jedes Ergebnis enthält entweder 'journeys' (die 5 besten Verbindungen) oder
+            'error' (z. B. bei ungültigem Zeitformat), ohne den restlichen Batch zu beeinflussen.
+
+    Example Request (JSON):
+        {"items": [
+            {"mode": "to_uni", "userStopId": "de:08111:6008", "date": "20251201", "time": "0800", "buffer": 10},
+            {"mode": "from_uni", "userStopId": "de:08111:6008", "date": "20251201", "time": "1530"}
+        ]}
+
+    Status Codes:
+        200: Batch verarbeitet (einzelne Elemente können Fehler enthalten).
+        400: Body ist keine Liste von Elementen oder enthält zu viele Elemente.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return jsonify({"error": "Feld 'items' (Liste) fehlt"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Maximal {BATCH_MAX_ITEMS} Elemente pro Batch"}), 400
+
+    return jsonify({"results": run_batch(items)})
+
+@app.route('/api/connections/stream')
+def stream_connections():
+    """
+    Streamt die Ergebnisse einer Verbindungssuche per Server-Sent Events.
+
+    Parameter, Zeitlogik und Ranking sind identisch zu `get_connections`. Statt auf alle
+    Campus-Haltestellen zu warten, wird jede Teilsuche gesendet, sobald ihre EFA-Anfrage
+    beantwortet ist. Die erste Antwort kommt damit nach der Latenz der schnellsten
+    statt der langsamsten Anfrage.
+
+    Query-Parameter:
+        Wie `/api/connections` (mode, userStopId, date, time, buffer).
+
+    Events (text/event-stream, Daten als JSON):
+        partial: Pro EFA-Anfrage {'stop', 'stop_id', 'journeys'} (ungerankt), bei Fehlern
+            zusätzlich 'error'. Lädt der Planer bei einer Haltestelle Fahrten nach, folgt
+            für sie ein weiteres 'partial' mit den zusätzlichen Verbindungen.
+        done: Abschließend {'journeys'} mit den 5 besten Verbindungen bzw. {'error',
+            'journeys': []}, wenn keine Anfrage erfolgreich war.
+
+    Example Stream:
+        event: partial
+        data: {"journeys": [...], "stop": "Linden-Museum", "stop_id": "de:08111:2196"}
+
+        event: done
+        data: {"journeys": [...]}
+
+    Status Codes:
+        200: Stream gestartet (Fehler einzelner Anfragen stehen in den Events).
+        400: Ungültiges Zeitformat übergeben.
+    """
     try:
-        base_time = datetime.strptime(t_time, "%H%M")
-        # "Quick and Dirty" Fix: 60 Minuten korrigieren
-        corrected_time = base_time + timedelta(hours=1)
+        with tracing.span('params'):
+            all_params = build_search_params(request.args.get('mode'), request.args.get('userStopId'),
+                                             request.args.get('date'), request.args.get('time'),
+                                             request.args.get('buffer', 0))
     except ValueError:
         return jsonify({"error": "Ungültiges Zeitformat"}), 400
+    search = new_search(all_params)
+
+    def generate():
+        deadline = time.monotonic() + EFA_DEADLINE
+        while time.monotonic() < deadline:
+            unique_params, routes = plan_round([search])
+            if not unique_params:
+                break
+            for slot, outcome in iter_trip_queries(unique_params, deadline=deadline):
+                for _, stop, route_slot in routes:
+                    if route_slot == slot:
+                        search.add(stop, outcome)
+                        yield sse_event('partial', stream_partial(stop, outcome))
+        yield sse_event('done', stream_done(search))
+
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@app.route('/api/connections/cache')
+def get_connection_cache_stats():
+    """
+    Gibt die Kennzahlen des EFA-Trip-Caches zurück (zur Feinjustierung der TTL).
 
-    for uni in UNI_STOPS:
-        if mode == 'to_uni':
-            search_dt = corrected_time - timedelta(minutes=total_buffer_minutes)
-            origin, dest, t_type = user_stop_id, uni["id"], "arr"
-        else:
-            search_dt = corrected_time + timedelta(minutes=total_buffer_minutes)
-            origin, dest, t_type = uni["id"], user_stop_id, "dep"
-            
-        search_time = search_dt.strftime("%H%M")
-        params = {
-            **STATIC_EFA_PARAMS, 
-            "name_origin": origin, 
-            "name_destination": dest, 
-            "itdDate": t_date, 
-            "itdTime": search_time,
-            "itdTripDateTimeDepArr": t_type,
-            "calcNumberOfTrips": 4
-        }
-        
-        try:
-            res = requests.get(BASE_URL, params=params, timeout=10)
-            data = res.json()
-            results.extend(parse_vvs_data(data))
-        except Exception as e:
-            print(f"Fehler VVS: {e}")
-            continue
-    
-    if mode == 'to_uni':
-        results.sort(key=lambda x: x['arr'], reverse=True)
-    else:
-        results.sort(key=lambda x: x['dep'])
-        
-    return jsonify({"journeys": results[:5]})
+    Returns:
+        Response: JSON-Objekt mit 'size', 'maxsize', 'ttl', 'hits', 'misses',
+            'coalesced' und 'hit_ratio' sowie unter 'windows' die Kennzahlen der
+            Zeitfenster ('relations', 'hits' = ohne Upstream-Aufruf beantwortet, 'misses').
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return jsonify({**efa_cache.stats(), "windows": trip_windows.stats()})
+
+@app.route('/api/routing')
+def get_routing_stats():
+    """
+    Gibt den Routing-Modus und die Kennzahlen des Offline-Routings zurück.
+
+    Returns:
+        Response: JSON-Objekt mit 'mode' (wirksamer `ROUTING_MODE`) und 'gtfs' (None ohne
+            geladenen Feed, sonst 'stations', 'patterns', 'trips', 'stop_times', 'services',
+            'bytes', 'queries' und 'mapped' = Haltestellen aus `haltestellen.csv` im Feed).
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    if gtfs_router is None:
+        return jsonify({"mode": "efa", "gtfs": None})
+    return jsonify({"mode": ROUTING_MODE, "gtfs": gtfs_router.stats(known_ids=stop_store.catalog.mapping.values())})
+
+# - Auth -
+@app.route('/api/auth/verify')
+def verify_token():
+    """
+    Prüft ein Token lokal (Signatur, Ablauf) und liefert den Benutzernamen.
+
+    Ersetzt für das Frontend den Aufruf von `/auth/verify` beim Auth-Dienst. Die Prüfung
+    erfolgt über `token_verifier` gegen das konfigurierte Secret bzw. die gecachten
+    Schlüssel; bereits geprüfte Tokens werden bis zu ihrem Ablauf aus dem Cache beantwortet.
+    Ohne Schlüsselmaterial kann die Signatur nicht geprüft werden: Dann wird kein Token als
+    gültig gemeldet und das Frontend fragt den Auth-Dienst.
+
+    Query-Parameter:
+        token (str): Das Token (alternativ im Header `Authorization`).
+
+    Returns:
+        Response: JSON-Objekt mit 'valid', 'username' und 'exp' bzw. 'valid' und 'error'.
+
+    Example Response (JSON):
+        {"valid": true, "username": "max", "exp": 1764601200}
+
+    Status Codes:
+        200: Token gültig.
+        401: Token fehlt, ist ungültig oder abgelaufen.
+        503: Signatur nicht prüfbar (weder JWT_SECRET noch JWT_PUBLIC_KEY/JWT_JWKS_URL gesetzt).
+    """
+    body, status = verify_token_response(request.args.get('token') or request.headers.get('Authorization'))
+    return jsonify(body), status
+
+@app.route('/api/auth/cache')
+def get_auth_cache_stats():
+    """
+    Gibt die Kennzahlen der lokalen Token-Prüfung zurück.
+
+    Returns:
+        Response: JSON-Objekt mit 'mode' ('hmac', 'public_key', 'jwks' oder 'unverified'),
+            'rejected' sowie 'size', 'maxsize', 'ttl', 'hits', 'misses', 'coalesced'
+            und 'hit_ratio' des Token-Caches.
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return jsonify(token_verifier.stats())
 
 # - User Preferences -
 @app.route('/api/user/profile', methods=['GET', 'POST'])
@@ -405,6 +1924,8 @@ def manage_profile():
     Datenbank-Logik:
         Nutzt die 'ON CONFLICT (username) DO UPDATE'-Syntax von PostgreSQL, um 
         Datenredundanz zu vermeiden und Profile effizient zu aktualisieren.
+        Nach dem Speichern werden die vorberechneten Pendelverbindungen des Nutzers
+        verworfen und neu eingeplant, der Kurs wird zum Vorlesungsabgleich vorgemerkt.
 
     Returns:
         GET: JSON-Objekt mit den Profildaten oder ein leeres Objekt.
@@ -418,30 +1939,78 @@ def manage_profile():
     username = get_username_from_token(token)
     if not username: return jsonify({"error": "Unauthorized"}), 401
     
-    db = get_db_connection()
     # RealDictCursor sorgt dafür, dass die Ergebnisse als Dictionary geliefert werden
-    cursor = db.cursor(cursor_factory=RealDictCursor)
-    try:
+    with get_db_connection() as db, db.cursor(cursor_factory=RealDictCursor) as cursor:
         if request.method == 'GET':
-            cursor.execute("SELECT * FROM user_profiles WHERE username = %s", (username,))
+            with metrics.db_timer('profile_select'):
+                cursor.execute(SQL_PROFILE_SELECT, (username,))
             res = cursor.fetchone()
             return jsonify(dict(res) if res else {})
         else:
             d = request.json
             # PostgreSQL "Upsert" Syntax: ON CONFLICT ... DO UPDATE
-            sql = """INSERT INTO user_profiles (username, timetable_link, home_stop_id, home_stop_name, buffer_time) 
-                     VALUES (%s, %s, %s, %s, %s) 
-                     ON CONFLICT (username) DO UPDATE SET 
-                     timetable_link=EXCLUDED.timetable_link, 
-                     home_stop_id=EXCLUDED.home_stop_id, 
-                     home_stop_name=EXCLUDED.home_stop_name, 
-                     buffer_time=EXCLUDED.buffer_time"""
-            cursor.execute(sql, (username, d.get('course'), d.get('stop_id'), d.get('stop_name'), d.get('buffer')))
+            with metrics.db_timer('profile_upsert'):
+                cursor.execute(SQL_PROFILE_UPSERT, (username, d.get('course'), d.get('stop_id'), d.get('stop_name'), d.get('buffer')))
             db.commit()
-            return jsonify({"status": "success"})
-    finally:
-        cursor.close()
-        db.close()
+    # Vorberechnete Verbindungen passen nicht mehr zum neuen Profil
+    commute_scheduler.invalidate(username)
+    if lecture_sync.interval > 0:
+        lecture_sync.schedule(d.get('course'))
+    return jsonify({"status": "success"})
+
+@app.route('/api/commute/suggestions')
+def get_commute_suggestions():
+    """
+    Liefert die im Hintergrund vorberechneten Pendelverbindungen des Benutzers.
+
+    Die Vorschläge entsprechen den Suchen, die `stundenplan.html` für die nächsten
+    Vorlesungstage stellt (erste Vorlesung -> 'to_uni', letzte Vorlesung -> 'from_uni').
+    Fehlen Einträge (z. B. direkt nach dem Speichern des Profils), sucht das Frontend live.
+
+    Query-Parameter:
+        token (str): Das Authentifizierungs-Token des Benutzers.
+
+    Returns:
+        Response: JSON-Objekt mit dem Key 'suggestions', einer Liste von Einträgen mit
+            'date' (YYYYMMDD), 'mode', 'time' (HHMM), 'buffer', 'home_stop_id',
+            'journeys' (die 5 besten Verbindungen) und 'computed_at'.
+
+    Status Codes:
+        200: Erfolgreiche Abfrage (auch ohne Einträge).
+        401: Nicht autorisiert (Token fehlt oder ist ungültig).
+    """
+    username = get_username_from_token(request.args.get('token'))
+    if not username: return jsonify({"error": "Unauthorized"}), 401
+    return jsonify({"suggestions": commute_scheduler.suggestions(username)})
+
+@app.route('/api/commute/stats')
+def get_commute_stats():
+    """
+    Gibt die Kennzahlen der Vorberechnung zurück.
+
+    Returns:
+        Response: JSON-Objekt mit 'runs', 'searches', 'fresh' (noch aktuelle, nicht erneut
+            gesuchte Suchen), 'throttled' (wegen Tageslimit übersprungene Suchen), 'stored',
+            'last_run' und 'last_duration'.
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return jsonify(commute_scheduler.stats())
+
+@app.route('/api/db/pool')
+def get_db_pool_stats():
+    """
+    Gibt die Kennzahlen des Datenbank-Connection-Pools zurück.
+
+    Returns:
+        Response: JSON-Objekt mit Poolgröße, Auslastung ('utilization'),
+            Wartezeiten ('wait_avg', 'wait_max' in Sekunden) und Timeouts.
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return jsonify(db_pool.stats())
 
 # - Favoriten -
 @app.route('/api/favorites/connection', methods=['POST', 'GET'])
@@ -456,8 +2025,17 @@ def handle_favorites():
     Methoden:
         POST: Speichert eine neue Verbindung. Erstellt bei Bedarf automatisch 
               einen Eintrag in `user_profiles`, um Fremdschlüssel-Konflikte zu vermeiden.
-        GET:  Gibt alle gespeicherten Verbindungen des Nutzers zurück, sortiert nach 
-              Erstellungsdatum (neueste zuerst).
+              Ist dieselbe Verbindung (Abfahrt, Ankunft, Abschnitte) bereits gespeichert,
+              wird kein zweiter Eintrag angelegt.
+        GET:  Gibt die gespeicherten Verbindungen des Nutzers seitenweise zurück, sortiert 
+              nach Erstellungsdatum (neueste zuerst).
+
+    Query-Parameter (GET):
+        token (str): Das Authentifizierungs-Token.
+        limit (int, optional): Seitengröße (Standard: `FAVORITES_PAGE_SIZE`, maximal
+            `FAVORITES_MAX_PAGE_SIZE`).
+        cursor (str, optional): Wert aus dem Header `X-Next-Cursor` der vorherigen Seite.
+        summary (str, optional): '1' lässt `sections_json` weg (kompakte Übersicht).
 
     Datenstruktur (JSON POST-Body):
         - dep (str): Abfahrtszeit.
@@ -468,45 +2046,97 @@ def handle_favorites():
 
     Datenbank-Details:
         - Tabelle: `fav_connections`
-        - Besonderheit: Das Feld `sections_json` nutzt die Fähigkeit von PostgreSQL, 
-          strukturierte Daten (JSON) innerhalb einer Spalte zu speichern.
+        - Besonderheit: Das Feld `sections_json` ist eine JSONB-Spalte.
+        - Pagination: Keyset über (created_at, id) auf dem Index
+          (username, created_at DESC, id DESC) statt OFFSET.
         - Integrität: Nutzt `ON CONFLICT DO NOTHING`, um sicherzustellen, dass das 
           Nutzerprofil existiert, ohne bestehende Daten zu überschreiben.
 
     Returns:
-        POST: JSON {"status": "success"} bei erfolgreicher Speicherung.
-        GET:  JSON-Liste mit allen Favoriten-Einträgen des Benutzers.
+        POST: JSON {"status": "success"} bei erfolgreicher Speicherung bzw.
+              {"status": "exists"}, wenn die Verbindung bereits gespeichert ist.
+        GET:  JSON-Liste mit den Favoriten-Einträgen der Seite. Gibt es weitere Einträge,
+              enthält der Header `X-Next-Cursor` den Cursor für die nächste Seite.
 
     Status Codes:
         200: Erfolg.
+        400: Ungültiger Wert für 'limit' oder 'cursor'.
         401: Nicht autorisiert (Token ungültig).
     """
     token = request.args.get('token') if request.method == 'GET' else request.headers.get('Authorization')
     username = get_username_from_token(token)
     if not username: return jsonify({"error": "Unauthorized"}), 401
 
-    db = get_db_connection()
-    cursor = db.cursor(cursor_factory=RealDictCursor)
-    try:
+    with get_db_connection() as db, db.cursor(cursor_factory=RealDictCursor) as cursor:
         if request.method == 'POST':
             data = request.json
             # Sicherstellen, dass der User existiert (Postgres Ersatz für INSERT IGNORE)
-            cursor.execute("INSERT INTO user_profiles (username) VALUES (%s) ON CONFLICT (username) DO NOTHING", (username,))
-            
-            sql = """INSERT INTO fav_connections 
-                     (username, dep_time, arr_time, duration, interchanges, sections_json) 
-                     VALUES (%s, %s, %s, %s, %s, %s)"""
-            cursor.execute(sql, (username, data['dep'], data['arr'], data['duration'], 
-                                 data['interchanges'], json.dumps(data['sections'])))
+            with metrics.db_timer('ensure_user'):
+                cursor.execute(SQL_ENSURE_USER, (username,))
+            with metrics.db_timer('fav_insert'):
+                cursor.execute(SQL_FAV_INSERT, (username, data['dep'], data['arr'], data['duration'], 
+                                     data['interchanges'], json.dumps(data['sections'])))
+                inserted = cursor.fetchone()
             db.commit()
-            return jsonify({"status": "success"})
+            return jsonify({"status": "success" if inserted else "exists"})
         else:
-            cursor.execute("SELECT * FROM fav_connections WHERE username = %s ORDER BY created_at DESC", (username,))
+            try:
+                limit, after, summary = favorites_page_params(request.args)
+            except ValueError:
+                return jsonify({"error": "Ungültige Pagination-Parameter"}), 400
+            with metrics.db_timer('fav_page'):
+                cursor.execute(*favorites_page_query(username, limit, after, summary))
             rows = cursor.fetchall()
-            return jsonify([dict(r) for r in rows])
-    finally:
-        cursor.close()
-        db.close()
+            response = jsonify([dict(r) for r in rows[:limit]])
+            if len(rows) > limit:
+                response.headers['X-Next-Cursor'] = favorites_cursor(rows[limit - 1])
+            return response
+
+@app.route('/api/favorites/connection/realtime')
+def refresh_favorites():
+    """
+    Gleicht alle gespeicherten Favoriten eines Benutzers mit den heutigen Echtzeitdaten ab.
+
+    Jeder Favorit wird anhand seiner Abschnitte (Linie, Start, Ziel) in den aktuellen
+    EFA-Daten wiedergefunden. Favoriten mit gleichem Start und Ziel werden zu einer
+    Abfahrtssuche zusammengefasst (je `FAVORITES_REALTIME_WINDOW` Minuten ein Request),
+    alle Suchen laufen parallel über den EFA-Thread-Pool (Gesamt-Deadline `EFA_DEADLINE`).
+
+    Query-Parameter:
+        token (str): Das Authentifizierungs-Token.
+
+    Returns:
+        Response: JSON-Objekt mit 'date' (YYYYMMDD), 'queries' (Anzahl der EFA-Anfragen)
+            und 'favorites' (siehe `assemble_realtime`, neueste Favoriten zuerst, maximal
+            `FAVORITES_MAX_PAGE_SIZE`).
+
+    Example Response (JSON):
+        {"date": "20251201", "queries": 1, "favorites": [
+            {"id": 7, "status": "ok", "saved_dep": "07:42", "saved_arr": "08:05",
+             "planned_dep": "07:42", "dep": "07:45", "planned_arr": "08:05", "arr": "08:07",
+             "delay_dep": 3, "delay_arr": 2, "realtime": true, "sections": [...]}
+        ]}
+
+    Status Codes:
+        200: Abgleich durchgeführt (einzelne Favoriten können 'not_found' sein).
+        401: Nicht autorisiert (Token fehlt oder ist ungültig).
+        503: VVS-Schnittstelle nach wiederholten Fehlern gesperrt (Circuit-Breaker offen).
+    """
+    username = get_username_from_token(request.args.get('token'))
+    if not username: return jsonify({"error": "Unauthorized"}), 401
+
+    with get_db_connection() as db, db.cursor(cursor_factory=RealDictCursor) as cursor:
+        with metrics.db_timer('fav_realtime'):
+            cursor.execute(SQL_FAV_REALTIME, (username, FAVORITES_MAX_PAGE_SIZE))
+        favorites = cursor.fetchall()
+
+    t_date = datetime.now(EFA_TIMEZONE).strftime("%Y%m%d")
+    unique_params, fav_slots = plan_realtime(favorites, t_date)
+    outcomes = run_trip_queries(unique_params, loader=cached_vvs_realtime)
+    if outcomes and all(o is None for o in outcomes) and vvs_client.breaker.is_open():
+        return jsonify({"error": "VVS derzeit nicht erreichbar", "favorites": []}), 503
+    return jsonify({"date": t_date, "queries": len(unique_params),
+                    "favorites": assemble_realtime(favorites, fav_slots, outcomes)})
 
 @app.route('/api/favorites/connection/<int:fav_id>', methods=['DELETE'])
 def delete_favorite(fav_id):
@@ -538,52 +2168,321 @@ def delete_favorite(fav_id):
     token = request.headers.get('Authorization')
     username = get_username_from_token(token)
     if not username: return jsonify({"error": "Unauthorized"}), 401
-    db = get_db_connection()
-    cursor = db.cursor()
-    try:
-        cursor.execute("DELETE FROM fav_connections WHERE id = %s AND username = %s", (fav_id, username))
+    with get_db_connection() as db, db.cursor() as cursor:
+        with metrics.db_timer('fav_delete'):
+            cursor.execute(SQL_FAV_DELETE, (fav_id, username))
         db.commit()
         return jsonify({"status": "deleted"})
-    finally:
-        cursor.close()
-        db.close()
 
 # - Stundenplan -
 @app.route('/api/timetable')
 def get_timetable():
     """
-    Ruft aktuelle Vorlesungsdaten für einen spezifischen Kurs über die dhbw.app API ab.
+    Ruft die Vorlesungstermine eines Kurses ab, optional auf einen Zeitraum beschränkt.
 
-    Dieser Endpunkt dient als Proxy-Schnittstelle zur Rapla-Anbindung. Er nimmt eine 
-    Kursbezeichnung entgegen und leitet die Anfrage an den offiziellen DHBW-API-Service 
-    weiter, um aktuelle Event-Daten (Vorlesungen, Prüfungen) zu erhalten.
+    Die Termine stammen aus der Tabelle `lectures`, die `lecture_sync` für alle Kurse aus
+    den Profilen mit der dhbw.app abgleicht (nur neue, geänderte und entfallene Termine
+    werden geschrieben). Ein Zeitraum wird mit einer indizierten Abfrage beantwortet,
+    statt die komplette Terminliste zu laden und im Frontend zu filtern. Kurse ohne Profil
+    liefert der `timetable_cache`; sie werden nicht in der Datenbank gespeichert.
 
     Query-Parameter:
         course (str): Die Kursbezeichnung oder der Rapla-Key (z.B. 'STG-TINF23C').
+        from (str, optional): Erster Tag (YYYYMMDD, Zeitzone `EFA_TIMEZONE`).
+        to (str, optional): Letzter Tag (YYYYMMDD, inklusive).
 
     Funktionsweise:
-        1. Validierung: Prüft, ob ein Kurs übergeben wurde.
-        2. Proxy-Anfrage: Sendet eine GET-Anfrage an `https://api.dhbw.app/rapla/lectures/{course}/events`.
-        3. Fehlerbehandlung: Fängt Timeout- oder Verbindungsfehler zur externen API ab.
+        1. Validierung: Prüft Kurs und Zeitraum.
+        2. Datenbank: Termine mit Beginn im Zeitraum, chronologisch. Ein noch nie
+           abgeglichener Kurs aus einem Profil wird sofort abgeglichen, ein veralteter im
+           Hintergrund.
+        3. Ausweichpfad: Steht der Kurs in keinem Profil, ist die Datenbank nicht
+           erreichbar (oder LECTURE_SYNC_INTERVAL=0),
+           werden die Termine wie bisher über den `timetable_cache` (Proxy auf
+           `https://api.dhbw.app/rapla/lectures/{course}/events` mit ETag/Last-Modified)
+           geladen und auf den Zeitraum gefiltert.
+        4. Fehlerbehandlung: Fängt Timeout- oder Verbindungsfehler zur externen API ab.
 
     Returns:
         Response: 
             - Bei Erfolg (200): Ein JSON-Array mit den Vorlesungsterminen der dhbw.app.
+              Der Header `X-Cache` gibt die Quelle an (DB/SYNC bzw. im Ausweichpfad HIT/STALE/MISS).
             - Bei Fehlern (400/500): JSON-Objekt mit entsprechender Fehlermeldung.
 
     Status Codes:
-        200: Erfolgreich Daten von der dhbw.app abgerufen.
-        400: Kein Kursname im Query-Parameter angegeben.
+        200: Erfolgreich Daten abgerufen.
+        400: Kein Kursname angegeben oder ungültiger Zeitraum.
         500: Fehler bei der Kommunikation mit der externen DHBW-Schnittstelle.
+        503: dhbw.app nach wiederholten Fehlern gesperrt (Circuit-Breaker offen, keine Daten).
     """
     course = request.args.get('course')
     if not course: return jsonify({"error": "No course provided"}), 400
     try:
-        res = requests.get(f"https://api.dhbw.app/rapla/lectures/{course}/events", timeout=10)
-        return jsonify(res.json())
+        start, end = timetable_range(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({"error": "Ungültiger Zeitraum (from/to im Format YYYYMMDD)"}), 400
+    try:
+        events, status = timetable_events(course, start, end)
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    response = jsonify(events)
+    response.headers['X-Cache'] = status
+    return response
+
+@app.route('/api/timetable/cache')
+def get_timetable_cache_stats():
+    """
+    Gibt die Kennzahlen des Stundenplan-Caches zurück.
+
+    Returns:
+        Response: JSON-Objekt mit 'size', 'maxsize', 'ttl', 'hits', 'stale',
+            'misses' und 'refresh_errors'.
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return jsonify(timetable_cache.stats())
+
+@app.route('/api/timetable/sync')
+def get_timetable_sync_stats():
+    """
+    Gibt die Kennzahlen des Vorlesungsabgleichs zurück.
+
+    Returns:
+        Response: JSON-Objekt mit 'interval', 'runs', 'syncs', 'not_modified' (304 der
+            dhbw.app), 'inserted', 'updated', 'deleted', 'errors', 'orphaned' (gelöschte
+            Kurse ohne Profil), 'last_run' und 'last_duration'.
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return jsonify(lecture_sync.stats())
+
+
+# - Abfahrtstafeln -
+@app.route('/api/departures/stats')
+def get_departure_stats():
+    """
+    Gibt die Kennzahlen der Abfahrtstafeln zurück.
+
+    Returns:
+        Response: JSON-Objekt mit 'boards' (aktive Tafeln), 'subscribers', 'polls',
+            'poll_errors', 'evicted' und 'interval'.
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return jsonify(departure_hub.stats())
+
+@app.route('/api/departures/<stop_id>')
+def get_departures(stop_id):
+    """
+    Liefert die Live-Abfahrten einer Haltestelle, auf Wunsch als Long-Poll mit Delta.
+
+    Alle Betrachter einer Haltestelle teilen sich eine Tafel in `departure_hub`, die
+    unabhängig von der Anzahl der Clients nur einmal je `DEPARTURES_INTERVAL` Sekunden
+    bei der EFA abgefragt wird. Unterstützt werden die Campus-Haltestellen (`UNI_STOPS`)
+    und alle Haltestellen aus `haltestellen.csv`.
+
+    Query-Parameter:
+        since (int, optional): Zuletzt bekannte Version. Liegt sie noch in der Historie,
+            enthält die Antwort nur die Änderungen ('delta'), sonst die komplette Liste.
+        wait (float, optional): Long-Poll: Sekunden, die auf eine neuere Version als `since`
+            gewartet wird (maximal `DEPARTURES_LONGPOLL_MAX`).
+
+    Returns:
+        Response: JSON-Objekt mit 'type' ('snapshot' oder 'delta'), 'stop_id', 'name',
+            'version', 'updated_at' und 'departures' bzw. 'base', 'upsert', 'remove' und
+            'order' (IDs in Anzeigereihenfolge). Bei Upstream-Fehlern zusätzlich 'error'.
+
+    Example Response (JSON):
+        {"type": "snapshot", "stop_id": "de:08111:6072", "name": "Rosenberg-/Seidenstraße",
+         "version": 3, "updated_at": "2025-12-01T21:37:05", "departures": [
+            {"id": "vvs:10004: :H:j25|2025-12-01T20:45:00Z", "line": "U4",
+             "product": "Stadtbahn", "direction": "Untertürkheim Bf", "platform": "1",
+             "planned": "21:45", "estimated": "21:45", "delay": 0, "realtime": true}
+        ]}
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+        400: Ungültiger Wert für 'since' oder 'wait'.
+        404: Unbekannte Haltestelle.
+        503: Maximale Anzahl gleichzeitiger Tafeln erreicht.
+    """
+    name = departure_stop_name(stop_id)
+    if name is None: return jsonify({"error": "Unbekannte Haltestelle"}), 404
+    try:
+        since = int(request.args['since']) if request.args.get('since') else None
+        wait = min(max(float(request.args.get('wait', 0)), 0), DEPARTURES_LONGPOLL_MAX)
+    except ValueError:
+        return jsonify({"error": "Ungültiger Wert für 'since' oder 'wait'"}), 400
+    try:
+        board = departure_hub.board(stop_id, name)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+
+    with departure_hub.subscription(board):
+        departure_hub.wait_version(board, None, EFA_TIMEOUT)
+        if wait and since is not None:
+            departure_hub.wait_version(board, since, wait)
+    return jsonify(departure_hub.payload(board, since))
+
+@app.route('/api/departures/<stop_id>/stream')
+def stream_departures(stop_id):
+    """
+    Streamt die Live-Abfahrten einer Haltestelle per Server-Sent Events.
+
+    Das erste Event enthält die komplette Liste ('snapshot'), danach folgt bei jeder
+    Änderung der gemeinsamen Tafel ein 'delta' (Format wie `get_departures`). Die
+    Event-ID ist die Version: Beim automatischen Reconnect schickt der Browser sie als
+    `Last-Event-ID` mit und erhält nur die verpassten Änderungen.
+
+    Events (text/event-stream, Daten als JSON):
+        snapshot: Komplette Tafel.
+        delta: Änderungen gegenüber der vorherigen Version.
+
+    Status Codes:
+        200: Stream gestartet.
+        404: Unbekannte Haltestelle.
+        503: Maximale Anzahl gleichzeitiger Tafeln erreicht.
+    """
+    name = departure_stop_name(stop_id)
+    if name is None: return jsonify({"error": "Unbekannte Haltestelle"}), 404
+    try:
+        board = departure_hub.board(stop_id, name)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    since = int(last_event_id) if last_event_id.isdigit() else None
+
+    def generate():
+        version = since
+        with departure_hub.subscription(board):
+            departure_hub.wait_version(board, None, EFA_TIMEOUT)
+            while True:
+                if version is None or board.version != version:
+                    payload = departure_hub.payload(board, version)
+                    version = payload['version']
+                    yield departures_sse(payload)
+                if not departure_hub.wait_version(board, version, DEPARTURES_HEARTBEAT):
+                    yield ": keep-alive\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+# - Metriken -
+@app.route('/metrics')
+def get_metrics():
+    """
+    Gibt alle Metriken im Prometheus-Textformat aus (siehe `metrics.py`).
+
+    Enthält Request-Anzahl und Latenz-Histogramme je Route, Latenz und Status je Upstream,
+    die Dauer des EFA-Parsings, die Dauer je SQL-Statement sowie die Anzahl der
+    Verbindungen vor dem Abschneiden auf die besten 5. Bei mehreren Workern
+    (`PROMETHEUS_MULTIPROC_DIR`) werden die Werte aller Prozesse aggregiert.
+
+    Returns:
+        Response: text/plain im Prometheus-Exposition-Format.
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# - Upstreams -
+@app.route('/api/upstreams')
+def get_upstream_stats():
+    """
+    Gibt Zustand und Kennzahlen der externen Schnittstellen zurück.
+
+    Returns:
+        Response: JSON-Objekt mit je einem Eintrag für 'vvs' und 'dhbw' (Breaker-Zustand
+            'closed'/'open'/'half_open', Fehler, Hedge-Anzahl sowie p50/p95-Latenz in ms).
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+    """
+    return jsonify({"vvs": vvs_client.stats(), "dhbw": dhbw_client.stats()})
+
+# - Profiling -
+def profile_access_error():
+    """Fehlerantwort, wenn Profiling deaktiviert ist oder das Token nicht stimmt (sonst None)."""
+    if not profiler.enabled:
+        return jsonify({"error": "Profiling deaktiviert"}), 404
+    if not profiler.authorized(request.headers.get('X-Profile-Token')):
+        return jsonify({"error": "Nicht autorisiert"}), 403
+    return None
+
+@app.route('/api/debug/profiles')
+def list_profiles():
+    """
+    Listet die gespeicherten Request-Profile (neueste zuerst) und die Tracing-Kennzahlen.
+
+    Ein Profil entsteht, wenn ein beliebiger Request den Header `X-Profile-Token` mit dem
+    konfigurierten `PROFILE_TOKEN` mitsendet; der Dateiname steht dann im Antwort-Header
+    `X-Profile`.
+
+    Header:
+        X-Profile-Token (str): Das konfigurierte `PROFILE_TOKEN`.
+
+    Returns:
+        Response: JSON-Objekt mit 'profiles' (je 'name', 'bytes', 'created') und 'slow'
+            (Anzahl protokollierter langsamer Requests seit dem Start).
+
+    Status Codes:
+        200: Erfolgreiche Abfrage.
+        403: Token fehlt oder ist falsch.
+        404: Profiling deaktiviert (kein `PROFILE_TOKEN`).
+    """
+    error = profile_access_error()
+    if error:
+        return error
+    return jsonify({"profiles": profiler.list(), "slow": request_tracer.slow})
+
+@app.route('/api/debug/profiles/<name>')
+def download_profile(name):
+    """
+    Lädt ein gespeichertes Profil (pstats-Format, z. B. für `python -m pstats` oder snakeviz).
+
+    Status Codes:
+        200: Profil als `application/octet-stream`.
+        403: Token fehlt oder ist falsch.
+        404: Profiling deaktiviert oder Profil nicht gefunden.
+    """
+    error = profile_access_error()
+    if error:
+        return error
+    if not name.endswith(profiler.SUFFIX):
+        return jsonify({"error": "Profil nicht gefunden"}), 404
+    return send_from_directory(profiler.directory, name, mimetype='application/octet-stream', as_attachment=True)
+
+
+def run_migrations():
+    """Spielt ausstehende Migrationen ein (beim Start; Fehler werden nur protokolliert)."""
+    if os.getenv('DB_MIGRATE', '1') != '1':
+        return
+    try:
+        apply_migrations(get_db_connection)
+    except Exception as e:
+        print(f"Fehler Migration: {e}")
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    if os.getenv('SERVER_MODE', 'dev') == 'asgi':
+        # Produktivbetrieb: async Routen (asgi_app) unter Uvicorn mit mehreren Workern
+        import uvicorn
+        workers = int(os.getenv('ASGI_WORKERS', '1'))
+        if workers > 1 and not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            # Metriken über alle Worker aggregieren (Verzeichnis muss vor dem Start existieren)
+            os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='vvs-metrics-')
+        uvicorn.run('asgi_app:app', host='0.0.0.0', port=5000,
+                    workers=workers)
+    else:
+        run_migrations()
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            # Nur im Kindprozess des Reloaders, der die Requests bedient
+            start_background_jobs()
+        app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
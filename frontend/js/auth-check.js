@@ -3,14 +3,16 @@
  * Purpose: Zentrale Authentifizierungsprüfung und Topbar-/UI-Updates.
  *
  * Funktionen:
- * - `checkAuth()` prüft lokal und per Server, ob ein Token gültig ist.
+ * - `checkAuth()` prüft lokal und per Backend (`/api/auth/verify`), ob ein Token gültig ist.
  * - `showLoginMessage(headline, pageContent, customMsg)` zeigt einen
  *   Login-Hinweis an, wenn kein gültiger Token vorhanden ist.
  * - `updateTopbar()` passt Topbar/Anmelde-Button an, wenn angemeldet.
  */
 
 /**
- * Prüft das gespeicherte Token lokal und beim Auth-Server und aktualisiert die UI.
+ * Prüft das gespeicherte Token lokal und beim Backend und aktualisiert die UI.
+ * Das Backend prüft Signatur und Ablauf selbst (ohne Umweg über den Auth-Server).
+ * Kann es die Signatur nicht prüfen (503, kein Secret konfiguriert), entscheidet der Auth-Server.
  * @returns {Promise<boolean>} true wenn authentifiziert (oder Fallback), sonst false
  */
 async function checkAuth() {
@@ -25,12 +27,20 @@ async function checkAuth() {
     }
 
     try {
-        // 2. Server-Prüfung: Ist das Token noch gültig?
-        const response = await fetch(`https://vsv-research.volkmann-webservices.de/auth/verify?token=${token}`, {
+        // 2. Backend-Prüfung: Ist das Token noch gültig?
+        let response = await fetch(`${API_BASE}/api/auth/verify?token=${encodeURIComponent(token)}`, {
             method: 'GET',
             headers: { 'Accept': 'application/json' }
         });
 
+        if (response.status === 503) {
+            // Backend ohne Schlüssel: Prüfung beim Auth-Server
+            response = await fetch(`https://vsv-research.volkmann-webservices.de/auth/verify?token=${encodeURIComponent(token)}`, {
+                method: 'GET',
+                headers: { 'Accept': 'application/json' }
+            });
+        }
+
         if (response.ok) {
             updateTopbar(); 
             return true; 
@@ -41,8 +51,8 @@ async function checkAuth() {
             return false;
         }
     } catch (error) {
-        console.error("Auth-Server Fehler:", error);
-        // Fallback: Wenn der Auth-Server down ist, lassen wir den User 
+        console.error("Backend nicht erreichbar:", error);
+        // Fallback: Wenn das Backend nicht erreichbar ist, lassen wir den User 
         // basierend auf dem lokalen Token rein (optional)
         updateTopbar();
         return true; 
@@ -0,0 +1,74 @@
+/**
+ * Frontend: departures.js
+ * Purpose: Live-Abfahrtstafeln der Campus-Haltestellen aus dem Backend
+ * (`/api/departures/<stop_id>/stream`, Server-Sent Events).
+ * Jedes Element mit `data-stop-id` wird zu einer Tafel. Das erste Event enthält
+ * die komplette Liste (`snapshot`), danach kommen nur Änderungen (`delta`). Beim
+ * automatischen Reconnect schickt der Browser die letzte Version als
+ * `Last-Event-ID` mit und erhält nur die verpassten Änderungen.
+ */
+document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("[data-stop-id]").forEach((el) => {
+    // Abfahrten der Tafel, Schlüssel = Abfahrts-ID
+    const departures = new Map();
+    let order = [];
+
+    /**
+     * Übernimmt ein Event des Streams in den lokalen Zustand.
+     * @param {Object} data - Payload vom Typ `snapshot` oder `delta`.
+     */
+    const apply = (data) => {
+      if (data.type === "snapshot") {
+        departures.clear();
+        data.departures.forEach((d) => departures.set(d.id, d));
+        order = data.departures.map((d) => d.id);
+      } else {
+        data.remove.forEach((id) => departures.delete(id));
+        data.upsert.forEach((d) => departures.set(d.id, d));
+        order = data.order;
+      }
+      render(data);
+    };
+
+    /**
+     * Zeichnet die Tafel (Kopf mit Uhrzeit, danach eine Zeile je Abfahrt).
+     * @param {Object} data - Zuletzt empfangenes Event (Name, Stand, Fehler).
+     */
+    const render = (data) => {
+      const now = new Date().toLocaleTimeString("de-DE", { hour: "2-digit", minute: "2-digit" });
+      let html = `
+        <div class="board-header">
+          <span>Aktuelle Abfahrten ab ${data.name}</span>
+          <span>${now}</span>
+        </div>
+        <div class="board-row board-row--head">
+          <span>Abfahrt</span><span>Heute</span><span>Linie</span><span>Richtung</span>
+        </div>`;
+
+      order.forEach((id) => {
+        const d = departures.get(id);
+        if (!d) return;
+        const late = d.delay > 0 ? " late" : "";
+        html += `
+          <div class="board-row">
+            <span>${d.planned}</span>
+            <span class="board-estimated${late}">${d.estimated || ""}</span>
+            <span class="board-line">${d.line}</span>
+            <span>${d.direction}</span>
+          </div>`;
+      });
+
+      if (data.error) {
+        html += `<div class="board-error">${data.error} – Stand ${data.updated_at ? data.updated_at.slice(11, 16) : "--:--"}</div>`;
+      } else if (order.length === 0) {
+        html += `<div class="board-error">Keine Abfahrten</div>`;
+      }
+      el.innerHTML = html;
+    };
+
+    const source = new EventSource(`${API_BASE}/api/departures/${encodeURIComponent(el.dataset.stopId)}/stream`);
+    ["snapshot", "delta"].forEach((type) =>
+      source.addEventListener(type, (e) => apply(JSON.parse(e.data)))
+    );
+  });
+});